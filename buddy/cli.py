@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+vc-buddy 命令行工具
+
+子命令：
+- metrics：按操作汇总本地性能指标（core/metrics_store.py）的 p50/p95/p99，完全离线
+
+使用方法（vc-buddy 由 pyproject.toml 的 [project.scripts] 在安装时生成；未安装时用 python -m buddy.cli）：
+    vc-buddy metrics [--since 24h] [--until 2026-01-31] [--operation window.] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+try:
+    from .core.metrics_store import DEFAULT_DB_PATH, MetricsStore
+except ImportError:
+    from core.metrics_store import DEFAULT_DB_PATH, MetricsStore
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """解析时间：相对时长（30m、24h、7d，表示多久之前）、"now" 或 ISO 日期/时间（本地时区）"""
+    now = time.time() if now is None else now
+    value = value.strip()
+    if value == "now":
+        return now
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value)
+    if match:
+        return now - float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无法解析时间: {value}（示例: 30m、24h、7d、2026-01-31、2026-01-31T09:00）")
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def print_metrics(summaries: List[dict], since: float, until: float, path):
+    print(f"性能指标（{_format_time(since)} ~ {_format_time(until)}，{path}）")
+    if not summaries:
+        print("没有记录")
+        return
+    width = max(len("operation"), *(len(summary["operation"]) for summary in summaries))
+    print(f"{'operation':<{width}} {'count':>7} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} "
+          f"{'p99 ms':>10} {'max ms':>10}")
+    for summary in summaries:
+        print(f"{summary['operation']:<{width}} {summary['count']:>7} {summary['errors']:>6} "
+              f"{summary['p50_ms']:>10.1f} {summary['p95_ms']:>10.1f} {summary['p99_ms']:>10.1f} "
+              f"{summary['max_ms']:>10.1f}")
+
+
+def run_metrics(args) -> int:
+    until = args.until if args.until is not None else time.time()
+    since = args.since if args.since is not None else until - 86400
+    store = MetricsStore(args.db)
+    summaries = store.summarize(since=since, until=until, operation=args.operation)
+    if args.json:
+        print(json.dumps({"since": since, "until": until, "operations": summaries}, ensure_ascii=False, indent=2))
+    else:
+        print_metrics(summaries, since, until, store.path)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="vc-buddy", description="Vibe Coding Buddy 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    metrics = subparsers.add_parser("metrics", help="按操作汇总本地性能指标的 p50/p95/p99")
+    metrics.add_argument("--since", type=parse_time, help="开始时间：相对时长（30m、24h、7d）或 ISO 日期/时间，默认 24h")
+    metrics.add_argument("--until", type=parse_time, help="结束时间，格式同 --since，默认现在")
+    metrics.add_argument("--operation", help="只显示以此开头的操作（例如 window.）")
+    metrics.add_argument("--db", default=str(DEFAULT_DB_PATH), help="指标数据库路径")
+    metrics.add_argument("--json", action="store_true", help="输出 JSON")
+    metrics.set_defaults(handler=run_metrics)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
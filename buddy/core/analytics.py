@@ -3,58 +3,179 @@
 """
 数据统计模块
 使用Amplitude进行用户行为统计
+
+事件经过三步到达Amplitude：
+1. track_* 把事件放入有界队列（调用线程上只花几微秒）
+2. 后台线程按事件类型采样和限流（analytics_limits.py），再按批把事件追加到本地缓冲（analytics_spool.py 的 JSONL 分段）
+3. 上传线程通过 Amplitude 批量上传接口（HTTP）发送已封存的分段，失败时退避重试；
+   进程退出时没有上传的事件由之后启动的进程继续上传
 """
 
+import atexit
 import logging
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import json
+import queue
 import threading
 import time
 import platform
 import sys
+import uuid
 
 # 导入版本获取模块
 from .version import get_app_version
 
-# 尝试导入Amplitude，如果不存在则使用模拟版本
-try:
-    from amplitude import Amplitude, BaseEvent, Identify, EventOptions
-    AMPLITUDE_AVAILABLE = True
-except ImportError:
-    logging.warning("Amplitude library not available, using mock analytics")
-    AMPLITUDE_AVAILABLE = False
-    
-    # 模拟类定义
-    class BaseEvent:
-        def __init__(self, event_type: str, device_id: str = None, user_id: str = None, event_properties: Dict[str, Any] = None):
-            self.event_type = event_type
-            self.device_id = device_id
-            self.user_id = user_id
-            self.event_properties = event_properties or {}
-    
-    class Identify:
-        def __init__(self):
-            self.properties = {}
-        
-        def set(self, property: str, value: Any):
-            self.properties[property] = value
-            return self
-    
-    class EventOptions:
-        def __init__(self, device_id: str = None, user_id: str = None):
-            self.device_id = device_id
-            self.user_id = user_id
-    
-    class Amplitude:
-        def __init__(self, api_key: str):
-            self.api_key = api_key
-        
-        def track(self, event: BaseEvent):
-            logging.debug(f"Mock analytics: {event.event_type} - {event.event_properties}")
+# 事件先写入本地缓冲，再由后台线程上传
+from .analytics_spool import EventSpool
+from .analytics_limits import EventLimiter
+
+
+# 网络信息探测结果的磁盘缓存有效期（秒）
+NETWORK_INFO_TTL = 24 * 3600
+# 网络探测完成前暂存的事件数上限，超出后直接发送（不带网络信息）
+MAX_PENDING_EVENTS = 200
+# 事件队列长度上限，后台发送跟不上时丢弃新事件并计数
+MAX_QUEUED_EVENTS = 1000
+# 后台线程每批发送的事件数，以及凑批最多等待的时间（秒）
+FLUSH_BATCH_SIZE = 50
+FLUSH_INTERVAL = 1.0
+# Amplitude 批量上传接口，环境变量 VC_BUDDY_AMPLITUDE_URL 可指向其他地址（例如本地测试服务）
+AMPLITUDE_BATCH_URL = "https://api2.amplitude.com/batch"
+# 上传线程封存并上传分段的间隔（秒），发送失败时加倍退避，最长 UPLOAD_MAX_BACKOFF
+UPLOAD_INTERVAL = 2.0
+UPLOAD_MAX_BACKOFF = 300.0
+
+_UNKNOWN_NETWORK_INFO = {
+    'public_ip': 'unknown',
+    'local_ip': 'unknown',
+    'hostname': 'unknown',
+    'network_type': 'unknown'
+}
+
+
+class AmplitudeHttpSender:
+    """通过 Amplitude 批量上传接口（/batch）发送事件"""
+    
+    def __init__(self, api_key: str, url: str = None, timeout: float = 10):
+        self.api_key = api_key
+        self.url = url or os.environ.get("VC_BUDDY_AMPLITUDE_URL") or AMPLITUDE_BATCH_URL
+        self.timeout = timeout
+    
+    def send(self, events: List[dict]) -> bool:
+        """发送一批事件；返回False表示需要稍后重试"""
+        import urllib.error
+        import urllib.request
         
-        def identify(self, identify_obj: Identify, options: EventOptions = None):
-            logging.debug(f"Mock identify: {identify_obj.properties}")
+        body = json.dumps({"api_key": self.api_key, "events": events}, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json", "Accept": "*/*"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return 200 <= response.status < 300
+        except urllib.error.HTTPError as e:
+            if e.code in (400, 413):
+                # 请求本身无效，重试也不会成功，丢弃这一批
+                logging.warning(f"Amplitude rejected {len(events)} events: HTTP {e.code}")
+                return True
+            logging.debug(f"Amplitude upload failed: HTTP {e.code}")
+            return False
+        except (urllib.error.URLError, OSError) as e:
+            logging.debug(f"Amplitude upload failed: {e}")
+            return False
+
+
+class AnalyticsState:
+    """统计状态（analytics_config.json）：进程内只读取一次，有变化时才写回
+
+    写入时先写临时文件再改名，其他进程不会读到半个文件。几个反馈窗口进程可能同时启动，
+    第一次创建设备ID时用硬链接创建文件（已存在则失败），只有一个进程的设备ID会被保存，
+    其他进程改用已保存的设备ID；修改开关时在磁盘上的最新内容基础上合并，不覆盖其他进程写入的字段。
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = self._read()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+    
+    def get_device_id(self) -> str:
+        """获取设备ID，没有时生成并保存"""
+        with self._lock:
+            device_id = self._data.get('device_id')
+            if isinstance(device_id, str) and device_id:
+                return device_id
+            
+            data = dict(self._data)
+            data['device_id'] = str(uuid.uuid4())
+            data.setdefault('analytics_enabled', True)
+            if not self._data and self._write(data, exclusive=True):
+                self._data = data
+                return self._data['device_id']
+            
+            saved = self._read()
+            if saved.get('device_id'):
+                # 其他进程先创建了文件，使用它保存的设备ID
+                self._data = saved
+            else:
+                # 文件已存在但没有设备ID（或已损坏）：与磁盘上的内容合并后替换
+                self._data = self._merge_and_write({'device_id': data['device_id']}) or data
+            return self._data['device_id']
+    
+    def update(self, **changes):
+        """修改字段；值没有变化时不写文件"""
+        with self._lock:
+            if all(self._data.get(key) == value for key, value in changes.items()):
+                return
+            self._data = self._merge_and_write(changes) or {**self._data, **changes}
+    
+    def _merge_and_write(self, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """在磁盘上的最新内容基础上合并修改并写回，写入失败时返回None"""
+        data = {**self._data, **self._read(), **changes}
+        return data if self._write(data) else None
+    
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to load analytics config: {e}")
+            return {}
+    
+    def _write(self, data: Dict[str, Any], exclusive: bool = False) -> bool:
+        """写入临时文件后改名；exclusive 时文件已存在则返回False"""
+        temp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            if exclusive:
+                try:
+                    os.link(temp_file, self.path)
+                    return True
+                except FileExistsError:
+                    return False
+                except OSError:
+                    # 文件系统不支持硬链接
+                    if self.path.exists():
+                        return False
+            os.replace(temp_file, self.path)
+            return True
+        except OSError as e:
+            logging.warning(f"Failed to save analytics config: {e}")
+            return False
+        finally:
+            try:
+                temp_file.unlink()
+            except OSError:
+                pass
 
 
 class AnalyticsManager:
@@ -64,7 +185,9 @@ class AnalyticsManager:
         self.api_key = api_key
         self.config_dir = Path(config_dir) if config_dir else Path.home() / ".vc-buddy"
         self.config_file = self.config_dir / "analytics_config.json"
-        self.device_id = self._get_or_create_device_id()
+        self.network_cache_file = self.config_dir / "network_info.json"
+        self.state = AnalyticsState(self.config_file)
+        self.device_id = self.state.get_device_id()
         
         # 获取应用版本号（缓存）
         self.app_version = get_app_version()
@@ -72,23 +195,217 @@ class AnalyticsManager:
         # 收集平台信息
         self.platform_info = self._collect_platform_info()
         
-        # 收集IP地址和网络信息
-        self.network_info = self._collect_network_info()
-        
-        # 初始化Amplitude
-        self.amplitude = Amplitude(api_key) if AMPLITUDE_AVAILABLE else Amplitude(api_key)
+        # 本地事件缓冲和上传方式
+        self.spool = EventSpool(self.config_dir / "analytics_spool")
+        self.sender = AmplitudeHttpSender(api_key)
         
         # 统计配置
-        self.enabled = self._load_analytics_config()
+        self.enabled = self.state.get('analytics_enabled', True)
         
-        # 线程安全锁
-        self._lock = threading.Lock()
+        # 高频事件的采样和限流（analytics_config.json 的 event_limits）
+        self.limiter = EventLimiter(self.state.get('event_limits'))
+        
+        # 线程安全锁（可重入：网络探测完成时在持有锁的情况下设置用户属性）
+        self._lock = threading.RLock()
         
         # 用户属性是否已设置标记
         self._user_properties_set = False
         
+        # 事件队列：track_* 通常在Qt界面线程上调用，只把事件放入有界队列，
+        # 由后台线程按批次交给Amplitude；队列满时丢弃事件并在下一批中上报丢弃数量
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self._flusher: Optional[threading.Thread] = None
+        self._uploader: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        self.dropped_events = 0
+        self.delivered_events = 0
+        self.uploaded_events = 0
+        self._unreported_drops = 0
+        # 丢弃计数使用单独的锁：队列满时调用线程不能等待正在写入本地缓冲的后台线程
+        self._drop_lock = threading.Lock()
+        
+        # IP地址和网络信息：探测需要访问外部服务，离线时最多阻塞6秒，
+        # 因此优先使用磁盘缓存，没有有效缓存时在后台线程中探测，不阻塞窗口显示。
+        # 探测完成前的事件先暂存，探测完成并设置用户属性后再发送
+        self._network_ready = threading.Event()
+        self._network_probe: Optional[threading.Thread] = None
+        self._pending_events: List[dict] = []
+        cached = self._load_cached_network_info()
+        if cached is not None:
+            self.network_info = cached
+            self._network_ready.set()
+        else:
+            self.network_info = dict(_UNKNOWN_NETWORK_INFO)
+        
+        # 网络探测和上传线程（同时上传之前进程留下的事件）在第一次 track_* 时随后台发送线程启动，
+        # 只创建管理器而不记录事件的进程（测试、工具脚本）不访问网络
+        
         logging.info(f"Analytics initialized: enabled={self.enabled}, device_id={self.device_id}, version={self.app_version}, platform={self.platform_info.get('os_name')}, ip={self.network_info.get('public_ip', 'unknown')}")
     
+    def _load_cached_network_info(self) -> Optional[Dict[str, Any]]:
+        """读取未过期的网络信息缓存"""
+        try:
+            with open(self.network_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - float(cached['collected_at']) < NETWORK_INFO_TTL:
+                return dict(_UNKNOWN_NETWORK_INFO, **cached['network_info'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+    
+    def _save_network_info_cache(self, network_info: Dict[str, Any]):
+        """写入网络信息缓存（先写临时文件再替换，多个进程同时写入时不会读到半个文件）"""
+        try:
+            self.config_dir.mkdir(exist_ok=True)
+            temp_file = self.network_cache_file.with_name(f"{self.network_cache_file.name}.{os.getpid()}.tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'collected_at': time.time(), 'network_info': network_info}, f, ensure_ascii=False)
+            os.replace(temp_file, self.network_cache_file)
+        except OSError as e:
+            logging.warning(f"Failed to save network info cache: {e}")
+    
+    def _start_network_probe(self):
+        """在后台线程中探测网络信息（只启动一次）"""
+        with self._lock:
+            if self._network_probe is not None or self._network_ready.is_set():
+                return
+            self._network_probe = threading.Thread(target=self._probe_network, name="analytics-network-probe", daemon=True)
+            self._register_shutdown()
+        self._network_probe.start()
+    
+    def _probe_network(self):
+        """探测网络信息，写入缓存后设置用户属性并发送暂存的事件"""
+        network_info = self._collect_network_info()
+        if network_info.get('public_ip', 'unknown') != 'unknown':
+            # 离线时不缓存，下次启动重新探测
+            self._save_network_info_cache(network_info)
+        with self._lock:
+            self.network_info = network_info
+        self._flush_pending_events()
+    
+    def _flush_pending_events(self):
+        """结束暂存：设置用户属性，按顺序发送暂存的事件"""
+        with self._lock:
+            if self._network_ready.is_set():
+                return
+            self._network_ready.set()
+            pending, self._pending_events = self._pending_events, []
+            if not self.enabled:
+                return
+            # 暂存已满时发送过的事件可能已经设置了不含网络信息的用户属性，重新设置一次
+            self._user_properties_set = False
+            events: List[dict] = []
+            self._setup_user_properties(events)
+            events.extend(pending)
+            try:
+                self.spool.append(events)
+            except Exception as e:
+                logging.error(f"Failed to spool {len(events)} analytics events: {e}")
+            self.delivered_events += len(pending)
+            if pending:
+                logging.debug(f"Tracked {len(pending)} events held during network probe")
+    
+    def _register_shutdown(self):
+        """进程退出时发送队列和暂存中剩余的事件（只注册一次）"""
+        if not self._atexit_registered:
+            self._atexit_registered = True
+            atexit.register(self._shutdown)
+    
+    def _shutdown(self):
+        """把队列中的事件写入本地缓冲并封存分段，由之后的进程上传，不推迟退出；
+        网络探测还没有完成时，暂存的事件不带网络信息直接写入"""
+        self.flush(timeout=FLUSH_INTERVAL * 2)
+        self._deliver([], final=True)
+        self._flush_pending_events()
+        self.spool.seal()
+        if self.dropped_events:
+            logging.warning(f"Analytics dropped {self.dropped_events} events under backpressure")
+    
+    def _start_flusher(self):
+        """启动后台发送线程（只启动一次）"""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="analytics-flusher", daemon=True)
+            self._register_shutdown()
+        self._flusher.start()
+        self._start_network_probe()
+        self._start_uploader()
+    
+    def _flush_loop(self):
+        """按数量或时间凑批，把队列中的事件写入本地缓冲"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+    
+    def flush(self, timeout: float = None) -> bool:
+        """在当前线程中把队列中的全部事件写入本地缓冲，并等待后台线程处理完正在处理的批次。
+        在 timeout 秒内完成时返回True"""
+        while True:
+            batch = []
+            try:
+                while len(batch) < FLUSH_BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                break
+            self._deliver(batch)
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def _start_uploader(self):
+        """启动上传线程（只启动一次）"""
+        with self._lock:
+            if self._uploader is not None:
+                return
+            self._uploader = threading.Thread(target=self._upload_loop, name="analytics-uploader", daemon=True)
+            self._register_shutdown()
+        self._uploader.start()
+    
+    def _upload_loop(self):
+        """定期封存当前分段并上传；启动时立即上传之前进程留下的分段"""
+        delay = 0.0
+        while True:
+            time.sleep(delay)
+            remaining = 0
+            if self.enabled:
+                try:
+                    self.spool.seal()
+                    sent, remaining = self.spool.upload(self.sender.send)
+                    self.uploaded_events += sent
+                except Exception as e:
+                    logging.warning(f"Failed to upload analytics events: {e}")
+            delay = min(max(delay * 2, UPLOAD_INTERVAL), UPLOAD_MAX_BACKOFF) if remaining else UPLOAD_INTERVAL
+    
+    def stats(self) -> Dict[str, int]:
+        """事件统计：排队中、已写入本地缓冲、已上传、因队列满被丢弃、被采样或限流抑制的事件数，以及本地缓冲的大小"""
+        return {
+            'queued': self._queue.qsize(),
+            'delivered': self.delivered_events,
+            'uploaded': self.uploaded_events,
+            'dropped': self.dropped_events,
+            'suppressed': self.limiter.suppressed_events,
+            'spool_bytes': self.spool.size(),
+            'spool_dropped': self.spool.dropped_events,
+        }
+    
     def _collect_network_info(self) -> Dict[str, Any]:
         """收集网络和IP信息（隐私安全）"""
         network_info = {}
@@ -302,8 +619,8 @@ class AnalyticsManager:
                 'current_locale': 'unknown'
             }
 
-    def _setup_user_properties(self):
-        """设置用户属性（只调用一次）"""
+    def _setup_user_properties(self, events: List[dict]):
+        """设置用户属性（只调用一次）：把 $identify 事件加入 events"""
         if self._user_properties_set or not self.enabled:
             return
         
@@ -312,37 +629,42 @@ class AnalyticsManager:
                 if self._user_properties_set:  # 双重检查锁定
                     return
                 
-                # 创建用户属性标识对象
-                identify_obj = Identify()
+                # 用户属性
+                user_properties: Dict[str, Any] = {}
                 
                 # 设置平台相关的用户属性
-                identify_obj.set("platform_os", self.platform_info['os_name'])
-                identify_obj.set("platform_os_version", self.platform_info['os_version'])
-                identify_obj.set("platform_architecture", self.platform_info['architecture'])
-                identify_obj.set("platform_python_version", self.platform_info['python_version'])
-                identify_obj.set("platform_friendly_name", self.platform_info['os_friendly_name'])
-                identify_obj.set("platform_processor_type", self.platform_info['processor_type'])
-                identify_obj.set("platform_is_apple_silicon", self.platform_info['is_apple_silicon'])
+                user_properties["platform_os"] = self.platform_info['os_name']
+                user_properties["platform_os_version"] = self.platform_info['os_version']
+                user_properties["platform_architecture"] = self.platform_info['architecture']
+                user_properties["platform_python_version"] = self.platform_info['python_version']
+                user_properties["platform_friendly_name"] = self.platform_info['os_friendly_name']
+                user_properties["platform_processor_type"] = self.platform_info['processor_type']
+                user_properties["platform_is_apple_silicon"] = self.platform_info['is_apple_silicon']
                 
                 # 语言和地区作为用户属性
-                identify_obj.set("user_language_code", self.platform_info['language_code'])
-                identify_obj.set("user_country_code", self.platform_info['country_code'])
-                identify_obj.set("user_system_language", self.platform_info['system_language'])
-                identify_obj.set("user_system_encoding", self.platform_info['system_encoding'])
-                identify_obj.set("user_current_locale", self.platform_info['current_locale'])
+                user_properties["user_language_code"] = self.platform_info['language_code']
+                user_properties["user_country_code"] = self.platform_info['country_code']
+                user_properties["user_system_language"] = self.platform_info['system_language']
+                user_properties["user_system_encoding"] = self.platform_info['system_encoding']
+                user_properties["user_current_locale"] = self.platform_info['current_locale']
                 
                 # 网络和IP信息作为用户属性
-                identify_obj.set("user_public_ip", self.network_info['public_ip'])
-                identify_obj.set("user_local_ip", self.network_info['local_ip'])
-                identify_obj.set("user_hostname", self.network_info['hostname'])
-                identify_obj.set("user_network_type", self.network_info['network_type'])
+                user_properties["user_public_ip"] = self.network_info['public_ip']
+                user_properties["user_local_ip"] = self.network_info['local_ip']
+                user_properties["user_hostname"] = self.network_info['hostname']
+                user_properties["user_network_type"] = self.network_info['network_type']
                 
                 # 设备标识
-                identify_obj.set("device_id", self.device_id)
+                user_properties["device_id"] = self.device_id
                 
-                # 发送用户属性标识
-                event_options = EventOptions(device_id=self.device_id)
-                self.amplitude.identify(identify_obj, event_options)
+                # 批量上传接口中用 $identify 事件设置用户属性
+                events.append({
+                    'event_type': '$identify',
+                    'device_id': self.device_id,
+                    'time': int(time.time() * 1000),
+                    'insert_id': uuid.uuid4().hex,
+                    'user_properties': {'$set': user_properties},
+                })
                 
                 self._user_properties_set = True
                 logging.info(f"User properties set: language={self.platform_info['language_code']}, country={self.platform_info['country_code']}, ip={self.network_info['public_ip']}")
@@ -350,105 +672,86 @@ class AnalyticsManager:
         except Exception as e:
             logging.error(f"Failed to setup user properties: {e}")
 
-    def _get_or_create_device_id(self) -> str:
-        """获取或创建设备ID"""
-        try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    if 'device_id' in config:
-                        return config['device_id']
-            
-            # 生成新的设备ID
-            import uuid
-            device_id = str(uuid.uuid4())
-            self._save_device_id(device_id)
-            return device_id
-            
-        except Exception as e:
-            logging.warning(f"Failed to get device ID: {e}")
-            import uuid
-            return str(uuid.uuid4())
-    
-    def _save_device_id(self, device_id: str):
-        """保存设备ID到配置文件"""
-        try:
-            self.config_dir.mkdir(exist_ok=True)
-            config = {'device_id': device_id, 'analytics_enabled': True}
-            
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    existing_config = json.load(f)
-                    config.update(existing_config)
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            logging.warning(f"Failed to save device ID: {e}")
-    
-    def _load_analytics_config(self) -> bool:
-        """加载统计配置"""
-        try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('analytics_enabled', True)
-        except Exception as e:
-            logging.warning(f"Failed to load analytics config: {e}")
-        
-        return True  # 默认启用
-    
     def set_analytics_enabled(self, enabled: bool):
         """设置统计开关"""
         self.enabled = enabled
-        try:
-            self.config_dir.mkdir(exist_ok=True)
-            config = {'device_id': self.device_id, 'analytics_enabled': enabled}
-            
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    existing_config = json.load(f)
-                    config.update(existing_config)
-                    config['analytics_enabled'] = enabled
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            logging.warning(f"Failed to save analytics config: {e}")
+        self.state.update(analytics_enabled=enabled)
     
     def track_event(self, event_type: str, properties: Dict[str, Any] = None):
-        """跟踪事件"""
+        """跟踪事件：只放入队列，由后台线程发送，不阻塞调用方"""
         if not self.enabled:
             return
         
+        if self._flusher is None:
+            self._start_flusher()
         try:
-            # 确保用户属性已设置（只在第一次调用时设置）
-            self._setup_user_properties()
-            
+            # 在调用线程复制属性：调用方（通常是Qt线程）之后可能继续修改或复用这个字典
+            self._queue.put_nowait((event_type, dict(properties) if properties else None, time.time()))
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped_events += 1
+                self._unreported_drops += 1
+    
+    def _deliver(self, batch: List[tuple], final: bool = False):
+        """把一批事件写入本地缓冲；网络探测完成前先暂存。
+        final 为True时（进程退出前）上报当前汇总窗口内被抑制的事件数"""
+        try:
+            with self._drop_lock:
+                drops, self._unreported_drops = self._unreported_drops, 0
             with self._lock:
-                event_properties = properties or {}
-                event_properties['timestamp'] = time.time()
-                
-                # 只添加基本的事件级别信息，不重复用户属性
-                # 用户属性（语言、国家、平台等）已通过identify()设置
-                event_properties.update({
-                    'session_id': self.device_id,  # 使用设备ID作为会话标识
-                    'app_version': self.app_version,  # 动态获取的应用版本
-                })
-                
-                event = BaseEvent(
-                    event_type=event_type,
-                    device_id=self.device_id,
-                    event_properties=event_properties
-                )
-                
-                self.amplitude.track(event)
-                logging.debug(f"Tracked event: {event_type} - {event_properties}")
-                
+                # 采样和限流，被抑制的事件按汇总窗口上报计数
+                items = [admitted for admitted in (self.limiter.admit(*item) for item in batch) if admitted is not None]
+                items.extend(self.limiter.reports(time.time(), force=final))
+                if drops:
+                    # 上报队列满时丢弃的事件数量
+                    items.append(("analytics_events_dropped", {"count": drops}, time.time()))
+                events: List[dict] = []
+                for event_type, properties, timestamp in items:
+                    try:
+                        self._deliver_event(self._build_event(event_type, properties, timestamp), events)
+                    except Exception as e:
+                        logging.error(f"Failed to track event {event_type}: {e}")
+                self.spool.append(events)
         except Exception as e:
-            logging.error(f"Failed to track event {event_type}: {e}")
+            logging.error(f"Failed to spool {len(batch)} analytics events: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _build_event(self, event_type: str, properties: Optional[Dict[str, Any]], timestamp: float) -> dict:
+        # 不修改传入的字典，事件属性总是新的对象
+        event_properties = dict(properties or {})
+        event_properties['timestamp'] = timestamp
+        
+        # 只添加基本的事件级别信息，不重复用户属性
+        # 用户属性（语言、国家、平台等）已通过 $identify 设置
+        event_properties.update({
+            'session_id': self.device_id,  # 使用设备ID作为会话标识
+            'app_version': self.app_version,  # 动态获取的应用版本
+        })
+        
+        return {
+            'event_type': event_type,
+            'device_id': self.device_id,
+            # 事件在后台上传，可能晚于发生时间，使用事件发生的时间（毫秒）
+            'time': int(timestamp * 1000),
+            # 上传失败重试或进程崩溃后重新上传时，Amplitude 按 insert_id 去重
+            'insert_id': uuid.uuid4().hex,
+            'event_properties': event_properties,
+        }
+    
+    def _deliver_event(self, event: dict, events: List[dict]):
+        """把事件加入 events（调用方持有锁）"""
+        # 网络探测完成前暂存，完成后在带有网络信息的用户属性之后写入
+        if not self._network_ready.is_set() and len(self._pending_events) < MAX_PENDING_EVENTS:
+            self._pending_events.append(event)
+            return
+        
+        # 确保用户属性已设置（只在第一次调用时设置）
+        self._setup_user_properties(events)
+        events.append(event)
+        self.delivered_events += 1
+        logging.debug(f"Tracked event: {event['event_type']} - {event['event_properties']}")
     
     # 具体的统计方法
     def track_app_opened(self, source: str = "unknown"):
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高频统计事件的采样和限流
+
+语音流程的每个阶段都会产生事件（transcription_started/completed、各种错误……），
+流式录音时每个分片还会再产生一遍，长时间听写会产生大量几乎相同的事件。
+每种事件可以配置采样率和令牌桶限流，被抑制的事件不直接丢弃计数，
+而是按 SUPPRESSED_REPORT_INTERVAL 汇总成 analytics_events_suppressed 计数事件，数据量有上限。
+
+配置（analytics_config.json 的 event_limits，与 DEFAULT_EVENT_LIMITS 合并，同名项整体覆盖默认值；
+默认不限制任何事件，需要时在配置中开启）：
+
+    "event_limits": {
+        "voice_action": {"rate": 0.2, "burst": 20},
+        "voice_action:transcription_completed": {"sample_rate": 0.5},
+        "*": {"rate": 5, "burst": 100}
+    }
+
+- 键为事件类型，或 "事件类型:action"（带 action 属性的事件），"*" 匹配其他所有事件；按此顺序查找第一个匹配项
+- sample_rate：保留事件的比例（0-1），保留的事件带 sample_rate 属性，分析时可以按比例还原
+- rate / burst：令牌桶，平均每秒 rate 个事件，最多连续 burst 个（默认等于 max(1, rate)）
+"""
+
+import logging
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 默认限制：为空，不改变已有事件的数量（开启前需要确认分析报表能按 sample_rate 还原、能接受限流）
+DEFAULT_EVENT_LIMITS: Dict[str, Dict[str, float]] = {}
+# 汇总被抑制事件的间隔（秒）
+SUPPRESSED_REPORT_INTERVAL = 60.0
+SUPPRESSED_EVENT_TYPE = "analytics_events_suppressed"
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个，最多连续 burst 个"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated: Optional[float] = None
+
+    def take(self, now: float) -> bool:
+        if self.updated is not None:
+            # 时钟回拨时不补充令牌
+            self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _Limit:
+    __slots__ = ("sample_rate", "bucket")
+
+    def __init__(self, sample_rate: float, bucket: Optional[TokenBucket]):
+        self.sample_rate = sample_rate
+        self.bucket = bucket
+
+
+class EventLimiter:
+    """按事件类型采样和限流，并汇总被抑制的事件（不加锁，调用方持有统计管理器的锁）"""
+
+    def __init__(self, limits: Optional[Dict[str, Any]] = None, report_interval: float = SUPPRESSED_REPORT_INTERVAL,
+                 rng: Callable[[], float] = random.random):
+        self.report_interval = report_interval
+        self._rng = rng
+        self._limits: Dict[str, _Limit] = {}
+        merged = dict(DEFAULT_EVENT_LIMITS)
+        if isinstance(limits, dict):
+            merged.update(limits)
+        elif limits is not None:
+            logging.warning(f"Ignoring invalid analytics event_limits: {limits!r}")
+        for key, spec in merged.items():
+            limit = _parse_limit(key, spec)
+            if limit is not None:
+                self._limits[key] = limit
+        # 当前汇总窗口内被抑制的事件：键 -> [采样丢弃数, 限流丢弃数]
+        self._suppressed: Dict[str, List[int]] = {}
+        self._window_start: Optional[float] = None
+        # 累计被抑制的事件数
+        self.suppressed_events = 0
+
+    def admit(self, event_type: str, properties: Optional[Dict[str, Any]],
+              timestamp: float) -> Optional[Tuple[str, Optional[Dict[str, Any]], float]]:
+        """返回要记录的事件 (事件类型, 属性, 时间)，事件被抑制时返回None。
+        保留的采样事件返回带 sample_rate 的新属性字典（不修改传入的字典），分析时据此按比例还原"""
+        key, limit = self._lookup(event_type, properties)
+        if limit is None:
+            return event_type, properties, timestamp
+        if limit.sample_rate < 1 and self._rng() >= limit.sample_rate:
+            self._suppress(key, 0, timestamp)
+            return None
+        if limit.bucket is not None and not limit.bucket.take(timestamp):
+            self._suppress(key, 1, timestamp)
+            return None
+        if limit.sample_rate < 1:
+            properties = {**(properties or {}), "sample_rate": limit.sample_rate}
+        return event_type, properties, timestamp
+
+    def reports(self, now: float, force: bool = False) -> List[Tuple[str, Dict[str, Any], float]]:
+        """汇总窗口结束（或 force）时返回被抑制事件的计数事件 (事件类型, 属性, 时间)，每个键一个"""
+        if not self._suppressed:
+            return []
+        if not force and now - self._window_start < self.report_interval:
+            return []
+        window = max(0.0, now - self._window_start)
+        reports = [
+            (SUPPRESSED_EVENT_TYPE,
+             {"event_key": key, "sampled_out": counts[0], "rate_limited": counts[1], "window_seconds": round(window, 1)},
+             now)
+            for key, counts in self._suppressed.items()
+        ]
+        self._suppressed = {}
+        self._window_start = None
+        return reports
+
+    def _lookup(self, event_type: str, properties: Optional[Dict[str, Any]]):
+        action = properties.get("action") if properties else None
+        if action is not None:
+            key = f"{event_type}:{action}"
+            limit = self._limits.get(key)
+            if limit is not None:
+                return key, limit
+        limit = self._limits.get(event_type)
+        if limit is not None:
+            return event_type, limit
+        # "*" 按事件类型分别计数和限流
+        default = self._limits.get("*")
+        if default is None:
+            return event_type, None
+        limit = _Limit(default.sample_rate, default.bucket and TokenBucket(default.bucket.rate, default.bucket.burst))
+        self._limits[event_type] = limit
+        return event_type, limit
+
+    def _suppress(self, key: str, reason: int, timestamp: float):
+        if self._window_start is None:
+            self._window_start = timestamp
+        self._suppressed.setdefault(key, [0, 0])[reason] += 1
+        self.suppressed_events += 1
+
+
+def _parse_limit(key: str, spec: Any) -> Optional[_Limit]:
+    """解析一项配置；配置无效时记录警告并忽略该项"""
+    try:
+        if not isinstance(spec, dict):
+            raise ValueError("expected an object")
+        sample_rate = float(spec.get("sample_rate", 1.0))
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        bucket = None
+        if spec.get("rate") is not None:
+            rate = float(spec["rate"])
+            burst = float(spec.get("burst", max(1.0, rate)))
+            if rate < 0 or burst < 1:
+                raise ValueError("rate must be >= 0 and burst >= 1")
+            bucket = TokenBucket(rate, burst)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Ignoring analytics event limit {key!r}: {e}")
+        return None
+    if sample_rate >= 1 and bucket is None:
+        return None
+    return _Limit(sample_rate, bucket)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据统计事件的本地缓冲（spool）
+
+反馈窗口进程只存在几秒到几分钟，sendResponse 之后立即退出，还在内存中等待发送的事件会丢失，
+等待发送完成又会推迟退出。因此事件先追加写入本地 JSONL 分段文件，再由后台线程按批上传；
+本进程没来得及上传的事件留在磁盘上，由之后启动的进程继续上传（离线时同样如此）。
+
+目录结构（~/.vc-buddy/analytics_spool/）：
+- <时间>-<pid>.open：进程正在写入的分段，只有这个进程追加
+- <时间>-<pid>.jsonl：已封存的分段，等待上传
+- <时间>-<pid>.uploading-<pid>：某个进程正在上传的分段，用 rename 认领，多个进程不会重复上传
+
+写入只是一次 write + flush（不 fsync），代价与写日志相同。上传时多个小分段合并成批；
+发送失败时未发送的事件重写为一个新分段（压缩），原分段删除。
+所属进程已退出的 .open/.uploading 分段会被重新封存。分段总大小超过上限时从最旧的分段开始丢弃。
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# 单个分段的大小上限，超过后封存并开始新的分段
+SEGMENT_MAX_BYTES = 256 * 1024
+# 所有分段的总大小上限，超过后丢弃最旧的分段
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# 每次上传最多认领的事件数
+UPLOAD_MAX_EVENTS = 5000
+# .open/.uploading 分段超过这个时间（秒）没有修改时，认为所属进程已退出
+STALE_SEGMENT_AGE = 600
+
+
+class EventSpool:
+    """追加写的事件分段目录"""
+
+    def __init__(self, directory, max_segment_bytes: int = SEGMENT_MAX_BYTES,
+                 max_total_bytes: int = SPOOL_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_total_bytes = max_total_bytes
+        # 因总大小超过上限被丢弃的事件数
+        self.dropped_events = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[Path] = None
+
+    def append(self, events: List[dict]):
+        """追加事件到本进程的分段"""
+        if not events:
+            return
+        data = "".join(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in events)
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(data)
+            self._file.flush()
+            if self._file.tell() >= self.max_segment_bytes:
+                self._seal_locked()
+
+    def seal(self):
+        """封存本进程正在写入的分段，使其可以被上传"""
+        with self._lock:
+            self._seal_locked()
+
+    def upload(self, send: Callable[[List[dict]], bool], batch_size: int = 100) -> Tuple[int, int]:
+        """按批上传已封存的分段，send 返回False时停止。
+        返回 (发送成功的事件数, 留待下次上传的事件数)"""
+        claimed, events = [], []
+        for segment in self.sealed_segments():
+            if len(events) >= UPLOAD_MAX_EVENTS:
+                break
+            path = self._claim(segment)
+            if path is not None:
+                claimed.append(path)
+                events.extend(_read_events(path))
+
+        sent = 0
+        try:
+            while sent < len(events):
+                batch = events[sent:sent + batch_size]
+                if not send(batch):
+                    break
+                sent += len(batch)
+        finally:
+            remaining = events[sent:]
+            if remaining:
+                # 压缩：未发送的事件写成一个新分段，排在原来的位置
+                stem = claimed[0].name.split(".")[0]
+                self._write_sealed(stem if stem.endswith("-c") else stem + "-c", remaining)
+            for path in claimed:
+                _unlink(path)
+        return sent, len(remaining)
+
+    def sealed_segments(self) -> List[Path]:
+        """等待上传的分段（按时间顺序）；所属进程已退出的分段重新封存"""
+        try:
+            paths = list(self.directory.iterdir())
+        except OSError:
+            return []
+        segments = []
+        for path in paths:
+            if path.suffix == ".jsonl":
+                segments.append(path)
+            elif (path.suffix == ".open" or ".uploading-" in path.name) and path != self._path \
+                    and _orphaned(path):
+                sealed = path.with_name(path.name.split(".")[0] + ".jsonl")
+                try:
+                    os.rename(path, sealed)
+                    segments.append(sealed)
+                except OSError:
+                    pass
+        return sorted(segments, key=lambda p: p.name)
+
+    def size(self) -> int:
+        """所有分段的总大小（字节）"""
+        total = 0
+        try:
+            for path in self.directory.iterdir():
+                total += _file_size(path)
+        except OSError:
+            pass
+        return total
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{time.time_ns():020d}-{os.getpid()}.open"
+        self._file = open(self._path, "a", encoding="utf-8")
+
+    def _seal_locked(self):
+        if self._file is None:
+            return
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        try:
+            if path.stat().st_size == 0:
+                path.unlink()
+            else:
+                os.rename(path, path.with_suffix(".jsonl"))
+        except OSError as e:
+            logging.warning(f"Failed to seal analytics spool segment {path}: {e}")
+        self._enforce_cap()
+
+    def _claim(self, segment: Path) -> Optional[Path]:
+        """用 rename 认领分段；已被其他进程认领时返回None"""
+        claimed = segment.with_name(f"{segment.stem}.uploading-{os.getpid()}")
+        try:
+            os.rename(segment, claimed)
+        except OSError:
+            return None
+        return claimed
+
+    def _write_sealed(self, stem: str, events: List[dict]):
+        """写入一个新的已封存分段（先写临时文件再改名）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp = self.directory / f"{stem}.tmp-{os.getpid()}"
+        with open(temp, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(temp, self.directory / f"{stem}.jsonl")
+
+    def _enforce_cap(self):
+        """总大小超过上限时丢弃最旧的已封存分段"""
+        segments = sorted((p for p in _list(self.directory) if p.suffix == ".jsonl"), key=lambda p: p.name)
+        total = self.size()
+        while total > self.max_total_bytes and segments:
+            oldest = segments.pop(0)
+            size = _file_size(oldest)
+            dropped = len(_read_events(oldest))
+            if _unlink(oldest):
+                total -= size
+                self.dropped_events += dropped
+                logging.warning(f"Analytics spool over {self.max_total_bytes} bytes, dropped {dropped} events")
+
+
+def _read_events(path: Path) -> List[dict]:
+    """读取分段中的事件；跳过进程崩溃时写了一半的行"""
+    events = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return events
+
+
+def _orphaned(path: Path) -> bool:
+    """写入/上传分段的进程是否已经退出"""
+    try:
+        pid = int(path.name.rsplit("-", 1)[1]) if ".uploading-" in path.name \
+            else int(path.name.split(".")[0].rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        pid = None
+    if pid == os.getpid():
+        return False
+    # Windows 上 os.kill 会结束进程，只按修改时间判断
+    if pid is not None and sys.platform != "win32":
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+    try:
+        return time.time() - path.stat().st_mtime > STALE_SEGMENT_AGE
+    except OSError:
+        return False
+
+
+def _list(directory: Path) -> List[Path]:
+    try:
+        return list(directory.iterdir())
+    except OSError:
+        return []
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except OSError:
+        return False
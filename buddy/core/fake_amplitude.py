@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 Amplitude 批量上传接口（/batch）替身
+
+按 Amplitude HTTP V2 / batch 接口的格式接收事件，不访问网络，供单元测试、基准测试和调试上传逻辑使用：
+- 请求体为 {"api_key": ..., "events": [...]}，缺少字段或格式错误时返回 400，请求体过大时返回 413
+- 成功时返回 200 和 {"code": 200, "events_ingested": N, ...}
+- 可注入延迟（--latency-ms，--jitter-ms）和失败（--failure-rate 概率返回 --failure-status，默认 503）
+- 按 insert_id 统计重复上传的事件
+
+把数据统计的上传地址指向它：
+    VC_BUDDY_AMPLITUDE_URL=http://127.0.0.1:8790/batch
+
+单独运行见 tools/fake_amplitude.py。
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Amplitude 批量接口的请求体大小上限
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class FakeAmplitudeServer:
+    """在后台线程中运行的 Amplitude 批量接口替身"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, failure_status: int = 503, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        self._insert_ids = set()
+        self.requests = 0
+        self.failed_requests = 0
+        self.rejected_requests = 0
+        self.events = 0
+        self.duplicate_events = 0
+        self.last_event_at: Optional[float] = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/batch"
+
+    def start(self) -> "FakeAmplitudeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-amplitude", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """请求数、注入失败的请求数、被拒绝（400/413）的请求数、收到的事件数（去重后）和重复事件数"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "failed_requests": self.failed_requests,
+                "rejected_requests": self.rejected_requests,
+                "events": self.events,
+                "duplicate_events": self.duplicate_events,
+            }
+
+    def wait_for_events(self, count: int, timeout: float) -> bool:
+        """等待收到 count 个（去重后的）事件"""
+        with self._received:
+            return self._received.wait_for(lambda: self.events >= count, timeout)
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            # 不读取请求体，回复后关闭连接
+            handler.close_connection = True
+            self._count_rejected()
+            self._reply(handler, 413, {"code": 413, "error": "Payload too large"})
+            return
+        body = handler.rfile.read(length)
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._lock:
+            self.requests += 1
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if failed:
+                self.failed_requests += 1
+        if failed:
+            self._reply(handler, self.failure_status, {"code": self.failure_status, "error": "Injected failure"})
+            return
+
+        try:
+            payload = json.loads(body)
+            events = payload["events"]
+            if not payload.get("api_key") or not isinstance(events, list) or not events:
+                raise ValueError("api_key and a non-empty events list are required")
+            for event in events:
+                if not event.get("event_type") or not (event.get("device_id") or event.get("user_id")):
+                    raise ValueError("every event needs event_type and device_id or user_id")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self._count_rejected()
+            self._reply(handler, 400, {"code": 400, "error": f"Invalid request: {e}"})
+            return
+
+        with self._received:
+            for event in events:
+                insert_id = event.get("insert_id")
+                if insert_id is not None and insert_id in self._insert_ids:
+                    self.duplicate_events += 1
+                    continue
+                if insert_id is not None:
+                    self._insert_ids.add(insert_id)
+                self.events += 1
+            self.last_event_at = time.monotonic()
+            self._received.notify_all()
+        self._reply(handler, 200, {"code": 200, "events_ingested": len(events), "payload_size_bytes": length,
+                                   "server_upload_time": int(time.time() * 1000)})
+
+    def _count_rejected(self):
+        with self._lock:
+            self.requests += 1
+            self.rejected_requests += 1
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器与反馈窗口之间的分帧通信协议
+
+每一帧由固定长度的帧头和 UTF-8 JSON 负载组成：
+
+    +--------+---------+------+----------------+------------------+
+    | "VB"   | version | type | length (uint32)| payload (JSON)   |
+    | 2 字节 | 1 字节  | 1字节| 4 字节，大端序 | length 字节      |
+    +--------+---------+------+----------------+------------------+
+
+接收方先读取 8 字节帧头，再按长度读取负载，不需要按行扫描或猜测编码，
+多 KB 的摘要、附件也可以完整传输。
+
+帧类型：
+- REQUEST：服务器发给窗口的反馈请求 {"summary": ..., "project_directory": ..., "request_id": ...}
+- PROGRESS：窗口状态变化 {"stage": "shown" | "recording" | ..., "request_id": ...}
+- DRAFT：用户正在输入的草稿 {"text": ..., "request_id": ...}
+- RESULT：最终反馈 {"result": ..., "request_id": ...}
+- READY：预热/常驻进程已就绪
+- CANCEL：服务器通知窗口请求已被取消；带 request_id 时只关闭对应的标签页，否则窗口应立即关闭
+- PING/PONG：远程中继连接的心跳（见 buddy/server/relay.py）
+
+同一个窗口可以同时显示同一项目的多个请求（每个请求一个标签页），
+request_id 用于把结果和进度对应到请求；不带 request_id 的结果属于最早的请求。
+"""
+
+import json
+import os
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, BinaryIO, Dict, List, Optional
+
+MAGIC = b"VB"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct(">2sBBI")
+# 单帧负载上限，防止错误的长度字段导致一次性分配过多内存
+MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+
+
+class FrameType(IntEnum):
+    """帧类型"""
+    REQUEST = 1
+    PROGRESS = 2
+    DRAFT = 3
+    RESULT = 4
+    READY = 5
+    CANCEL = 6
+    PING = 7
+    PONG = 8
+
+
+class IPCError(Exception):
+    """帧格式错误（魔数、版本或长度不合法）"""
+
+
+@dataclass
+class Frame:
+    """一个已解码的帧"""
+    type: int
+    payload: Dict[str, Any]
+
+
+def encode_frame(frame_type: int, payload: Dict[str, Any]) -> bytes:
+    """把负载编码为一帧"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    if len(body) > MAX_PAYLOAD_SIZE:
+        raise IPCError(f"负载过大: {len(body)} 字节")
+    return HEADER.pack(MAGIC, PROTOCOL_VERSION, int(frame_type), len(body)) + body
+
+
+def _parse_header(header: bytes) -> tuple:
+    """校验帧头，返回 (帧类型, 负载长度)"""
+    magic, version, frame_type, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise IPCError(f"无效的帧头: {header!r}")
+    if version != PROTOCOL_VERSION:
+        raise IPCError(f"不支持的协议版本: {version}")
+    if length > MAX_PAYLOAD_SIZE:
+        raise IPCError(f"负载过大: {length} 字节")
+    return frame_type, length
+
+
+def _decode_payload(frame_type: int, body: bytes) -> Frame:
+    try:
+        payload = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise IPCError(f"无效的负载: {e}")
+    if not isinstance(payload, dict):
+        raise IPCError("负载必须是JSON对象")
+    return Frame(frame_type, payload)
+
+
+class FrameDecoder:
+    """增量解码器：用于Qt socket等按块到达的数据"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """追加数据，返回已经完整的帧"""
+        self._buffer.extend(data)
+        frames = []
+        while len(self._buffer) >= HEADER.size:
+            frame_type, length = _parse_header(bytes(self._buffer[:HEADER.size]))
+            end = HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            frames.append(_decode_payload(frame_type, bytes(self._buffer[HEADER.size:end])))
+            del self._buffer[:end]
+        return frames
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Optional[Frame]:
+    """从阻塞的二进制流读取一帧；流结束时返回None"""
+    header = _read_exactly(stream, HEADER.size)
+    if header is None:
+        return None
+    frame_type, length = _parse_header(header)
+    body = _read_exactly(stream, length)
+    if body is None:
+        raise IPCError("帧在负载中途结束")
+    return _decode_payload(frame_type, body)
+
+
+async def read_frame_async(reader) -> Optional[Frame]:
+    """从 asyncio.StreamReader 读取一帧；流结束时返回None"""
+    import asyncio
+
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise IPCError("帧头不完整")
+        return None
+    frame_type, length = _parse_header(header)
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise IPCError("帧在负载中途结束")
+    return _decode_payload(frame_type, body)
+
+
+class FrameWriter:
+    """线程安全地向二进制流写入帧"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, frame_type: int, payload: Dict[str, Any]):
+        data = encode_frame(frame_type, payload)
+        with self._lock:
+            self._stream.write(data)
+            self._stream.flush()
+
+
+def take_stdout_channel() -> FrameWriter:
+    """把原始标准输出保留为专用的帧通道
+
+    之后所有写到标准输出的内容（print、C 扩展的输出）都被重定向到 stderr，
+    不会混入帧数据。
+    """
+    sys.stdout.flush()
+    channel_fd = os.dup(1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    return FrameWriter(os.fdopen(channel_fd, "wb", buffering=0))
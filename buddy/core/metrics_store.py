@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地性能指标存储
+
+数据统计（analytics.py）记录的是用户行为，这里记录我们自己关心的耗时：
+窗口启动的各个阶段、语音转写往返、DeepSeek总结、TODO保存。
+UI进程用 metrics_span() 计时，记录写入本地 SQLite 数据库（~/.vc-buddy/metrics.db），不访问网络；
+`vc-buddy metrics`（buddy/cli.py）按操作汇总一段时间内的 p50/p95/p99。
+
+与数据统计相同，调用线程（通常是Qt界面线程）只把记录放入有界队列，由后台线程按批写入数据库，
+进程退出前写完剩余的记录。多个窗口进程会同时写入同一个数据库，使用 WAL 模式并设置忙等待超时。
+超过 RETENTION_DAYS 天的记录在后台线程第一次打开数据库时删除。
+
+环境变量 VC_BUDDY_METRICS_DISABLED=1 时不记录。
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 默认数据库位置
+DEFAULT_DB_PATH = Path.home() / ".vc-buddy" / "metrics.db"
+# 记录保留天数
+RETENTION_DAYS = 30
+# 队列长度上限，写入跟不上时丢弃新记录
+MAX_QUEUED_RECORDS = 1000
+# 每批写入的记录数
+WRITE_BATCH_SIZE = 200
+# 等待其他进程释放数据库锁的时间（秒）
+BUSY_TIMEOUT = 5.0
+# 进程退出时等待写完剩余记录的时间（秒）
+EXIT_FLUSH_TIMEOUT = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY,
+    operation TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration_ms REAL NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 1,
+    pid INTEGER,
+    attrs TEXT
+);
+CREATE INDEX IF NOT EXISTS spans_operation_started_at ON spans (operation, started_at);
+CREATE INDEX IF NOT EXISTS spans_started_at ON spans (started_at);
+"""
+
+
+class MetricsSpan:
+    """一次计时：with 块结束时记录耗时；块内抛出异常或 ok 被置为False时记为失败"""
+
+    def __init__(self, store: "MetricsStore", operation: str, attrs: Dict[str, Any]):
+        self.store = store
+        self.operation = operation
+        self.attrs = attrs
+        self.ok = True
+        self._started_at = 0.0
+        self._start = 0.0
+
+    def __enter__(self) -> "MetricsSpan":
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        if exc_type is not None:
+            self.ok = False
+        self.store.record(self.operation, duration_ms, ok=self.ok, started_at=self._started_at, **self.attrs)
+        return False
+
+
+class MetricsStore:
+    """SQLite 中的耗时记录（操作名、开始时间、耗时、是否成功、附加属性）"""
+
+    def __init__(self, path=None, enabled: Optional[bool] = None):
+        self.path = Path(path) if path else DEFAULT_DB_PATH
+        if enabled is None:
+            enabled = os.environ.get("VC_BUDDY_METRICS_DISABLED") != "1"
+        self.enabled = enabled
+        self.dropped_records = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_RECORDS)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def span(self, operation: str, **attrs) -> MetricsSpan:
+        """计时一段代码：with store.span("todo.save", items=3) as span: ..."""
+        return MetricsSpan(self, operation, attrs)
+
+    def record(self, operation: str, duration_ms: float, ok: bool = True, started_at: Optional[float] = None,
+               **attrs):
+        """记录一次耗时（毫秒）；只放入队列，不阻塞调用方"""
+        if not self.enabled:
+            return
+        if self._writer is None:
+            self._start_writer()
+        if started_at is None:
+            started_at = time.time() - duration_ms / 1000
+        row = (operation, started_at, round(duration_ms, 3), int(ok), os.getpid(),
+               json.dumps(attrs, ensure_ascii=False) if attrs else None)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped_records += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的记录全部写入数据库，在 timeout 秒内完成时返回True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def summarize(self, since: Optional[float] = None, until: Optional[float] = None,
+                  operation: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按操作汇总 [since, until) 内的耗时：次数、失败次数、平均值和 p50/p95/p99/最大值（毫秒）。
+        operation 为操作名前缀（例如 "window."）"""
+        if not self.path.exists():
+            return []
+        query = "SELECT operation, duration_ms, ok FROM spans WHERE 1 = 1"
+        params: List[Any] = []
+        if since is not None:
+            query += " AND started_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND started_at < ?"
+            params.append(until)
+        if operation:
+            query += " AND substr(operation, 1, ?) = ?"
+            params += [len(operation), operation]
+        query += " ORDER BY operation, duration_ms"
+
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        except sqlite3.OperationalError as e:
+            # 数据库还没有写入过记录（表不存在）
+            logging.debug(f"Failed to read metrics: {e}")
+            return []
+        finally:
+            conn.close()
+
+        by_operation: Dict[str, List[tuple]] = {}
+        for name, duration_ms, ok in rows:
+            by_operation.setdefault(name, []).append((duration_ms, ok))
+        summaries = []
+        for name, samples in by_operation.items():
+            durations = [duration_ms for duration_ms, _ in samples]
+            summaries.append({
+                "operation": name,
+                "count": len(durations),
+                "errors": sum(1 for _, ok in samples if not ok),
+                "mean_ms": round(sum(durations) / len(durations), 1),
+                "p50_ms": round(_percentile(durations, 50), 1),
+                "p95_ms": round(_percentile(durations, 95), 1),
+                "p99_ms": round(_percentile(durations, 99), 1),
+                "max_ms": round(durations[-1], 1),
+            })
+        return summaries
+
+    def _start_writer(self):
+        """启动后台写入线程（只启动一次）"""
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+            atexit.register(self.flush, EXIT_FLUSH_TIMEOUT)
+        self._writer.start()
+
+    def _write_loop(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < WRITE_BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                if conn is None:
+                    conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO spans (operation, started_at, duration_ms, ok, pid, attrs) VALUES (?, ?, ?, ?, ?, ?)",
+                        batch)
+            except (sqlite3.Error, OSError) as e:
+                logging.warning(f"Failed to write {len(batch)} metrics: {e}")
+                if conn is not None:
+                    conn.close()
+                conn = None
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库（不存在时创建），并删除过期的记录"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute("DELETE FROM spans WHERE started_at < ?", (time.time() - RETENTION_DAYS * 86400,))
+        return conn
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """已排序数据的分位数（最近秩）"""
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# 全局单例
+_metrics_store: Optional[MetricsStore] = None
+
+
+def get_metrics_store() -> MetricsStore:
+    """获取全局指标存储实例"""
+    global _metrics_store
+    if _metrics_store is None:
+        _metrics_store = MetricsStore()
+    return _metrics_store
+
+
+# 便捷函数
+def metrics_span(operation: str, **attrs) -> MetricsSpan:
+    """计时一段代码"""
+    return get_metrics_store().span(operation, **attrs)
+
+
+def record_metric(operation: str, duration_ms: float, ok: bool = True, **attrs):
+    """记录一次耗时（毫秒）"""
+    get_metrics_store().record(operation, duration_ms, ok=ok, **attrs)
@@ -3,45 +3,78 @@
 """
 版本获取模块
 提供统一的版本号获取方法
+
+项目以 hatchling 构建，安装（uv sync / make install，可编辑安装）或构建wheel时，
+hatch 的 version 构建钩子（pyproject.toml 的 [tool.hatch.build.hooks.version]）把版本号写入
+生成的 core/_version.py，运行时直接导入即可，不需要查询包元数据或读取 pyproject.toml。
+服务器每次被 IDE 启动都要先取得版本号才能响应 initialize，这一步应当几乎不花时间。
+
+没有安装、直接从源码目录运行时可手动生成：python buddy/core/version.py --write
 """
 
 import sys
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+# 生成的版本模块，内容与 hatch 的 version 构建钩子的默认模板一致
+VERSION_FILE = Path(__file__).parent / "_version.py"
+VERSION_TEMPLATE = """\
+# This file is auto-generated by Hatchling. As such, do not:
+#   - modify
+#   - track in version control e.g. be sure to add to .gitignore
+__version__ = VERSION = {version!r}
+"""
 
+
+@lru_cache(maxsize=None)
 def get_app_version() -> str:
-    """获取应用版本号
+    """获取应用版本号（结果在进程内缓存）
     
     优先级：
-    1. 从包元数据获取（如果已安装为包）
-    2. 从pyproject.toml读取
-    3. 默认值 '0.1.0'
+    1. 安装/构建时生成的 _version.py
+    2. 从包元数据获取（如果已安装为包）
+    3. 从pyproject.toml读取
+    4. 默认值 '0.1.0'
     
     Returns:
         str: 应用版本号
     """
     try:
-        # 方法1: 尝试从包元数据获取版本（如果uv已经注入或包已安装）
+        # 方法1: 生成的版本模块
+        version = _get_version_from_module()
+        if version:
+            return version
+
+        # 方法2: 尝试从包元数据获取版本（如果uv已经注入或包已安装）
         version = _get_version_from_metadata()
         if version:
             return version
         
-        # 方法2: 从pyproject.toml读取
+        # 方法3: 从pyproject.toml读取
         version = _get_version_from_pyproject()
         if version:
             return version
         
-        # 方法3: 默认值
+        # 方法4: 默认值
         return "0.1.0"
         
     except Exception as e:
-        # 使用print而不是logging，避免循环依赖
-        print(f"Warning: Failed to get app version: {e}")
+        # 使用print而不是logging，避免循环依赖；stdout 是 MCP 的 stdio 通道，只能写 stderr
+        print(f"Warning: Failed to get app version: {e}", file=sys.stderr)
         return "0.1.0"
 
 
+def _get_version_from_module() -> Optional[str]:
+    """从生成的 _version.py 获取版本号"""
+    try:
+        from ._version import __version__
+    except ImportError:
+        return None
+    return __version__
+
+
 def _get_version_from_metadata() -> Optional[str]:
     """从包元数据获取版本号"""
     try:
@@ -94,5 +127,19 @@ def _get_version_from_pyproject() -> Optional[str]:
         
     except Exception as e:
         # 使用print而不是logging，避免循环依赖
-        print(f"Warning: Failed to read version from pyproject.toml: {e}")
-        return None 
\ No newline at end of file
+        print(f"Warning: Failed to read version from pyproject.toml: {e}", file=sys.stderr)
+        return None 
+
+
+def write_version_file(path: Path = VERSION_FILE) -> str:
+    """按 pyproject.toml（或包元数据）生成版本模块，返回写入的版本号"""
+    version = _get_version_from_pyproject() or _get_version_from_metadata() or "0.1.0"
+    path.write_text(VERSION_TEMPLATE.format(version=version), encoding="utf-8")
+    return version
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--write"]:
+        print(f"{VERSION_FILE}: {write_version_file()}")
+    else:
+        print(get_app_version())
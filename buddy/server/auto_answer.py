@@ -0,0 +1,174 @@
+"""自动应答规则
+
+很多检查点是例行确认（"这一步完成了，继续吗？"），用户总是直接回复空内容。
+在项目的 .vc-buddy/config.json 中配置 auto_answer.rules 后，摘要匹配规则的请求
+直接返回预设答案，不再打开反馈窗口：
+
+    "auto_answer": {
+        "rules": [
+            {"name": "继续确认", "pattern": "是否继续[？?]\\s*$", "answer": ""},
+            {"name": "步骤完成", "keywords": ["step done", "continue?"], "answer": "继续"}
+        ]
+    }
+
+- pattern：正则表达式；keywords：关键字列表，包含任意一个即匹配
+- ignore_case：是否忽略大小写，默认忽略
+- 规则按顺序匹配，第一个命中的规则生效；项目规则优先于全局配置中的规则
+- 项目中设置 "enabled": false 可关闭该项目的自动应答（包括全局规则）
+
+项目配置文件由 ProjectSettings 读取和缓存（与超时等项目设置共用一份缓存），
+规则只在它重新读取了配置文件（mtime/大小变化）时重新编译。编译时提取每条规则必须出现的字面文本
+（关键字本身，或正则中最长的连续字面片段），匹配时先用子串查找排除不可能命中的规则，
+只对剩下的规则执行正则匹配，规则数量达到数百条也不会拖慢请求。
+（把所有规则合并成一个大的正则反而更慢：Python 的 re 会逐个尝试分支，并失去字面前缀优化。）
+"""
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+try:
+    from .project_config import ProjectSettings
+except ImportError:
+    from server.project_config import ProjectSettings
+
+try:
+    from re import _constants as _sre_constants, _parser as _sre_parse
+except ImportError:  # Python 3.10 及更早版本
+    import sre_constants as _sre_constants
+    import sre_parse as _sre_parse
+
+
+@dataclass
+class AutoAnswerRule:
+    """一条编译后的规则"""
+    name: str
+    regex: Pattern
+    answer: str
+    # 命中时至少包含其中一个的字面文本（忽略大小写的规则已 casefold）；为空表示无法预筛
+    literals: Tuple[str, ...] = ()
+    ignore_case: bool = False
+
+
+def _required_literal(pattern: str) -> str:
+    """正则顶层最长的连续字面片段；任何匹配都必然包含它"""
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return ""
+    best = current = ""
+    for op, arg in parsed:
+        if op is _sre_constants.LITERAL:
+            current += chr(arg)
+        else:
+            best = max(best, current, key=len)
+            current = ""
+    return max(best, current, key=len)
+
+
+def compile_rules(raw_rules: Any, source: str) -> List[AutoAnswerRule]:
+    """编译规则列表；无效的规则被跳过并输出调试信息"""
+    if not isinstance(raw_rules, list):
+        return []
+
+    rules = []
+    for index, raw in enumerate(raw_rules, start=1):
+        if not isinstance(raw, dict) or raw.get("enabled") is False:
+            continue
+        name = str(raw.get("name") or f"{source}#{index}")
+        keywords = raw.get("keywords")
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        keywords = [str(keyword) for keyword in keywords or [] if str(keyword)]
+        pattern = "|".join(re.escape(keyword) for keyword in keywords) or raw.get("pattern")
+        if not pattern:
+            print(f"DEBUG: 自动应答规则 {name} 缺少 pattern 或 keywords，已跳过", file=sys.stderr)
+            continue
+        ignore_case = raw.get("ignore_case", True)
+        try:
+            regex = re.compile(str(pattern), re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            print(f"DEBUG: 自动应答规则 {name} 的正则无效，已跳过: {e}", file=sys.stderr)
+            continue
+        
+        literals = tuple(keywords) if keywords else tuple(filter(None, [_required_literal(str(pattern))]))
+        # 正则中的 (?i) 也会使规则忽略大小写
+        ignore_case = bool(regex.flags & re.IGNORECASE)
+        if ignore_case:
+            literals = tuple(literal.casefold() for literal in literals)
+        rules.append(AutoAnswerRule(name=name, regex=regex, answer=str(raw.get("answer") or ""),
+                                    literals=literals, ignore_case=ignore_case))
+    return rules
+
+
+class AutoAnswerEngine:
+    """按顺序匹配一组规则，先用字面文本排除不可能命中的规则"""
+
+    def __init__(self, rules: List[AutoAnswerRule]):
+        self.rules = rules
+        self._needs_casefold = any(rule.ignore_case for rule in rules)
+
+    def match(self, summary: str) -> Optional[AutoAnswerRule]:
+        """返回第一个命中的规则"""
+        if not self.rules:
+            return None
+        folded = summary.casefold() if self._needs_casefold else summary
+        for rule in self.rules:
+            if rule.literals:
+                text = folded if rule.ignore_case else summary
+                for literal in rule.literals:
+                    if literal in text:
+                        break
+                else:
+                    continue
+            if rule.regex.search(summary):
+                return rule
+        return None
+
+
+_EMPTY_ENGINE = AutoAnswerEngine([])
+
+
+class AutoAnswerRules:
+    """项目规则 + 全局规则；项目配置重新读取后才重新编译"""
+
+    def __init__(self, settings: ProjectSettings, global_rules: Any = None):
+        self._settings = settings
+        self._global_rules = compile_rules(global_rules, "global")
+        self._global_engine = AutoAnswerEngine(self._global_rules)
+        # 项目目录 -> (编译时的项目配置, 编译好的引擎)；配置文件变化后 ProjectSettings 返回新的配置对象
+        self._engines: Dict[str, Tuple[Dict[str, Any], AutoAnswerEngine]] = {}
+
+    def engine_for(self, project_directory: Optional[str]) -> AutoAnswerEngine:
+        """获取项目的规则引擎"""
+        if not project_directory:
+            return self._global_engine
+
+        config = self._settings.project_config(project_directory)
+        if not config:
+            self._engines.pop(project_directory, None)
+            return self._global_engine
+
+        cached = self._engines.get(project_directory)
+        if cached is not None and cached[0] is config:
+            return cached[1]
+
+        project_rules = self._project_rules(config)
+        # 项目中 auto_answer.enabled 为 false 时，全局规则也不生效
+        engine = AutoAnswerEngine(project_rules + self._global_rules) if project_rules is not None else _EMPTY_ENGINE
+        self._engines[project_directory] = (config, engine)
+        return engine
+
+    @staticmethod
+    def _project_rules(config: Dict[str, Any]) -> Optional[List[AutoAnswerRule]]:
+        """编译项目规则；项目禁用了自动应答时返回None"""
+        auto_answer = config.get("auto_answer")
+        if not isinstance(auto_answer, dict):
+            return []
+        if auto_answer.get("enabled") is False:
+            return None
+        return compile_rules(auto_answer.get("rules"), "project")
+
+    def match(self, summary: str, project_directory: Optional[str] = None) -> Optional[AutoAnswerRule]:
+        """返回第一个命中的规则，没有命中时返回None"""
+        return self.engine_for(project_directory).match(summary)
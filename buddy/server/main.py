@@ -1,28 +1,101 @@
 #!/usr/bin/env python3
 """FastMCP Server runner for Vibe Coding Buddy."""
-from fastmcp import FastMCP
-import subprocess
+from fastmcp import FastMCP, Context
+import argparse
+import asyncio
 import json
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Awaitable, Callable, Dict
 
 # 导入版本获取模块
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from core.version import get_app_version
+from ui.config import config_manager
+from core.ipc import Frame, FrameType
+from server.ui_daemon import DaemonError, get_answer_box_daemon
+from server.ui_logs import StderrCapture, get_ui_logger
+from server.ui_window import UIWindow, WindowClosed
+from server.metrics import CallTrace, current_call, mark_phase, metrics, set_call_outcome
+from server.sessions import FeedbackRouter, ProjectQueueFull
+from server.auto_answer import AutoAnswerRules
+from server.project_config import ProjectSettings
+# 进程池（pool模式）、中继（relay后端）和 TODO 索引（TODO 工具）只在使用时导入：IDE每次启动服务器都要等导入完成才能响应 initialize，
+# 启动时间的回归测试见 tests/test_startup.py
 
 from urllib.parse import unquote
 
+
+@asynccontextmanager
+async def _server_lifespan(server):
+    """会话建立时预热进程池，使第一次调用也能直接显示窗口"""
+    if _get_answer_backend() == "qt" and _get_ui_mode() == "pool":
+        _get_pool().start()
+    yield {}
+
+
 mcp = FastMCP(
     name="Vibe Coding Buddy",
     version=get_app_version(),
     instructions="This is a test server for Vibe Coding Buddy.",
+    lifespan=_server_lifespan,
 )
 
+# 项目根目录与UI脚本路径（从buddy/server/main.py回到根目录）
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+# VC_BUDDY_UI_SCRIPT 可替换为其他实现相同协议的脚本（例如压测用的自动应答脚本）
+UI_SCRIPT = Path(os.environ.get("VC_BUDDY_UI_SCRIPT") or PROJECT_ROOT / "buddy" / "ui" / "answer_box_qml.py")
+UI_HOST_SCRIPT = PROJECT_ROOT / "buddy" / "ui" / "ui_host.py"
+# 终端回答后端和脚本应答后端使用的脚本（不依赖Qt）
+TTY_UI_SCRIPT = PROJECT_ROOT / "buddy" / "ui" / "answer_tty.py"
+SCRIPTED_UI_SCRIPT = PROJECT_ROOT / "buddy" / "ui" / "answer_scripted.py"
+
+# 等待用户反馈的默认超时时间，10分钟；项目中可用 server.feedback_timeout 覆盖
+FEEDBACK_TIMEOUT = 600
+# 等待期间发送MCP进度通知的默认间隔（秒），0表示不发送；项目中可用 server.keepalive_interval 覆盖
+KEEPALIVE_INTERVAL = 15
+# 返回结果后等待UI进程自行退出的时间，超时后强制结束
+UI_EXIT_GRACE = 10
+# 请求被取消后等待UI进程关闭窗口退出的时间
+UI_CANCEL_GRACE = 2
+
+# 后台任务（进程回收等），保留引用避免被垃圾回收
+_background_tasks = set()
+
+# 各项目当前打开的反馈窗口（spawn/pool模式），同一项目的并发请求合并为窗口中的标签页
+_open_windows: Dict[str, UIWindow] = {}
+_window_locks: Dict[str, asyncio.Lock] = {}
+# 各项目正在使用窗口的请求数量，降为0时移除上面两项记录，避免服务器长期运行时无限增长
+_window_users: Dict[str, int] = {}
+
+# 按项目排队的反馈请求路由（HTTP/SSE模式下多个会话共享一个服务器）
+router = FeedbackRouter(
+    max_pending_per_project=config_manager.get("server.max_pending_per_project", 8)
+)
+
+# 可按项目覆盖的服务器设置（超时时间、保活间隔等）
+project_settings = ProjectSettings(config_manager)
+
+# 自动应答规则：项目 .vc-buddy/config.json 中的规则优先，其次是全局配置；项目配置通过 project_settings 读取
+auto_answers = AutoAnswerRules(
+    project_settings,
+    config_manager.get("auto_answer.rules", []) if config_manager.get("auto_answer.enabled", True) else [],
+)
+
+# 项目 TODO.md 的解析缓存，文件变化时重新解析；第一次调用 TODO 工具时创建
+_todo_index = None
+
+# 当前使用的传输方式，在 main() 中设置
+_transport = "stdio"
+
+
 @mcp.tool()
-def ask_for_feedback(
+async def ask_for_feedback(
     summary: str,
     project_directory: str = None,
+    ctx: Context = None,
 ) -> str:
     """
     向用户请求交互式反馈的工具。
@@ -48,77 +121,572 @@ def ask_for_feedback(
     if project_directory:
         project_directory = unquote(project_directory)
     
+    # 例行确认命中自动应答规则时直接返回预设答案，不打开窗口
+    rule = auto_answers.match(summary, project_directory)
+    if rule is not None:
+        metrics.increment("feedback.auto_answered")
+        metrics.increment(f"auto_answer.rule.{rule.name}")
+        print(f"DEBUG: 自动应答规则命中: {rule.name}", file=sys.stderr)
+        return json.dumps({"result": rule.answer}, ensure_ascii=False)
+    
     # 准备传递给answer_box的数据
     input_data = {"summary": summary, "project_directory": project_directory}
+    return await _dispatch_feedback(input_data, ctx)
+
+
+@mcp.tool()
+async def ask_questions(
+    questions: list,
+    summary: str = "",
+    project_directory: str = None,
+    ctx: Context = None,
+) -> str:
+    """
+    在同一个窗口中一次性向用户提出多个问题的工具。
     
-    # 获取当前脚本所在目录，确保正确的工作目录
-    current_dir = Path(__file__).parent.parent.parent  # 从buddy/server/main.py回到根目录
-    ui_script = current_dir / "buddy" / "ui" / "answer_box_qml.py"
+    **使用场景**：
+    1. 需要连续询问多个相互独立的问题时，合并为一次调用，避免多次弹窗
+    2. 需要用户在几组选项中分别做出选择时
     
-    # 确保UI脚本存在
-    if not ui_script.exists():
-        return json.dumps({"result": f"UI脚本不存在: {ui_script}"}, ensure_ascii=False)
+    **LLM调用指导**：
+    - questions 是问题列表，每一项可以是问题字符串，
+      也可以是 {"id": "...", "question": "...", "options": ["选项A", "选项B"]}
+    - 提供 options 时用户从中选择一项，否则自由输入
+    - id 可省略，默认按顺序为 q1、q2...
+    - summary 用于说明提问的背景，可为空
+    - project_directory用于指定项目目录， 要符合当前操作系统路径格式
     
+    Returns:
+        JSON格式的字符串：answers 字段按问题顺序给出 {"id", "question", "answer"}，
+        result 字段为用户额外填写的反馈（可能为空）
+    """
     try:
-        # 在Windows系统上设置编码环境变量
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
-        
-        # 启动 ui/answer_box.py,获取 stdout
-        process = subprocess.Popen(
-            [sys.executable, str(ui_script)], 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE, 
-            text=True,
-            encoding='utf-8',
-            env=env,  # 设置环境变量
-            cwd=str(current_dir),  # 设置正确的工作目录
-        )
+        normalized = _normalize_questions(questions)
+    except ValueError as e:
+        return json.dumps({"result": f"问题列表无效: {e}", "answers": []}, ensure_ascii=False)
+    
+    if project_directory:
+        project_directory = unquote(project_directory)
+    
+    input_data = {
+        "summary": summary or f"请回答以下 {len(normalized)} 个问题",
+        "project_directory": project_directory,
+        "questions": normalized,
+    }
+    output = await _dispatch_feedback(input_data, ctx)
+    return json.dumps(_collect_answers(normalized, json.loads(output)), ensure_ascii=False)
+
+
+def _get_todo_index():
+    """获取项目 TODO 索引（连同 TODO 解析器在第一次使用时导入）"""
+    global _todo_index
+    if _todo_index is None:
+        from server.todo_index import TodoIndex
+        _todo_index = TodoIndex()
+    return _todo_index
+
+
+@mcp.tool()
+def list_todos(project_directory: str, include_content: bool = False) -> str:
+    """
+    读取项目 TODO.md 中的任务树，不需要打开反馈窗口。
+
+    每个任务包含 path（序号路径，如 "2.1"）、title、done、attributes 和 children；
+    include_content 为 true 时附带任务的正文内容。
+
+    Returns:
+        JSON格式的字符串，包含 todos 字段；项目中没有 TODO.md 时包含 error 字段
+    """
+    project_directory = unquote(project_directory)
+    return _todo_response(lambda index: {"todos": index.list(project_directory, include_content)})
+
+
+@mcp.tool()
+def get_todo(project_directory: str, path: str) -> str:
+    """
+    按路径读取 TODO.md 中的一个任务及其子任务。
+
+    path 可以是序号路径（"2.1" 表示第2个顶级任务的第1个子任务），
+    也可以是用 / 分隔的标题路径（"功能/登录页面"）。
+
+    Returns:
+        JSON格式的字符串，包含任务的 path、title、done、attributes、content 和 children；
+        没有 TODO.md 或路径不存在时包含 error 字段
+    """
+    project_directory = unquote(project_directory)
+    return _todo_response(lambda index: index.get(project_directory, path))
+
+
+@mcp.tool()
+def set_todo_done(project_directory: str, path: str, done: bool = True) -> str:
+    """
+    把 TODO.md 中的任务标记为完成（done=true）或未完成（done=false），并写回文件。
+
+    path 的格式与 get_todo 相同。
+
+    Returns:
+        JSON格式的字符串，包含更新后的任务；没有 TODO.md、路径不存在或写入失败时包含 error 字段
+    """
+    project_directory = unquote(project_directory)
+    return _todo_response(lambda index: index.set_done(project_directory, path, done))
+
+
+def _todo_response(operation) -> str:
+    """执行 TODO 操作并返回JSON；项目没有 TODO.md、路径不存在或文件读写失败时返回 error 字段"""
+    try:
+        return json.dumps(operation(_get_todo_index()), ensure_ascii=False)
+    except (ValueError, OSError) as e:
+        print(f"DEBUG: TODO 操作失败: {e}", file=sys.stderr)
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+
+@mcp.resource("buddy://todos/{project_directory}", mime_type="application/json")
+def project_todos(project_directory: str) -> str:
+    """项目 TODO.md 的任务树（project_directory 需要URL编码）"""
+    return list_todos(project_directory)
+
+
+async def _dispatch_feedback(input_data: dict, ctx: Context) -> str:
+    """登记会话并按项目排队，把请求交给反馈窗口"""
+    project_directory = input_data.get("project_directory")
+    session_id, client_name = _identify_session(ctx)
+    router.register_session(session_id, client_name)
+    if _transport != "stdio":
+        # 多会话模式下在窗口标题中标明提问方
+        input_data["client"] = client_name
+    
+    project_key = os.path.normcase(os.path.abspath(project_directory)) if project_directory else ""
+    metrics.increment("feedback.requests")
+    # 记录各阶段耗时，UI各模式通过 mark_phase 补充时间戳
+    trace = CallTrace(os.path.basename(project_key))
+    token = current_call.set(trace)
+    outcome = "completed"
+    keepalive = _start_keepalive(ctx, project_directory)
+    try:
+        # 合并模式下同一项目的并发请求同时进入同一个窗口，否则依次显示
+        async with router.slot(project_key, session_id, exclusive=not _coalesce_requests()):
+            trace.mark("slot")
+            result = await _ask_ui(input_data, project_key)
+        metrics.increment("feedback.completed")
+        return result
+    except ProjectQueueFull as e:
+        outcome = "rejected"
+        metrics.increment("feedback.rejected")
+        return json.dumps({"result": f"反馈请求被拒绝: {e}"}, ensure_ascii=False)
+    except asyncio.CancelledError:
+        # IDE取消了工具调用或Agent放弃等待：各UI模式在自己的清理逻辑中立即关闭窗口，
+        # 排队位置随 router.slot 退出一并释放
+        outcome = "cancelled"
+        metrics.increment("feedback.cancelled")
+        print("DEBUG: 反馈请求已被客户端取消", file=sys.stderr)
+        raise
+    finally:
+        if keepalive is not None:
+            keepalive.cancel()
+        current_call.reset(token)
+        metrics.record_call(trace.finish(outcome))
+
+
+def _feedback_timeout(project_directory: str) -> float:
+    """等待用户反馈的超时时间（秒），可在项目配置中用 server.feedback_timeout 覆盖"""
+    return float(project_settings.get(project_directory, "server.feedback_timeout", FEEDBACK_TIMEOUT))
+
+
+def _start_keepalive(ctx: Context, project_directory: str):
+    """在等待用户期间定期发送进度通知；没有请求上下文或间隔为0时不发送"""
+    interval = float(project_settings.get(project_directory, "server.keepalive_interval", KEEPALIVE_INTERVAL))
+    if ctx is None or interval <= 0:
+        return None
+    timeout = _feedback_timeout(project_directory)
+    return asyncio.create_task(_keepalive(ctx, interval, timeout))
+
+
+async def _keepalive(ctx: Context, interval: float, timeout: float):
+    """用户长时间思考时连接上没有任何消息，部分MCP客户端会在我们的超时之前放弃工具调用。
+    定期发送进度通知（已等待秒数/超时秒数）让客户端知道请求仍在进行；
+    客户端没有提供 progressToken 时 report_progress 不会发送任何内容"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    while True:
+        await asyncio.sleep(interval)
+        waited = round(loop.time() - started)
+        try:
+            await ctx.report_progress(waited, timeout, f"等待用户反馈（已等待 {waited} 秒）")
+        except Exception as e:
+            # 连接已断开等情况，停止发送，不影响反馈请求本身
+            print(f"DEBUG: 无法发送进度通知: {e}", file=sys.stderr)
+            return
+        metrics.increment("feedback.keepalives")
+
+
+def _normalize_questions(questions: list) -> list:
+    """把问题列表统一为 {"id", "question", "options"} 的形式"""
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("至少需要一个问题")
+    
+    normalized = []
+    seen_ids = set()
+    for index, item in enumerate(questions, start=1):
+        if isinstance(item, str):
+            item = {"question": item}
+        if not isinstance(item, dict) or not str(item.get("question", "")).strip():
+            raise ValueError(f"第 {index} 项缺少问题内容")
         
-        # 发送输入数据
-        input_json = json.dumps(input_data, ensure_ascii=False)
-        print(f"DEBUG: 发送给UI的数据: {input_json}", file=sys.stderr)
+        question_id = str(item.get("id") or f"q{index}")
+        if question_id in seen_ids:
+            raise ValueError(f"问题ID重复: {question_id}")
+        seen_ids.add(question_id)
         
-        # 增加超时时间到10分钟，给用户足够时间输入
+        options = item.get("options") or []
+        if not isinstance(options, list):
+            raise ValueError(f"问题 {question_id} 的选项必须是列表")
+        normalized.append({
+            "id": question_id,
+            "question": str(item["question"]),
+            "options": [str(option) for option in options],
+        })
+    return normalized
+
+
+def _collect_answers(questions: list, response: dict) -> dict:
+    """按问题顺序整理窗口返回的答案；窗口未作答（关闭、超时、取消排队）时答案为空"""
+    answered = {}
+    for answer in response.get("answers") or []:
+        if isinstance(answer, dict) and "id" in answer:
+            answered[str(answer["id"])] = str(answer.get("answer") or "")
+    return {
+        "answers": [
+            {"id": q["id"], "question": q["question"], "answer": answered.get(q["id"], "")}
+            for q in questions
+        ],
+        "result": response.get("result", ""),
+    }
+
+
+def _identify_session(ctx: Context) -> tuple:
+    """返回 (会话ID, 客户端名称)；不在MCP请求上下文中时返回本地默认值"""
+    try:
+        session = ctx.session
+    except (AttributeError, LookupError, ValueError):
+        return "local", "local"
+    
+    client_name = "unknown"
+    params = getattr(session, "client_params", None)
+    if params is not None and params.clientInfo is not None:
+        client_name = params.clientInfo.name
+    return f"{id(session):x}", client_name
+
+
+# 回答后端：名称 -> 协程函数 (input_data, project_key) -> 结果JSON
+# 每个后端自行决定如何显示请求，返回的结果格式相同；新的后端用 @answer_backend 注册
+ANSWER_BACKENDS: Dict[str, Callable[[dict, str], Awaitable[str]]] = {}
+
+
+def answer_backend(name: str):
+    """注册回答后端的装饰器"""
+    def register(func):
+        ANSWER_BACKENDS[name] = func
+        return func
+    return register
+
+
+async def _ask_ui(input_data: dict, project_key: str = "") -> str:
+    """把请求交给当前配置的回答后端并等待结果"""
+    _ui_logger()
+    return await ANSWER_BACKENDS[_get_answer_backend()](input_data, project_key)
+
+
+def _get_answer_backend() -> str:
+    """回答后端：qt（图形窗口，默认）、tty（终端）、scripted（脚本自动回答）、relay（转发到另一台电脑）
+    或 auto（没有图形显示时使用终端）"""
+    name = os.environ.get("VC_BUDDY_ANSWER_BACKEND") or config_manager.get("server.answer_backend", "qt")
+    if name == "auto":
+        name = "qt" if _has_display() else "tty"
+    if name not in ANSWER_BACKENDS:
+        print(f"DEBUG: 未知的回答后端 {name}，使用 qt", file=sys.stderr)
+        name = "qt"
+    return name
+
+
+def _has_display() -> bool:
+    """是否能显示图形窗口；Linux 上没有 X11/Wayland（例如 SSH 登录）时返回False"""
+    if not sys.platform.startswith("linux"):
+        return True
+    return any(os.environ.get(name) for name in ("DISPLAY", "WAYLAND_DISPLAY", "QT_QPA_PLATFORM"))
+
+
+@answer_backend("qt")
+async def _ask_via_qt(input_data: dict, project_key: str = "") -> str:
+    """在Qt反馈窗口中显示请求，按 ui_mode 选择进程的管理方式"""
+    # 常驻宿主模式：复用已经启动的UI进程，失败时退回到每次启动新进程
+    if _get_ui_mode() == "daemon":
+        daemon = get_answer_box_daemon(UI_HOST_SCRIPT, PROJECT_ROOT)
         try:
-            stdout, stderr = process.communicate(input=input_json, timeout=600)  # 10分钟超时
-        except subprocess.TimeoutExpired:
-            print("DEBUG: UI进程超时，用户可能没有及时响应", file=sys.stderr)
-            process.kill()
+            result = await daemon.ask(input_data, timeout=_feedback_timeout(input_data.get("project_directory")),
+                                      on_frame=_log_ui_frame)
+            return json.dumps(result, ensure_ascii=False)
+        except asyncio.TimeoutError:
+            print("DEBUG: UI宿主超时，用户可能没有及时响应", file=sys.stderr)
+            metrics.increment("feedback.timeouts")
+            set_call_outcome("timeout")
             return json.dumps({"result": "UI界面超时关闭"}, ensure_ascii=False)
-        
-        # 如果有错误输出，记录它
-        if stderr:
-            print(f"UI进程错误输出: {stderr}", file=sys.stderr)
-        
-        print(f"DEBUG: UI进程返回数据: {stdout}", file=sys.stderr)
-        
-        # 处理返回结果
-        if stdout and stdout.strip():
-            # 从输出中提取JSON部分（可能混合了其他日志信息）
-            lines = stdout.strip().split('\n')
-            
-            # 查找包含JSON的行
-            for line in lines:
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    try:
-                        # 验证是否为有效JSON并直接返回
-                        json.loads(line)  # 验证JSON有效性
-                        print(f"DEBUG: 返回UI的JSON: {line}", file=sys.stderr)
-                        return line
-                    except json.JSONDecodeError:
-                        continue
-            
-            # 如果没有找到有效JSON，说明UI出错了
-            print(f"DEBUG: UI未返回有效JSON，原始输出: {stdout}", file=sys.stderr)
-            return json.dumps({"result": f"UI返回格式错误: {stdout.strip()}"}, ensure_ascii=False)
-        else:
-            return json.dumps({"result": ""}, ensure_ascii=False)
-            
+        except (DaemonError, OSError) as e:
+            print(f"DEBUG: UI宿主不可用，改为启动独立进程: {e}", file=sys.stderr)
+    
+    # 预热进程池模式：取出一个已加载好的UI进程，后台补充新的进程
+    elif _get_ui_mode() == "pool":
+        from server.ui_pool import PoolError
+        try:
+            return await _ask_window(input_data, project_key, _open_pool_window)
+        except (PoolError, WindowClosed, OSError) as e:
+            print(f"DEBUG: 预热进程不可用，改为启动独立进程: {e}", file=sys.stderr)
+    
+    return await _ask_via_spawn(input_data, project_key)
+
+
+@answer_backend("tty")
+async def _ask_via_tty(input_data: dict, project_key: str = "") -> str:
+    """在终端中显示请求（ui/answer_tty.py，不加载Qt），适用于SSH等没有图形界面的环境"""
+    return await _ask_via_script(TTY_UI_SCRIPT, "tty", input_data, project_key)
+
+
+@answer_backend("scripted")
+async def _ask_via_scripted(input_data: dict, project_key: str = "") -> str:
+    """按 VC_BUDDY_ANSWER_SCRIPT 指定的脚本自动回答（ui/answer_scripted.py），用于压测和无人值守的测试"""
+    return await _ask_via_script(SCRIPTED_UI_SCRIPT, "scripted", input_data, project_key)
+
+
+@answer_backend("relay")
+async def _ask_via_relay(input_data: dict, project_key: str = "") -> str:
+    """通过TCP长连接把请求转发给另一台电脑上的中继宿主（server/relay.py），窗口显示在那台电脑上"""
+    from server.relay import RelayUnavailable
+    try:
+        result = await _get_relay().ask(input_data, timeout=_feedback_timeout(input_data.get("project_directory")),
+                                        on_frame=_log_ui_frame)
+    except asyncio.TimeoutError:
+        print("DEBUG: 中继请求超时，用户可能没有及时响应", file=sys.stderr)
+        metrics.increment("feedback.timeouts")
+        set_call_outcome("timeout")
+        result = {"result": "UI界面超时关闭"}
+    except RelayUnavailable as e:
+        print(f"DEBUG: {e}", file=sys.stderr)
+        result = {"result": f"反馈窗口中继不可用: {e}"}
+    return json.dumps(result, ensure_ascii=False)
+
+
+_relay_client = None
+
+
+def _get_relay():
+    """按配置获取中继连接（整个服务器共用一条连接）"""
+    global _relay_client
+    if _relay_client is None:
+        from server.relay import RelayClient, parse_address
+        host, port = parse_address(
+            os.environ.get("VC_BUDDY_RELAY") or config_manager.get("server.relay.address", "127.0.0.1:8765")
+        )
+        _relay_client = RelayClient(
+            host, port,
+            token=os.environ.get("VC_BUDDY_RELAY_TOKEN") or config_manager.get("server.relay.token", ""),
+            heartbeat_interval=float(config_manager.get("server.relay.heartbeat_interval", 10)),
+            heartbeat_timeout=float(config_manager.get("server.relay.heartbeat_timeout", 30)),
+        )
+    return _relay_client
+
+
+async def _ask_via_script(script: Path, label: str, input_data: dict, project_key: str) -> str:
+    """由实现了 --ipc 协议的其他脚本回答请求"""
+    try:
+        # 窗口按后端分开记录，切换后端时不会把请求合并到另一种窗口中
+        return await _ask_window(input_data, f"{label}:{project_key}",
+                                 lambda: _open_spawn_window(script, label))
+    except Exception as e:
+        return json.dumps({"result": f"启动{label}界面时出错: {str(e)}"}, ensure_ascii=False)
+
+
+def _get_ui_mode() -> str:
+    """UI运行模式：daemon（常驻宿主进程，默认）、pool（预热进程池）或 spawn（每次调用启动新进程）"""
+    return os.environ.get("VC_BUDDY_UI_MODE") or config_manager.get("server.ui_mode", "daemon")
+
+
+def _coalesce_requests() -> bool:
+    """同一项目的并发请求是否合并到同一个窗口（每个请求一个标签页）"""
+    return bool(config_manager.get("server.coalesce_requests", True))
+
+
+def _get_pool():
+    """按配置获取预热进程池"""
+    from server.ui_pool import get_answer_box_pool
+    _ui_logger()
+    return get_answer_box_pool(
+        UI_SCRIPT, PROJECT_ROOT,
+        size=int(config_manager.get("server.pool.size", 2)),
+        max_idle_memory_mb=float(config_manager.get("server.pool.max_idle_memory_mb", 0)),
+    )
+
+
+@mcp.resource("buddy://metrics", mime_type="application/json")
+def server_metrics() -> str:
+    """服务器运行指标：反馈请求的完成、取消、超时和拒绝次数，各阶段耗时的分位数，以及会话和项目队列的状态"""
+    return json.dumps({**metrics.snapshot(), "router": router.status()}, ensure_ascii=False)
+
+
+@mcp.resource("buddy://metrics/calls", mime_type="application/json")
+def call_metrics() -> str:
+    """反馈调用各阶段（排队、启动窗口、首帧、用户交互、返回、进程退出）的耗时直方图和最近的调用"""
+    return json.dumps(metrics.calls_snapshot(), ensure_ascii=False)
+
+
+@mcp.resource("buddy://ui-pool", mime_type="application/json")
+def ui_pool_status() -> str:
+    """预热进程池状态：池大小、空闲进程数量及其内存占用"""
+    if _get_ui_mode() != "pool":
+        return json.dumps({"enabled": False}, ensure_ascii=False)
+    return json.dumps({"enabled": True, **_get_pool().status()}, ensure_ascii=False)
+
+
+async def _ask_via_spawn(input_data: dict, project_key: str = "") -> str:
+    """在项目的窗口中显示请求；没有打开的窗口时启动一个新的answer_box进程"""
+    # 确保UI脚本存在
+    if not UI_SCRIPT.exists():
+        return json.dumps({"result": f"UI脚本不存在: {UI_SCRIPT}"}, ensure_ascii=False)
+    
+    try:
+        return await _ask_window(input_data, project_key, _open_spawn_window)
     except Exception as e:
         return json.dumps({"result": f"启动UI时出错: {str(e)}"}, ensure_ascii=False)
 
+
+async def _ask_window(input_data: dict, project_key: str,
+                      open_window: Callable[[], Awaitable[UIWindow]]) -> str:
+    """把请求交给项目当前打开的窗口，没有时用 open_window 打开一个"""
+    print(f"DEBUG: 发送给UI的数据: {json.dumps(input_data, ensure_ascii=False)}", file=sys.stderr)
+    timeout = _feedback_timeout(input_data.get("project_directory"))
+    _window_users[project_key] = _window_users.get(project_key, 0) + 1
+    try:
+        window = await _get_window(project_key, open_window)
+        try:
+            # 收到结果帧立即返回，不等待Qt应用退出；超时时间默认10分钟，给用户足够时间输入
+            result = await window.ask(input_data, timeout=timeout)
+        except WindowClosed:
+            # 窗口恰好在此时退出（例如用户刚关闭了窗口），换一个新窗口
+            window = await _get_window(project_key, open_window)
+            result = await window.ask(input_data, timeout=timeout)
+    except asyncio.TimeoutError:
+        print("DEBUG: UI进程超时，用户可能没有及时响应", file=sys.stderr)
+        metrics.increment("feedback.timeouts")
+        set_call_outcome("timeout")
+        result = {"result": "UI界面超时关闭"}
+    finally:
+        _release_window(project_key)
+    
+    output = json.dumps(result, ensure_ascii=False)
+    print(f"DEBUG: 返回UI的JSON: {output}", file=sys.stderr)
+    return output
+
+
+async def _get_window(project_key: str, open_window: Callable[[], Awaitable[UIWindow]]) -> UIWindow:
+    """获取项目当前打开的窗口；同一项目同时只打开一个"""
+    lock = _window_locks.setdefault(project_key, asyncio.Lock())
+    async with lock:
+        window = _open_windows.get(project_key)
+        if window is not None and window.accepting:
+            metrics.increment("feedback.coalesced")
+            print(f"DEBUG: 请求合并到已打开的窗口（已有 {window.pending_count} 个请求）", file=sys.stderr)
+            mark_phase("window_reused")
+            return window
+        window = await open_window()
+        mark_phase("window_opened")
+        _open_windows[project_key] = window
+        return window
+
+
+def _release_window(project_key: str):
+    """项目的最后一个请求结束时移除窗口和锁的记录（窗口此时已不再接收请求，由后台回收）"""
+    _window_users[project_key] -= 1
+    if _window_users[project_key] == 0:
+        del _window_users[project_key]
+        _open_windows.pop(project_key, None)
+        _window_locks.pop(project_key, None)
+
+
+async def _open_spawn_window(script: Path = None, label: str = "spawn") -> UIWindow:
+    """启动UI脚本（默认 ui/answer_box_qml.py），通过管道以帧的形式异步交换数据"""
+    # 在Windows系统上设置编码环境变量
+    env = os.environ.copy()
+    env['PYTHONIOENCODING'] = 'utf-8'
+    
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(script or UI_SCRIPT), "--ipc",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        stdin=asyncio.subprocess.PIPE,
+        env=env,  # 设置环境变量
+        cwd=str(PROJECT_ROOT),  # 设置正确的工作目录
+    )
+    # stderr异步写入轮转日志，内存中只保留末尾几行
+    capture = StderrCapture(f"{label}:{process.pid}", _ui_logger())
+    stderr_task = asyncio.create_task(capture.drain(process.stderr))
+    return UIWindow(
+        process, capture, stderr_task,
+        run_in_background=_run_in_background, on_frame=_log_ui_frame,
+        exit_grace=UI_EXIT_GRACE, cancel_grace=UI_CANCEL_GRACE,
+    )
+
+
+async def _open_pool_window() -> UIWindow:
+    """从预热进程池取出一个窗口"""
+    return await _get_pool().open_window(on_frame=_log_ui_frame)
+
+
+def _ui_logger():
+    """按配置创建UI子进程的轮转日志"""
+    log_dir = config_manager.get("server.ui_log.dir")
+    return get_ui_logger(
+        log_dir=Path(log_dir).expanduser() if log_dir else None,
+        max_bytes=int(config_manager.get("server.ui_log.max_bytes", 1024 * 1024)),
+        backup_count=int(config_manager.get("server.ui_log.backup_count", 3)),
+    )
+
+
+def _run_in_background(coro):
+    """在后台运行协程，并保留引用直到完成"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _log_ui_frame(frame: Frame):
+    """记录窗口上报的进度/草稿帧"""
+    if frame.type == FrameType.PROGRESS:
+        print(f"DEBUG: UI进度: {frame.payload.get('stage')}", file=sys.stderr)
+    elif frame.type == FrameType.DRAFT:
+        print(f"DEBUG: UI草稿: {len(frame.payload.get('text', ''))} 字符", file=sys.stderr)
+
+def main():
+    """命令行入口：默认使用stdio，也可以作为HTTP/SSE服务供多个客户端共享"""
+    global _transport
+    
+    parser = argparse.ArgumentParser(description="Vibe Coding Buddy MCP 服务器")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "sse", "streamable-http"],
+        default=os.environ.get("VC_BUDDY_TRANSPORT") or config_manager.get("server.transport", "stdio"),
+        help="MCP传输方式",
+    )
+    parser.add_argument("--host", default=config_manager.get("server.host", "127.0.0.1"),
+                        help="HTTP/SSE模式的监听地址")
+    parser.add_argument("--port", type=int, default=config_manager.get("server.port", 8000),
+                        help="HTTP/SSE模式的监听端口")
+    args = parser.parse_args()
+    
+    _transport = args.transport
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        mcp.run(transport=args.transport, host=args.host, port=args.port)
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    main()
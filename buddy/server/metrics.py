@@ -0,0 +1,194 @@
+"""服务器运行指标
+
+记录反馈请求的完成、取消、超时和拒绝次数，通过 MCP 资源 buddy://metrics 查看。
+
+每次 ask_for_feedback 调用还会记录各阶段的耗时，用于定位一次往返的时间花在哪里：
+
+- queue：在项目队列中等待
+- spawn：打开窗口（启动新的UI进程，或复用已打开的窗口/宿主进程）
+- first_frame：请求发出到窗口上报第一帧（窗口显示出来）
+- interaction：窗口显示到结果帧返回（用户阅读和输入）
+- return：结果帧到达到工具调用返回
+- total：整个调用
+- exit：窗口的请求全部完成后，UI进程退出所用的时间（按窗口记录）
+
+最近的调用保存在环形缓冲区中，各阶段的耗时汇总为直方图，通过 buddy://metrics/calls 查看。
+"""
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# 环形缓冲区保留的最近调用数
+RECENT_CALLS = 256
+# 直方图的桶上界（毫秒），最后一个桶收集更长的耗时
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 300000)
+# 阶段名 -> (起点标记, 终点标记)；每端可以有多个候选，取第一个存在的
+PHASES = {
+    "queue": (("start",), ("slot",)),
+    "spawn": (("slot",), ("window_opened", "window_reused")),
+    "first_frame": (("request_sent",), ("first_frame",)),
+    "interaction": (("first_frame", "request_sent"), ("result_frame",)),
+    "return": (("result_frame",), ("done",)),
+    "total": (("start",), ("done",)),
+}
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图（毫秒）"""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, ms: float):
+        self.buckets[bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """估算分位数：返回所在桶的上界（不超过最大值）"""
+        if not self.count:
+            return None
+        rank = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return round(min(upper, self.max), 1)
+        return round(self.max, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "min_ms": round(self.min, 1) if self.min is not None else None,
+            "max_ms": round(self.max, 1) if self.max is not None else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "buckets": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(list(self.bounds) + [None], self.buckets)
+            ],
+        }
+
+
+class CallTrace:
+    """一次反馈调用的阶段时间戳"""
+
+    def __init__(self, project: str = ""):
+        self.project = project
+        self.started_at = time.time()
+        self.outcome = ""
+        self.phases: Dict[str, float] = {}
+        self._marks: Dict[str, float] = {"start": time.perf_counter()}
+
+    def mark(self, name: str):
+        """记录阶段时间戳；同名阶段只记录第一次"""
+        self._marks.setdefault(name, time.perf_counter())
+
+    def finish(self, outcome: str) -> "CallTrace":
+        """结束调用并计算各阶段耗时"""
+        self.mark("done")
+        self.outcome = self.outcome or outcome
+        for phase, (starts, ends) in PHASES.items():
+            start = next((self._marks[s] for s in starts if s in self._marks), None)
+            end = next((self._marks[e] for e in ends if e in self._marks), None)
+            if start is not None and end is not None:
+                self.phases[phase] = round((end - start) * 1000, 1)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": round(self.started_at, 3),
+            "project": self.project,
+            "outcome": self.outcome,
+            "spawned": "window_opened" in self._marks,
+            "phases_ms": dict(self.phases),
+        }
+
+
+# 当前任务正在处理的调用，UI各模式通过 mark_phase 记录时间戳
+current_call: ContextVar[Optional[CallTrace]] = ContextVar("current_call", default=None)
+
+
+def mark_phase(name: str):
+    """为当前调用记录阶段时间戳（没有正在记录的调用时忽略）"""
+    trace = current_call.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+def set_call_outcome(outcome: str):
+    """标记当前调用的结果（例如超时）"""
+    trace = current_call.get()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+class ServerMetrics:
+    """进程内计数器与调用耗时"""
+
+    def __init__(self, recent_calls: int = RECENT_CALLS):
+        self.started_at = time.time()
+        self._counters: Counter = Counter()
+        self._recent: deque = deque(maxlen=recent_calls)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def increment(self, name: str, amount: int = 1):
+        self._counters[name] += amount
+
+    def get(self, name: str) -> int:
+        return self._counters[name]
+
+    def observe(self, phase: str, ms: float):
+        """记录一个阶段的耗时"""
+        histogram = self._histograms.get(phase)
+        if histogram is None:
+            histogram = self._histograms[phase] = LatencyHistogram()
+        histogram.observe(ms)
+
+    def record_call(self, trace: CallTrace):
+        """保存一次调用的阶段耗时"""
+        self._recent.append(trace)
+        for phase, ms in trace.phases.items():
+            self.observe(phase, ms)
+
+    def histogram(self, phase: str) -> Optional[LatencyHistogram]:
+        return self._histograms.get(phase)
+
+    def recent_calls(self) -> List[Dict[str, Any]]:
+        return [trace.to_dict() for trace in self._recent]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前指标快照"""
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "counters": dict(sorted(self._counters.items())),
+            "phases": {phase: h.summary() for phase, h in sorted(self._histograms.items())},
+        }
+
+    def calls_snapshot(self) -> Dict[str, Any]:
+        """最近调用与完整直方图"""
+        return {
+            "histograms": {phase: h.to_dict() for phase, h in sorted(self._histograms.items())},
+            "recent_calls": self.recent_calls(),
+        }
+
+
+# 服务器进程内共享的指标
+metrics = ServerMetrics()
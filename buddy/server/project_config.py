@@ -0,0 +1,73 @@
+"""项目级服务器设置
+
+部分服务器设置可以在项目的 .vc-buddy/config.json 中覆盖，例如等待反馈的超时时间：
+
+    "server": {
+        "feedback_timeout": 1800,
+        "keepalive_interval": 15
+    }
+
+项目中没有设置的项使用全局配置。每次反馈请求都会读取这些设置，
+因此项目配置文件按 mtime/大小缓存，文件变化时才重新读取。
+同一文件中的其他部分（如 auto_answer 规则）也通过 project_config() 读取，共用这份缓存。
+"""
+import os
+import sys
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_MISSING = object()
+
+
+class ProjectSettings:
+    """项目配置 + 全局配置；项目配置文件变化时才重新读取"""
+
+    def __init__(self, global_config):
+        self._global_config = global_config
+        # 项目配置文件路径 -> ((mtime_ns, size), 配置内容)
+        self._cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+    def get(self, project_directory: Optional[str], key_path: str, default=None):
+        """读取设置（点分隔的路径），项目配置优先"""
+        value = _lookup(self.project_config(project_directory), key_path)
+        if value is _MISSING:
+            return self._global_config.get(key_path, default)
+        return value
+
+    def project_config(self, project_directory: Optional[str]) -> Dict[str, Any]:
+        """项目配置文件的内容；文件不变时返回同一个对象（调用方不应修改），文件不存在或无效时返回空字典"""
+        if not project_directory:
+            return {}
+
+        config_path = str(Path(project_directory) / ".vc-buddy" / "config.json")
+        try:
+            stat = os.stat(config_path)
+        except OSError:
+            self._cache.pop(config_path, None)
+            return {}
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(config_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"DEBUG: 无法读取项目配置 {config_path}: {e}", file=sys.stderr)
+            config = {}
+        if not isinstance(config, dict):
+            config = {}
+        self._cache[config_path] = (key, config)
+        return config
+
+
+def _lookup(config: Dict[str, Any], key_path: str):
+    value = config
+    for key in key_path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
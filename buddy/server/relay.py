@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""远程反馈窗口中继
+
+Agent 和 MCP 服务器运行在远程开发机上，反馈窗口显示在本地电脑上，不需要通过 SSH X 转发 Qt 窗口：
+
+    本地电脑:   python buddy/server/relay.py --listen 127.0.0.1:8765 --token <token>
+                ssh -R 8765:127.0.0.1:8765 devbox
+    远程开发机: VC_BUDDY_ANSWER_BACKEND=relay VC_BUDDY_RELAY_TOKEN=<token>（或配置 server.answer_backend / server.relay.token）
+
+- 服务器（RelayClient）与本地的中继宿主（RelayHost）保持一条 TCP 长连接，帧格式见 buddy/core/ipc.py
+- 连接建立时双方交换 READY 帧，服务器在其中携带 token，宿主校验不通过时发送带 error 的 CANCEL 帧并断开。
+  转发到开发机上的端口对开发机上的其他用户同样可达，因此宿主必须设置 token：未指定时启动时随机生成并打印
+- 多个请求在同一条连接上按 request_id 复用，进度帧和结果帧都带回 request_id
+- 服务器定期发送 PING，宿主回复 PONG；任一方向超过心跳超时没有收到数据即认为连接已断开
+- 断线后服务器按指数退避重连，并重新发送尚未完成的请求；宿主按 request_id 去重，
+  窗口保持显示，断线期间完成的结果在重连后补发。超过 resume 时间仍未重连的请求被取消
+- 宿主默认通过常驻宿主进程 buddy/ui/ui_host.py 显示 Qt 窗口
+"""
+import argparse
+import asyncio
+import hmac
+import os
+import secrets
+import sys
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    from ..core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))  # 添加buddy目录到路径
+    from core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+
+# 心跳间隔与超时（秒）
+HEARTBEAT_INTERVAL = 10.0
+HEARTBEAT_TIMEOUT = 30.0
+# 连接与握手超时（秒）
+CONNECT_TIMEOUT = 5.0
+# 重连退避的初始值和上限（秒）
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 10.0
+# 宿主侧：连接断开后等待服务器重连、继续保留请求的时间（秒）
+RESUME_TIMEOUT = 60.0
+# 宿主侧：单个请求的最长显示时间（由服务器负责超时并发送CANCEL，这里只是兜底）
+HOST_ANSWER_TIMEOUT = 24 * 3600
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+UI_HOST_SCRIPT = PROJECT_ROOT / "buddy" / "ui" / "ui_host.py"
+
+
+class RelayUnavailable(Exception):
+    """无法连接到中继宿主"""
+
+
+class RelayRejected(Exception):
+    """中继宿主拒绝了连接（例如 token 不匹配）"""
+
+
+def parse_address(address: str, default_port: int = 8765) -> tuple:
+    """把 "host:port" 解析为 (host, port)"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address or "127.0.0.1", default_port
+    return host.strip("[]"), int(port)
+
+
+@dataclass
+class _PendingRequest:
+    payload: Dict[str, Any]
+    future: asyncio.Future
+    on_frame: Optional[Callable[[Frame], None]] = None
+
+
+class RelayClient:
+    """服务器侧：通过一条长连接把请求转发给远端的中继宿主"""
+
+    def __init__(self, host: str, port: int, token: str = "",
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+                 connect_timeout: float = CONNECT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.connect_timeout = connect_timeout
+        self.connections = 0
+        self.last_error = ""
+        self._pending: Dict[str, _PendingRequest] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def start(self):
+        """在当前事件循环中启动连接任务（已启动时不重复启动）"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._connected = asyncio.Event()
+        self._writer = None
+        self._task = loop.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def ask(self, input_data: Dict[str, Any], timeout: float,
+                  on_frame: Optional[Callable[[Frame], None]] = None) -> Dict[str, Any]:
+        """转发请求并等待结果
+
+        连接不上中继宿主时抛出 RelayUnavailable；超时抛出 asyncio.TimeoutError。
+        请求发出后连接断开不影响等待：重连后请求会被重新发送。
+        """
+        self.start()
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise RelayUnavailable(f"无法连接到中继宿主 {self.host}:{self.port}: {self.last_error or '连接超时'}")
+
+        request_id = uuid.uuid4().hex
+        payload = {**input_data, "request_id": request_id}
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = _PendingRequest(payload, future, on_frame)
+        try:
+            self._send(FrameType.REQUEST, payload)
+            return await asyncio.wait_for(future, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # 调用方不再等待：通知宿主关闭对应的窗口
+            self._send(FrameType.CANCEL, {"request_id": request_id})
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _send(self, frame_type: int, payload: Dict[str, Any]):
+        """写入一帧；未连接时忽略（未完成的请求在重连后重新发送）"""
+        if self._writer is None or self._writer.is_closing():
+            return
+        try:
+            self._writer.write(encode_frame(frame_type, payload))
+        except (ConnectionError, RuntimeError) as e:
+            print(f"DEBUG: 写入中继连接失败: {e}", file=sys.stderr)
+
+    async def _run(self):
+        """保持连接：断开后按指数退避重连"""
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.last_error = str(e) or type(e).__name__
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                continue
+
+            try:
+                await self._handshake(reader, writer)
+            except (OSError, asyncio.TimeoutError, IPCError, RelayRejected) as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"DEBUG: 中继握手失败: {self.last_error}", file=sys.stderr)
+                writer.close()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                continue
+
+            delay = RECONNECT_MIN_DELAY
+            self.connections += 1
+            self._writer = writer
+            self._connected.set()
+            print(f"DEBUG: 已连接到中继宿主 {self.host}:{self.port}", file=sys.stderr)
+            # 重新发送断线前未完成的请求，宿主按 request_id 去重
+            for pending in list(self._pending.values()):
+                self._send(FrameType.REQUEST, pending.payload)
+            try:
+                await self._serve(reader, writer)
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+            print("DEBUG: 中继连接已断开，准备重连", file=sys.stderr)
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write(encode_frame(FrameType.READY, {"token": self.token}))
+        await writer.drain()
+        frame = await asyncio.wait_for(read_frame_async(reader), timeout=self.connect_timeout)
+        if frame is None:
+            raise RelayRejected("中继宿主关闭了连接")
+        if frame.type != FrameType.READY:
+            raise RelayRejected(frame.payload.get("error") or f"意外的帧类型 {frame.type}")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """读取结果与进度帧，同时发送心跳；超过心跳超时没有收到数据则断开"""
+        heartbeat = asyncio.create_task(self._heartbeat(writer))
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(read_frame_async(reader), timeout=self.heartbeat_timeout)
+                except asyncio.TimeoutError:
+                    print("DEBUG: 中继心跳超时", file=sys.stderr)
+                    return
+                except (IPCError, ConnectionError) as e:
+                    print(f"DEBUG: 中继连接出错: {e}", file=sys.stderr)
+                    return
+                if frame is None:
+                    return
+                if frame.type == FrameType.PONG:
+                    continue
+                pending = self._pending.get(frame.payload.get("request_id"))
+                if pending is None:
+                    continue
+                if frame.type == FrameType.RESULT:
+                    frame.payload.pop("request_id", None)
+                    if not pending.future.done():
+                        pending.future.set_result(frame.payload)
+                elif pending.on_frame is not None:
+                    pending.on_frame(frame)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, writer: asyncio.StreamWriter):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self._send(FrameType.PING, {})
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+
+@dataclass
+class _HostedRequest:
+    request_id: str
+    writer: Optional[asyncio.StreamWriter] = None
+    task: Optional[asyncio.Task] = None
+    result: Optional[Dict[str, Any]] = None
+    orphan_timer: Optional[asyncio.TimerHandle] = field(default=None, repr=False)
+
+
+AnswerFunc = Callable[[Dict[str, Any], Callable[[Frame], None]], Awaitable[Dict[str, Any]]]
+
+
+class RelayHost:
+    """本地电脑侧：接收服务器转发的请求并显示反馈窗口"""
+
+    def __init__(self, answer: AnswerFunc, token: str,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT, resume_timeout: float = RESUME_TIMEOUT):
+        if not token:
+            raise ValueError("中继宿主必须设置 token")
+        self._answer = answer
+        self.token = token
+        self.heartbeat_timeout = heartbeat_timeout
+        self.resume_timeout = resume_timeout
+        self._requests: Dict[str, _HostedRequest] = {}
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        try:
+            hello = await asyncio.wait_for(read_frame_async(reader), timeout=CONNECT_TIMEOUT)
+        except (asyncio.TimeoutError, IPCError, ConnectionError):
+            writer.close()
+            return
+        if hello is None or hello.type != FrameType.READY or not self._check_token(hello.payload.get("token")):
+            print(f"DEBUG: 拒绝中继连接 {peer}: token 不匹配", file=sys.stderr)
+            writer.write(encode_frame(FrameType.CANCEL, {"error": "token 不匹配"}))
+            writer.close()
+            return
+        writer.write(encode_frame(FrameType.READY, {}))
+        print(f"DEBUG: 服务器已连接 {peer}", file=sys.stderr)
+
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(read_frame_async(reader), timeout=self.heartbeat_timeout)
+                except (asyncio.TimeoutError, IPCError, ConnectionError) as e:
+                    print(f"DEBUG: 服务器连接 {peer} 中断: {e or type(e).__name__}", file=sys.stderr)
+                    break
+                if frame is None:
+                    break
+                if frame.type == FrameType.PING:
+                    writer.write(encode_frame(FrameType.PONG, {}))
+                elif frame.type == FrameType.REQUEST:
+                    self._on_request(frame.payload, writer)
+                elif frame.type == FrameType.CANCEL:
+                    self._cancel(frame.payload.get("request_id"))
+        finally:
+            self._detach(writer)
+            writer.close()
+
+    def _check_token(self, token: Any) -> bool:
+        """常量时间比较，避免通过响应时间逐字节猜测 token"""
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def _on_request(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        request_id = payload.pop("request_id", None) or uuid.uuid4().hex
+        hosted = self._requests.get(request_id)
+        if hosted is not None:
+            # 重连后重新发送的请求：窗口已经在显示，只需把结果改为发往新的连接
+            hosted.writer = writer
+            if hosted.orphan_timer is not None:
+                hosted.orphan_timer.cancel()
+                hosted.orphan_timer = None
+            if hosted.result is not None:
+                self._deliver(hosted)
+            return
+        hosted = _HostedRequest(request_id, writer)
+        self._requests[request_id] = hosted
+        hosted.task = asyncio.create_task(self._answer_request(hosted, payload))
+
+    async def _answer_request(self, hosted: _HostedRequest, input_data: Dict[str, Any]):
+        def forward(frame: Frame):
+            self._write(hosted, frame.type, {**frame.payload, "request_id": hosted.request_id})
+
+        try:
+            result = await self._answer(input_data, forward)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"DEBUG: 显示反馈窗口失败: {e}", file=sys.stderr)
+            result = {"result": f"中继宿主显示窗口失败: {e}"}
+        hosted.result = result
+        if hosted.writer is not None:
+            self._deliver(hosted)
+
+    def _deliver(self, hosted: _HostedRequest):
+        self._write(hosted, FrameType.RESULT, {**hosted.result, "request_id": hosted.request_id})
+        self._requests.pop(hosted.request_id, None)
+
+    def _write(self, hosted: _HostedRequest, frame_type: int, payload: Dict[str, Any]):
+        if hosted.writer is None or hosted.writer.is_closing():
+            return
+        hosted.writer.write(encode_frame(frame_type, payload))
+
+    def _cancel(self, request_id: Optional[str]):
+        hosted = self._requests.pop(request_id, None)
+        if hosted is None:
+            return
+        if hosted.orphan_timer is not None:
+            hosted.orphan_timer.cancel()
+        if hosted.task is not None:
+            hosted.task.cancel()
+
+    def _detach(self, writer: asyncio.StreamWriter):
+        """连接断开：保留其请求等待服务器重连，超时后取消"""
+        loop = asyncio.get_running_loop()
+        for hosted in list(self._requests.values()):
+            if hosted.writer is writer:
+                hosted.writer = None
+                hosted.orphan_timer = loop.call_later(self.resume_timeout, self._cancel, hosted.request_id)
+
+
+def _ui_host_answer() -> AnswerFunc:
+    """通过本机常驻宿主进程显示 Qt 反馈窗口"""
+    try:
+        from .ui_daemon import get_answer_box_daemon
+    except ImportError:
+        from server.ui_daemon import get_answer_box_daemon
+
+    daemon = get_answer_box_daemon(UI_HOST_SCRIPT, PROJECT_ROOT)
+
+    async def answer(input_data: Dict[str, Any], on_frame: Callable[[Frame], None]) -> Dict[str, Any]:
+        return await daemon.ask(input_data, timeout=HOST_ANSWER_TIMEOUT, on_frame=on_frame)
+
+    return answer
+
+
+async def _serve_forever(args):
+    host, port = parse_address(args.listen)
+    relay = RelayHost(_ui_host_answer(), token=args.token)
+    server = await relay.serve(host, port)
+    print(f"中继宿主已启动: {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """本地电脑上运行的中继宿主"""
+    parser = argparse.ArgumentParser(description="Vibe Coding Buddy 远程反馈窗口中继宿主")
+    parser.add_argument("--listen", default="127.0.0.1:8765", help="监听地址 host:port")
+    parser.add_argument("--token", default=os.environ.get("VC_BUDDY_RELAY_TOKEN", ""),
+                        help="服务器连接时需要提供的 token，未指定时随机生成")
+    args = parser.parse_args()
+    if not args.token:
+        args.token = secrets.token_urlsafe(24)
+        print(f"未指定 --token，已生成: {args.token}\n"
+              f"请在服务器端设置 VC_BUDDY_RELAY_TOKEN={args.token}", file=sys.stderr)
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""反馈请求路由
+
+SSE / streamable-HTTP 模式下，同一个服务器会同时服务多个 IDE 窗口和 Agent。
+FeedbackRouter 负责：
+- 记录每个请求来自哪个会话，窗口标题据此标明提问方，结果原路返回给调用方
+- 每个项目同一时间只打开一个反馈窗口：独占模式下其余请求按到达顺序排队；
+  合并模式下并发请求同时进入同一个窗口（每个请求一个标签页）
+- 每个项目的排队长度有上限，超出时立即拒绝，避免请求无限堆积
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+
+class ProjectQueueFull(Exception):
+    """项目的反馈队列已满"""
+
+
+@dataclass
+class SessionInfo:
+    """一个MCP会话（一个IDE窗口或Agent连接）"""
+    session_id: str
+    client_name: str = "unknown"
+    first_seen: float = field(default_factory=time.time)
+    requests: int = 0
+
+
+@dataclass
+class _ProjectQueue:
+    """单个项目的排队状态"""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    waiting: int = 0
+    active: int = 0
+    # 正在处理的请求所属会话（合并模式下可能有多个，同一会话可能出现多次）
+    active_sessions: List[str] = field(default_factory=list)
+
+
+class FeedbackRouter:
+    """按项目排队反馈请求，并记录请求所属会话"""
+
+    # 最多记录的会话数量，超出后丢弃最早的会话记录
+    MAX_SESSIONS = 256
+
+    def __init__(self, max_pending_per_project: int = 8):
+        self.max_pending_per_project = max_pending_per_project
+        self._projects: Dict[str, _ProjectQueue] = {}
+        self._sessions: Dict[str, SessionInfo] = {}
+
+    def register_session(self, session_id: str, client_name: Optional[str] = None) -> SessionInfo:
+        """记录会话信息，返回会话对象"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            if len(self._sessions) >= self.MAX_SESSIONS:
+                oldest = min(self._sessions.values(), key=lambda s: s.first_seen)
+                del self._sessions[oldest.session_id]
+            session = SessionInfo(session_id=session_id, client_name=client_name or "unknown")
+            self._sessions[session_id] = session
+        return session
+
+    @asynccontextmanager
+    async def slot(self, project_key: str, session_id: str, exclusive: bool = True) -> AsyncIterator[int]:
+        """占用项目的反馈窗口，返回本请求之前已在处理或等待的请求数量
+
+        exclusive 为 True 时同一项目的请求依次处理；为 False 时并发处理（由窗口合并为标签页），
+        两种情况下处理中和等待中的请求总数都受 max_pending_per_project 限制。
+        队列已满时抛出 ProjectQueueFull。
+        """
+        queue = self._projects.setdefault(project_key, _ProjectQueue())
+        busy = queue.waiting + queue.active
+        if busy >= self.max_pending_per_project:
+            raise ProjectQueueFull(
+                f"项目 {project_key} 已有 {busy} 个反馈请求在等待，请稍后再试"
+            )
+
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.requests += 1
+
+        if exclusive:
+            queue.waiting += 1
+            try:
+                await queue.lock.acquire()
+            finally:
+                queue.waiting -= 1
+
+        queue.active += 1
+        queue.active_sessions.append(session_id)
+        try:
+            yield busy
+        finally:
+            queue.active -= 1
+            queue.active_sessions.remove(session_id)
+            if exclusive:
+                queue.lock.release()
+            if queue.active == 0 and queue.waiting == 0:
+                self._projects.pop(project_key, None)
+
+    def status(self) -> Dict[str, object]:
+        """当前会话与各项目队列的快照（MCP资源 buddy://metrics 的 router 字段）"""
+        return {
+            "sessions": [
+                {
+                    "session_id": s.session_id,
+                    "client_name": s.client_name,
+                    "requests": s.requests,
+                }
+                for s in self._sessions.values()
+            ],
+            "projects": {
+                key: {
+                    "active_sessions": list(q.active_sessions),
+                    "active": q.active,
+                    "waiting": q.waiting,
+                }
+                for key, q in self._projects.items()
+            },
+        }
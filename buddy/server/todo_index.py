@@ -0,0 +1,124 @@
+"""项目 TODO 索引
+
+Agent 通过 MCP 工具直接查询和更新项目的 TODO.md，不需要打开反馈窗口经由用户转述。
+每个项目的解析结果缓存在内存中，TODO 文件的 mtime/大小变化时才重新解析，
+因此反复查询只需要一次 stat。
+
+TODO 项目用路径定位：
+- 序号路径："2.1" 表示第2个顶级项目的第1个子项目（从1开始）
+- 标题路径："功能/登录页面"，按层级用 / 分隔的标题
+"""
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    from ..ui.todo_parser import TodoItem, TodoParser
+except ImportError:
+    from ui.todo_parser import TodoItem, TodoParser
+
+_INDEX_PATH = re.compile(r"^\d+(\.\d+)*$")
+
+
+class TodoNotFound(ValueError):
+    """项目没有 TODO 文件，或路径不存在"""
+
+
+class TodoIndex:
+    """按项目缓存 TODO 树"""
+
+    def __init__(self):
+        self._parser = TodoParser()
+        # 项目目录 -> (TODO文件路径, (mtime_ns, size), 解析结果)
+        self._cache: Dict[str, Tuple[str, Tuple[int, int], List[TodoItem]]] = {}
+
+    def load(self, project_directory: str) -> Tuple[str, List[TodoItem]]:
+        """返回项目的 TODO 文件路径和顶级项目列表"""
+        key = os.path.normcase(os.path.abspath(project_directory))
+        todo_file = self._parser.find_todo_file(project_directory)
+        if todo_file is None:
+            self._cache.pop(key, None)
+            raise TodoNotFound(f"项目中没有 TODO.md: {project_directory}")
+
+        stat_key = self._stat(todo_file)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == todo_file and cached[1] == stat_key:
+            return todo_file, cached[2]
+
+        items = self._parser.parse_file(todo_file)
+        self._cache[key] = (todo_file, stat_key, items)
+        return todo_file, items
+
+    def list(self, project_directory: str, include_content: bool = False) -> List[Dict[str, Any]]:
+        """TODO 树，每个项目附带其序号路径"""
+        _, items = self.load(project_directory)
+        return [_describe(item, str(i), include_content) for i, item in enumerate(items, 1)]
+
+    def get(self, project_directory: str, path: str) -> Dict[str, Any]:
+        """按路径获取一个项目（包含内容和子项目）"""
+        _, items = self.load(project_directory)
+        index_path, item = _resolve(items, path)
+        return _describe(item, index_path, include_content=True)
+
+    def set_done(self, project_directory: str, path: str, done: bool) -> Dict[str, Any]:
+        """标记项目完成/未完成并写回 TODO 文件"""
+        todo_file, items = self.load(project_directory)
+        index_path, item = _resolve(items, path)
+        if item.is_done != done:
+            if done:
+                item.mark_as_done()
+            else:
+                item.mark_as_undone()
+            key = os.path.normcase(os.path.abspath(project_directory))
+            if not self._parser.save_todos_to_file(items, todo_file):
+                # 内存中的修改没有写入文件，下次重新解析
+                self._cache.pop(key, None)
+                raise OSError(f"无法写入 TODO 文件: {todo_file}")
+            # 写入的就是缓存中的内容，更新文件状态即可，不需要重新解析
+            self._cache[key] = (todo_file, self._stat(todo_file), items)
+        return _describe(item, index_path, include_content=False)
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+def _describe(item: TodoItem, path: str, include_content: bool) -> Dict[str, Any]:
+    described = {
+        "path": path,
+        "title": item.title,
+        "done": item.is_done,
+        "attributes": dict(item.attributes),
+    }
+    if include_content:
+        described["content"] = item.content
+    described["children"] = [
+        _describe(child, f"{path}.{i}", include_content) for i, child in enumerate(item.children, 1)
+    ]
+    return described
+
+
+def _resolve(items: List[TodoItem], path: str) -> Tuple[str, TodoItem]:
+    """把序号路径或标题路径解析为项目，返回其序号路径"""
+    path = (path or "").strip()
+    if not path:
+        raise TodoNotFound("路径不能为空")
+
+    use_index = bool(_INDEX_PATH.match(path))
+    segments = path.split(".") if use_index else [s.strip() for s in path.split("/") if s.strip()]
+    indices = []
+    children, item = items, None
+    for segment in segments:
+        if use_index:
+            position = int(segment)
+            if not 1 <= position <= len(children):
+                raise TodoNotFound(f"TODO 路径不存在: {path}")
+        else:
+            position = next((i for i, child in enumerate(children, 1) if child.title == segment), 0)
+            if not position:
+                raise TodoNotFound(f"TODO 路径不存在: {path}")
+        item = children[position - 1]
+        indices.append(str(position))
+        children = item.children
+    return ".".join(indices), item
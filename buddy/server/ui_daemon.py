@@ -0,0 +1,226 @@
+"""Answer Box 常驻宿主进程的客户端
+
+服务器只启动一次 buddy/ui/ui_host.py，之后每个反馈请求通过本地 TCP 连接以帧的形式发送，
+避免每次调用都重新启动解释器、导入 PySide6 并加载 QML。
+宿主每次启动生成随机 token 并通过标准输出告知，每个连接先发送携带该 token 的 READY 帧。
+所有操作基于 asyncio，等待用户反馈时不占用服务器线程。
+"""
+import asyncio
+import atexit
+import os
+import signal
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from ..core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+    from .metrics import mark_phase
+    from .ui_logs import StderrCapture
+except ImportError:
+    from core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+    from server.metrics import mark_phase
+    from server.ui_logs import StderrCapture
+
+
+class DaemonError(Exception):
+    """宿主进程不可用"""
+
+
+class AnswerBoxDaemon:
+    """管理常驻宿主进程，并通过socket转发反馈请求"""
+
+    def __init__(self, host_script: Path, cwd: Path, startup_timeout: float = 30.0):
+        self.host_script = Path(host_script)
+        self.cwd = Path(cwd)
+        self.startup_timeout = startup_timeout
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._port: Optional[int] = None
+        self._token = ""
+        self._lock = asyncio.Lock()
+        self._drain_task: Optional[asyncio.Task] = None
+        self._stderr_capture: Optional[StderrCapture] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    def stderr_tail(self, lines: int = 20) -> str:
+        """宿主进程最近的错误输出"""
+        return self._stderr_capture.tail(lines) if self._stderr_capture else ""
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def ensure_started(self) -> int:
+        """确保宿主进程已启动，返回其监听端口"""
+        async with self._lock:
+            if self.is_running and self._port:
+                return self._port
+            return await self._start()
+
+    async def _start(self) -> int:
+        if not self.host_script.exists():
+            raise DaemonError(f"宿主脚本不存在: {self.host_script}")
+
+        env = os.environ.copy()
+        env['PYTHONIOENCODING'] = 'utf-8'
+
+        # stdin保持打开：宿主进程在stdin关闭（服务器退出）时自动退出
+        # stdout只用于就绪帧，stderr写入轮转日志
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, str(self.host_script),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=str(self.cwd),
+        )
+        capture = StderrCapture(f"host:{self._process.pid}")
+        self._stderr_capture = capture
+        self._stderr_task = asyncio.create_task(capture.drain(self._process.stderr))
+
+        try:
+            ready = await asyncio.wait_for(self._read_ready(), timeout=self.startup_timeout)
+        except asyncio.TimeoutError:
+            await self._kill()
+            raise DaemonError(f"宿主进程启动超时: {capture.tail(5)}")
+
+        if ready is None:
+            await self._kill()
+            raise DaemonError(f"宿主进程启动失败: {capture.tail(5)}")
+
+        # 之后持续排空stdout，避免管道写满阻塞宿主进程
+        self._drain_task = asyncio.create_task(self._drain_stdout(self._process))
+        port, self._token = ready
+        self._port = port
+        print(f"DEBUG: Answer Box 宿主进程已启动，端口: {port}", file=sys.stderr)
+        return port
+
+    async def _read_ready(self) -> Optional[Tuple[int, str]]:
+        """读取宿主进程的就绪帧，返回 (端口号, token)；进程提前退出或输出无效时返回None"""
+        while True:
+            try:
+                frame = await read_frame_async(self._process.stdout)
+            except IPCError as e:
+                print(f"DEBUG: 宿主进程输出无效: {e}", file=sys.stderr)
+                return None
+            if frame is None:
+                return None
+            if frame.type == FrameType.READY:
+                return int(frame.payload["port"]), str(frame.payload.get("token", ""))
+
+    @staticmethod
+    async def _drain_stdout(process: asyncio.subprocess.Process):
+        while await process.stdout.read(65536):
+            pass
+
+    async def ask(self, input_data: Dict[str, Any], timeout: float,
+                  on_frame: Optional[Callable[[Frame], None]] = None) -> Dict[str, Any]:
+        """发送请求并等待用户反馈，返回宿主回写的结果负载
+
+        窗口显示期间收到的进度/草稿帧交给 on_frame 处理。
+        超时抛出 asyncio.TimeoutError，由调用方处理。
+        """
+        try:
+            return await self._ask_once(input_data, timeout, on_frame)
+        except ConnectionError:
+            # 宿主进程可能已退出，重启后重试一次
+            async with self._lock:
+                await self._kill()
+            return await self._ask_once(input_data, timeout, on_frame)
+
+    async def _ask_once(self, input_data: Dict[str, Any], timeout: float,
+                        on_frame: Optional[Callable[[Frame], None]]) -> Dict[str, Any]:
+        was_running = self.is_running
+        port = await self.ensure_started()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection("127.0.0.1", port), timeout=5
+        )
+        mark_phase("window_reused" if was_running else "window_opened")
+        try:
+            writer.write(encode_frame(FrameType.READY, {"token": self._token}))
+            writer.write(encode_frame(FrameType.REQUEST, input_data))
+            await writer.drain()
+            mark_phase("request_sent")
+            return await asyncio.wait_for(self._wait_result(reader, on_frame), timeout=timeout)
+        except asyncio.CancelledError:
+            # 请求被取消：通知宿主立即隐藏窗口
+            writer.write(encode_frame(FrameType.CANCEL, {}))
+            raise
+        finally:
+            # 关闭连接即通知宿主放弃该请求（超时或调用被取消时）
+            writer.close()
+
+    @staticmethod
+    async def _wait_result(reader: asyncio.StreamReader,
+                           on_frame: Optional[Callable[[Frame], None]]) -> Dict[str, Any]:
+        while True:
+            try:
+                frame = await read_frame_async(reader)
+            except IPCError as e:
+                raise ConnectionError(f"宿主进程返回了无效的帧: {e}")
+            if frame is None:
+                raise ConnectionError("宿主进程在返回结果前关闭了连接")
+            if frame.type == FrameType.CANCEL:
+                # token 不匹配：端口可能已被其他进程占用，按连接失败处理（重启宿主后重试）
+                raise ConnectionError(f"宿主进程拒绝了连接: {frame.payload.get('error', '')}")
+            if frame.type == FrameType.RESULT:
+                mark_phase("result_frame")
+                # request_id 只用于宿主内部把结果对应到连接
+                frame.payload.pop("request_id", None)
+                return frame.payload
+            mark_phase("first_frame")
+            if on_frame is not None:
+                on_frame(frame)
+
+    async def _kill(self):
+        if self._process is not None and self._process.returncode is None:
+            try:
+                self._process.kill()
+                await asyncio.wait_for(self._process.wait(), timeout=5)
+            except (ProcessLookupError, asyncio.TimeoutError):
+                pass
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            self._drain_task = None
+        if self._stderr_task is not None:
+            # 进程已退出，等待剩余的错误输出写完日志
+            try:
+                await asyncio.wait_for(self._stderr_task, timeout=1)
+            except asyncio.TimeoutError:
+                pass
+            self._stderr_task = None
+        self._process = None
+        self._port = None
+        self._token = ""
+
+    async def shutdown(self):
+        """关闭宿主进程：先关闭stdin让其正常退出，超时后强制结束"""
+        async with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._process.stdin.close()
+                await asyncio.wait_for(self._process.wait(), timeout=3)
+            except (asyncio.TimeoutError, OSError):
+                pass
+            await self._kill()
+
+    def terminate_on_exit(self):
+        """解释器退出时的兜底清理（此时事件循环可能已关闭，只能直接发信号）"""
+        if self._process is not None and self._process.returncode is None:
+            try:
+                os.kill(self._process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+_daemon: Optional[AnswerBoxDaemon] = None
+
+
+def get_answer_box_daemon(host_script: Path, cwd: Path) -> AnswerBoxDaemon:
+    """获取全局宿主进程客户端（服务器进程内只启动一个宿主）"""
+    global _daemon
+    if _daemon is None:
+        _daemon = AnswerBoxDaemon(host_script, cwd)
+        atexit.register(_daemon.terminate_on_exit)
+    return _daemon
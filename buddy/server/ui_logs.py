@@ -0,0 +1,93 @@
+"""UI子进程的错误输出收集
+
+反馈窗口在stderr上输出大量调试信息（尤其是录音器的 DEBUG 日志）。
+这里把子进程的stderr异步逐行排空，写入 ~/.vc-buddy/logs 下按大小轮转的日志文件，
+内存中只保留最后若干行，用于在UI异常退出时报告错误。
+"""
+import asyncio
+import logging
+import sys
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Deque, Optional
+
+# 单行最大长度，超出部分截断，避免超长行占用内存
+MAX_LINE_LENGTH = 4096
+# 每次从管道读取的块大小
+CHUNK_SIZE = 65536
+
+DEFAULT_LOG_DIR = Path.home() / ".vc-buddy" / "logs"
+
+_logger: Optional[logging.Logger] = None
+
+
+def get_ui_logger(log_dir: Optional[Path] = None, max_bytes: int = 1024 * 1024,
+                  backup_count: int = 3) -> logging.Logger:
+    """获取UI日志记录器（首次调用时创建轮转日志文件）"""
+    global _logger
+    if _logger is not None:
+        return _logger
+
+    logger = logging.getLogger("vc_buddy.ui")
+    logger.setLevel(logging.INFO)
+    # 不向根记录器传播，避免日志写到服务器的stderr上
+    logger.propagate = False
+
+    log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+    try:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        handler: logging.Handler = RotatingFileHandler(
+            log_dir / "ui.log", maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    except OSError as e:
+        print(f"DEBUG: 无法创建UI日志文件: {e}", file=sys.stderr)
+        handler = logging.NullHandler()
+    logger.addHandler(handler)
+
+    _logger = logger
+    return logger
+
+
+class StderrCapture:
+    """排空一个子进程的stderr：完整内容写入轮转日志，内存中只保留末尾几行"""
+
+    def __init__(self, label: str, logger: Optional[logging.Logger] = None, tail_lines: int = 50):
+        self.label = label
+        self._logger = logger or get_ui_logger()
+        self._tail: Deque[str] = deque(maxlen=tail_lines)
+        self.total_lines = 0
+
+    async def drain(self, stream: asyncio.StreamReader):
+        """逐块读取直到EOF，按行写入日志"""
+        pending = b""
+        while True:
+            chunk = await stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                self._record(line)
+            # 没有换行的超长输出直接截断记录
+            if len(pending) > MAX_LINE_LENGTH:
+                self._record(pending)
+                pending = b""
+        if pending:
+            self._record(pending)
+
+    def _record(self, raw_line: bytes):
+        line = raw_line[:MAX_LINE_LENGTH].decode("utf-8", errors="replace").rstrip("\r")
+        if not line:
+            return
+        self.total_lines += 1
+        self._tail.append(line)
+        self._logger.info("[%s] %s", self.label, line)
+
+    def tail(self, lines: Optional[int] = None) -> str:
+        """最后几行输出"""
+        recent = list(self._tail)
+        if lines is not None:
+            recent = recent[-lines:]
+        return "\n".join(recent)
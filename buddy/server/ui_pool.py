@@ -0,0 +1,322 @@
+"""Answer Box 预热进程池
+
+作为常驻宿主之外的另一种选择：预先启动 N 个 `answer_box_qml.py --prewarm` 进程，
+每个进程已经导入 PySide6、编译 QML 并加载配置，隐藏等待标准输入上的请求。
+ask_for_feedback 到达时直接取出一个预热进程显示窗口，同时在后台补充新的进程。
+池为空但已有进程在后台启动时，请求等待最先就绪的那个，而不是再冷启动一个与之争抢CPU的进程。
+取出的进程作为一个反馈窗口（见 ui_window.py），同一项目的并发请求合并为它的标签页；
+窗口中的请求全部完成后进程退出，不再回到池中。
+"""
+import asyncio
+import atexit
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+try:
+    from ..core.ipc import Frame, FrameType, IPCError, read_frame_async
+    from .ui_logs import StderrCapture
+    from .ui_window import UIWindow, WindowClosed
+except ImportError:
+    from core.ipc import Frame, FrameType, IPCError, read_frame_async
+    from server.ui_logs import StderrCapture
+    from server.ui_window import UIWindow, WindowClosed
+
+
+class PoolError(Exception):
+    """预热进程不可用"""
+
+
+def process_rss_kb(pid: int) -> Optional[int]:
+    """读取进程常驻内存（KB），无法获取时返回None"""
+    status_file = Path(f"/proc/{pid}/status")
+    if status_file.exists():
+        try:
+            for line in status_file.read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return None
+    if sys.platform == "darwin":
+        try:
+            output = subprocess.run(
+                ["ps", "-o", "rss=", "-p", str(pid)],
+                capture_output=True, text=True, timeout=2,
+            ).stdout.strip()
+            return int(output) if output else None
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            return None
+    return None
+
+
+@dataclass
+class WarmProcess:
+    """一个已预热、等待请求的UI进程"""
+    process: asyncio.subprocess.Process
+    startup_seconds: float
+    stderr_task: Optional[asyncio.Task] = None
+    capture: Optional[StderrCapture] = None
+    ready_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process.returncode is None
+
+    def rss_kb(self) -> Optional[int]:
+        return process_rss_kb(self.process.pid)
+
+
+class AnswerBoxPool:
+    """维护固定数量的预热进程，并把反馈请求交给其中一个"""
+
+    def __init__(self, ui_script: Path, cwd: Path, size: int = 1,
+                 max_idle_memory_mb: float = 0, startup_timeout: float = 30.0):
+        self.ui_script = Path(ui_script)
+        self.cwd = Path(cwd)
+        self.size = max(0, size)
+        # 所有空闲进程的内存上限，0表示不限制
+        self.max_idle_memory_mb = max_idle_memory_mb
+        self.startup_timeout = startup_timeout
+
+        self._idle: Deque[WarmProcess] = deque()
+        self._spawning = 0
+        # 池为空时等待后台启动中进程的请求，进程就绪后直接交给最早的等待者
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._spawn_tasks: Set[asyncio.Task] = set()
+        self._close_tasks: Set[asyncio.Task] = set()
+        self._warm_hits = 0
+        self._pool_misses = 0
+        self._cold_starts = 0
+        self._memory_rejections = 0
+        self._spawn_failures = 0
+        self._startup_times: Deque[float] = deque(maxlen=50)
+
+    def start(self):
+        """在后台把池补充到配置的大小（可重复调用）"""
+        self._replenish()
+
+    def _replenish(self):
+        while len(self._idle) + self._spawning < self.size:
+            self._spawning += 1
+            task = asyncio.create_task(self._spawn_into_pool())
+            self._spawn_tasks.add(task)
+            task.add_done_callback(self._spawn_tasks.discard)
+
+    async def _spawn_into_pool(self):
+        try:
+            warm = await self._spawn()
+            if self._hand_to_waiter(warm):
+                return
+            if self._exceeds_memory_budget(warm):
+                self._memory_rejections += 1
+                print("DEBUG: 空闲预热进程超出内存上限，不再补充", file=sys.stderr)
+                await self._close(warm)
+                return
+            self._idle.append(warm)
+        except Exception as e:
+            # 后台任务的异常没有人取回：启动失败（含解释器缺失、文件描述符耗尽、握手失败）只记录并计数
+            self._spawn_failures += 1
+            print(f"DEBUG: 预热进程启动失败: {e!r}", file=sys.stderr)
+            # 等待这个进程的请求改为自己冷启动
+            self._hand_to_waiter(None)
+        finally:
+            self._spawning -= 1
+
+    def _hand_to_waiter(self, warm: Optional[WarmProcess]) -> bool:
+        """把刚就绪的进程（启动失败时为None）交给最早的等待者，没有等待者时返回False"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(warm)
+                return True
+        return False
+
+    def _exceeds_memory_budget(self, candidate: WarmProcess) -> bool:
+        if not self.max_idle_memory_mb:
+            return False
+        candidate_kb = candidate.rss_kb()
+        if candidate_kb is None:
+            return False
+        idle_kb = sum(w.rss_kb() or 0 for w in self._idle if w.is_alive)
+        return (idle_kb + candidate_kb) / 1024 > self.max_idle_memory_mb
+
+    async def _spawn(self) -> WarmProcess:
+        if not self.ui_script.exists():
+            raise PoolError(f"UI脚本不存在: {self.ui_script}")
+
+        env = os.environ.copy()
+        env['PYTHONIOENCODING'] = 'utf-8'
+
+        started = time.monotonic()
+        # stdout只用于协议帧，stderr写入轮转日志
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, str(self.ui_script), "--prewarm",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=str(self.cwd),
+        )
+        capture = StderrCapture(f"pool:{process.pid}")
+        stderr_task = asyncio.create_task(capture.drain(process.stderr))
+
+        try:
+            ready = await asyncio.wait_for(read_frame_async(process.stdout), timeout=self.startup_timeout)
+        except (asyncio.TimeoutError, IPCError):
+            ready = None
+        if ready is None or ready.type != FrameType.READY:
+            await self._close(WarmProcess(process, 0.0, stderr_task))
+            raise PoolError(f"预热进程未能就绪: {capture.tail(5)}")
+
+        startup_seconds = time.monotonic() - started
+        self._startup_times.append(startup_seconds)
+        return WarmProcess(process, startup_seconds, stderr_task, capture)
+
+    async def acquire(self) -> WarmProcess:
+        """取出一个预热进程
+
+        池为空时优先等待后台启动中、还没有被其他请求等待的进程；
+        没有这样的进程（或它启动失败）时当场启动一个（冷启动）。
+        """
+        while self._idle:
+            warm = self._idle.popleft()
+            if warm.is_alive:
+                self._warm_hits += 1
+                self._replenish()
+                return warm
+
+        self._pool_misses += 1
+        if self._spawning > len(self._waiters):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                warm = await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled() and waiter.result() is not None:
+                    # 进程已经交给了这个请求，放回池中
+                    self._idle.append(waiter.result())
+                raise
+            if warm is not None and warm.is_alive:
+                self._replenish()
+                return warm
+
+        self._cold_starts += 1
+        self._replenish()
+        return await self._spawn()
+
+    async def open_window(self, on_frame: Optional[Callable[[Frame], None]] = None) -> UIWindow:
+        """取出一个预热进程作为反馈窗口"""
+        warm = await self.acquire()
+        return UIWindow(warm.process, warm.capture, warm.stderr_task,
+                        run_in_background=self._run_close_task, on_frame=on_frame)
+
+    async def ask(self, input_data: Dict[str, Any], timeout: float,
+                  on_frame: Optional[Callable[[Frame], None]] = None) -> Dict[str, Any]:
+        """把请求交给一个新的预热窗口并等待结果，返回结果负载
+
+        窗口显示期间收到的进度/草稿帧交给 on_frame 处理。
+        超时抛出 asyncio.TimeoutError，由调用方处理。
+        """
+        window = await self.open_window(on_frame)
+        try:
+            return await window.ask(input_data, timeout=timeout)
+        except WindowClosed as e:
+            raise PoolError(str(e))
+
+    def _run_close_task(self, coro):
+        """窗口回收在后台进行，shutdown 时等待其完成"""
+        task = asyncio.create_task(coro)
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+        return task
+
+    @staticmethod
+    async def _close(warm: WarmProcess):
+        """关闭stdin让进程自行退出，超时后强制结束"""
+        process = warm.process
+        if process.returncode is None:
+            try:
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout=3)
+            except (asyncio.TimeoutError, OSError):
+                try:
+                    process.kill()
+                    await process.wait()
+                except ProcessLookupError:
+                    pass
+        if warm.stderr_task is not None:
+            await warm.stderr_task
+
+    def status(self) -> Dict[str, Any]:
+        """池的大小、空闲进程及其内存占用"""
+        idle = [w for w in self._idle if w.is_alive]
+        processes = []
+        for warm in idle:
+            rss = warm.rss_kb()
+            processes.append({
+                "pid": warm.process.pid,
+                "rss_mb": round(rss / 1024, 1) if rss is not None else None,
+                "idle_seconds": round(time.monotonic() - warm.ready_at, 1),
+                "startup_seconds": round(warm.startup_seconds, 2),
+            })
+        known = [p["rss_mb"] for p in processes if p["rss_mb"] is not None]
+        return {
+            "size": self.size,
+            "idle": len(idle),
+            "spawning": self._spawning,
+            "idle_memory_mb": round(sum(known), 1),
+            "max_idle_memory_mb": self.max_idle_memory_mb,
+            "warm_hits": self._warm_hits,
+            "pool_misses": self._pool_misses,
+            "waiting": len(self._waiters),
+            "cold_starts": self._cold_starts,
+            "memory_rejections": self._memory_rejections,
+            "spawn_failures": self._spawn_failures,
+            "avg_startup_seconds": (
+                round(sum(self._startup_times) / len(self._startup_times), 2)
+                if self._startup_times else None
+            ),
+            "processes": processes,
+        }
+
+    async def shutdown(self):
+        """关闭所有空闲进程，并等待已使用的进程回收完成"""
+        while self._waiters:
+            self._waiters.popleft().cancel()
+        tasks = list(self._spawn_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *self._close_tasks, return_exceptions=True)
+        while self._idle:
+            await self._close(self._idle.popleft())
+
+    def terminate_on_exit(self):
+        """解释器退出时的兜底清理（此时事件循环可能已关闭，只能直接发信号）"""
+        for warm in self._idle:
+            if warm.is_alive:
+                try:
+                    os.kill(warm.process.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+
+_pool: Optional[AnswerBoxPool] = None
+
+
+def get_answer_box_pool(ui_script: Path, cwd: Path, size: int = 1,
+                        max_idle_memory_mb: float = 0) -> AnswerBoxPool:
+    """获取全局预热进程池（服务器进程内只维护一个池）"""
+    global _pool
+    if _pool is None:
+        _pool = AnswerBoxPool(ui_script, cwd, size=size, max_idle_memory_mb=max_idle_memory_mb)
+        atexit.register(_pool.terminate_on_exit)
+    return _pool
@@ -0,0 +1,205 @@
+"""同一项目的反馈窗口
+
+多个 Agent 同时针对同一个项目调用 ask_for_feedback 时，请求合并到同一个窗口进程中，
+每个请求在窗口中显示为一个标签页，而不是各自启动一个置顶窗口。
+
+- 请求帧带有服务器生成的 request_id，窗口返回的结果帧原样带回，据此交还给各自的调用方
+- 调用方取消或超时时发送带 request_id 的 CANCEL 帧，窗口只关闭对应的标签页
+- 窗口中的请求全部完成后关闭标准输入，UI进程随之退出；之后到达的请求使用新的窗口
+  （由服务器决定何时关闭，避免窗口退出的同时又有新请求写入）
+"""
+import asyncio
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    from ..core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+    from .metrics import CallTrace, current_call, metrics
+    from .ui_logs import StderrCapture
+except ImportError:
+    from core.ipc import Frame, FrameType, IPCError, encode_frame, read_frame_async
+    from server.metrics import CallTrace, current_call, metrics
+    from server.ui_logs import StderrCapture
+
+# 返回结果后等待UI进程自行退出的时间，超时后强制结束
+EXIT_GRACE = 10
+# 请求被取消后等待UI进程关闭窗口退出的时间
+CANCEL_GRACE = 2
+# UI异常退出时在结果中附带的错误输出行数
+ERROR_TAIL_LINES = 5
+
+
+class WindowClosed(Exception):
+    """窗口进程已退出，无法再接收请求"""
+
+
+class UIWindow:
+    """一个反馈窗口进程，可同时承载同一项目的多个请求"""
+
+    def __init__(self, process: asyncio.subprocess.Process, capture: StderrCapture,
+                 stderr_task: asyncio.Task,
+                 run_in_background: Callable[[Awaitable], Any],
+                 on_frame: Optional[Callable[[Frame], None]] = None,
+                 exit_grace: float = EXIT_GRACE, cancel_grace: float = CANCEL_GRACE):
+        self.process = process
+        self.capture = capture
+        self._stderr_task = stderr_task
+        self._run_in_background = run_in_background
+        self._on_frame = on_frame
+        self._exit_grace = exit_grace
+        self._cancel_grace = cancel_grace
+
+        # request_id -> 等待结果的Future，按请求到达顺序排列
+        self._pending: Dict[str, asyncio.Future] = {}
+        # request_id -> 调用的阶段时间戳（帧在读取任务中到达，需要按请求找到对应的调用）
+        self._traces: Dict[str, CallTrace] = {}
+        self._closing = False
+        self._reaping = False
+        self.requests_served = 0
+        self._reader = asyncio.create_task(self._read_frames())
+
+    @property
+    def accepting(self) -> bool:
+        """窗口是否还能接收新的请求"""
+        return not self._closing and self.process.returncode is None and not self._reader.done()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def ask(self, input_data: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """在窗口中显示一个请求（已有请求时作为新的标签页）并等待其结果
+
+        超时抛出 asyncio.TimeoutError；窗口已退出时抛出 WindowClosed。
+        """
+        if not self.accepting:
+            raise WindowClosed("窗口已关闭")
+
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        trace = current_call.get()
+        if trace is not None:
+            self._traces[request_id] = trace
+        self.requests_served += 1
+        withdrawn = False
+        try:
+            try:
+                self.process.stdin.write(
+                    encode_frame(FrameType.REQUEST, {**input_data, "request_id": request_id})
+                )
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                self._closing = True
+                raise WindowClosed(f"窗口进程已退出: {e}")
+            if trace is not None:
+                trace.mark("request_sent")
+            return await asyncio.wait_for(future, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # 调用方不再等待：只关闭对应的标签页
+            withdrawn = True
+            self._send_cancel(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            self._traces.pop(request_id, None)
+            if not self._pending:
+                self._close(self._cancel_grace if withdrawn else self._exit_grace)
+
+    def _send_cancel(self, request_id: str):
+        if self.process.returncode is not None or self.process.stdin.is_closing():
+            return
+        try:
+            self.process.stdin.write(encode_frame(FrameType.CANCEL, {"request_id": request_id}))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    async def _read_frames(self):
+        """读取窗口输出的帧，把结果交给对应的请求"""
+        try:
+            while True:
+                frame = await read_frame_async(self.process.stdout)
+                if frame is None:
+                    break
+                if frame.type == FrameType.RESULT:
+                    self._deliver(frame.payload)
+                    continue
+                self._mark(frame.payload.get("request_id"), "first_frame")
+                if self._on_frame is not None:
+                    self._on_frame(frame)
+        except IPCError as e:
+            print(f"DEBUG: UI返回了无效的帧: {e}", file=sys.stderr)
+            self._closing = True
+            self._fail_pending({"result": f"UI返回格式错误: {e}"})
+            return
+
+        # 窗口没有返回结果就关闭了输出：不再接收新请求，等待中的请求使用同一个结果
+        self._closing = True
+        if self._pending:
+            self._fail_pending(await self._result_without_frame())
+
+    def _deliver(self, payload: Dict[str, Any]):
+        request_id = self._mark(payload.pop("request_id", None), "result_frame")
+        future = self._pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(payload)
+
+    def _mark(self, request_id: Optional[str], phase: str) -> Optional[str]:
+        """为帧所属的请求记录阶段时间戳，返回请求ID"""
+        if request_id is None and self._pending:
+            # 不支持多请求的UI：帧属于最早的请求
+            request_id = next(iter(self._pending))
+        trace = self._traces.get(request_id)
+        if trace is not None:
+            trace.mark(phase)
+        return request_id
+
+    def _fail_pending(self, result: Dict[str, Any]):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_result(dict(result))
+
+    async def _result_without_frame(self) -> Dict[str, Any]:
+        """UI没有返回结果：正常退出视为用户直接关闭窗口（空反馈），异常退出则报告错误输出的末尾"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(self.process.wait(), asyncio.shield(self._stderr_task)),
+                timeout=self._exit_grace,
+            )
+        except asyncio.TimeoutError:
+            return {"result": ""}
+
+        if self.process.returncode:
+            tail = self.capture.tail(ERROR_TAIL_LINES)
+            print(f"DEBUG: UI进程异常退出（退出码 {self.process.returncode}），最后输出:\n{tail}",
+                  file=sys.stderr)
+            return {"result": f"UI进程异常退出（退出码 {self.process.returncode}）: {tail}"}
+        return {"result": ""}
+
+    def _close(self, grace: float):
+        """所有请求都已完成：不再接收新请求，进程回收放到后台"""
+        if self._reaping:
+            return
+        self._closing = True
+        self._reaping = True
+        self._run_in_background(self._reap(grace))
+
+    async def _reap(self, grace: float):
+        """关闭stdin让窗口退出（超时则强制结束），并等待错误输出写完日志"""
+        started = time.perf_counter()
+        self.process.stdin.close()
+        # 只等待进程退出：读取任务在后台继续排空stdout（避免UI退出前写满管道），超时也不会被一并取消
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=grace)
+        except asyncio.TimeoutError:
+            print("DEBUG: UI进程未在预期时间内退出，强制结束", file=sys.stderr)
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+            self._reader.cancel()
+        metrics.observe("exit", (time.perf_counter() - started) * 1000)
+        await asyncio.gather(self._reader, self._stderr_task, return_exceptions=True)
@@ -7,15 +7,43 @@
 
 import unittest
 import tempfile
+import threading
+import time
 import os
 import json
 from pathlib import Path
+from unittest import mock
 import sys
 
 # 添加buddy模块到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from buddy.core import analytics as analytics_module
 from buddy.core.analytics import AnalyticsManager, get_analytics_manager, track_event, track_app_opened
+from buddy.core.fake_amplitude import FakeAmplitudeServer
+
+
+# 测试中的统计管理器一律上传到本地 Amplitude 替身，网络探测返回离线结果，不访问网络
+_fake_amplitude = None
+_patches = []
+
+
+def setUpModule():
+    global _fake_amplitude
+    _fake_amplitude = FakeAmplitudeServer().start()
+    _patches[:] = [
+        mock.patch.dict(os.environ, {"VC_BUDDY_AMPLITUDE_URL": _fake_amplitude.url}),
+        mock.patch.object(AnalyticsManager, "_collect_network_info",
+                          return_value=dict(analytics_module._UNKNOWN_NETWORK_INFO)),
+    ]
+    for patch in _patches:
+        patch.start()
+
+
+def tearDownModule():
+    for patch in reversed(_patches):
+        patch.stop()
+    _fake_amplitude.stop()
 
 
 class TestAnalyticsManager(unittest.TestCase):
@@ -101,6 +129,24 @@ class TestAnalyticsManager(unittest.TestCase):
 class TestAnalyticsGlobalFunctions(unittest.TestCase):
     """测试全局便捷函数"""
     
+    def setUp(self):
+        """测试前准备：全局管理器使用临时的用户目录"""
+        self.temp_dir = tempfile.mkdtemp()
+        home = mock.patch.object(Path, "home", return_value=Path(self.temp_dir))
+        home.start()
+        self.addCleanup(home.stop)
+        instance = mock.patch.object(analytics_module, "_analytics_instance", None)
+        instance.start()
+        self.addCleanup(instance.stop)
+    
+    def tearDown(self):
+        """测试后清理"""
+        manager = analytics_module._analytics_instance
+        if manager is not None:
+            manager._shutdown()
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
     def test_get_analytics_manager(self):
         """测试获取统计管理器单例"""
         manager1 = get_analytics_manager()
@@ -108,6 +154,7 @@ class TestAnalyticsGlobalFunctions(unittest.TestCase):
         
         # 应该返回同一个实例
         self.assertIs(manager1, manager2)
+        self.assertEqual(manager1.config_dir, Path(self.temp_dir) / ".vc-buddy")
     
     def test_convenience_functions(self):
         """测试便捷函数"""
@@ -156,6 +203,322 @@ class TestAnalyticsConfig(unittest.TestCase):
         self.assertFalse(new_analytics.enabled)
 
 
+class TestAnalyticsState(unittest.TestCase):
+    """测试统计状态文件的读写"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "analytics_config.json"
+    
+    def tearDown(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_loaded_once_and_written_on_change(self):
+        """启动时只读取一次；值没有变化时不写文件"""
+        analytics_module.AnalyticsState(self.path).get_device_id()
+        with mock.patch.object(analytics_module.AnalyticsState, "_read", autospec=True,
+                               side_effect=analytics_module.AnalyticsState._read) as read, \
+                mock.patch.object(analytics_module.os, "replace", wraps=os.replace) as replace:
+            analytics = AnalyticsManager(config_dir=self.temp_dir)
+            self.assertEqual(read.call_count, 1)
+            analytics.set_analytics_enabled(True)
+            analytics.set_analytics_enabled(False)
+        # 其他测试创建的管理器的上传线程也可能调用 os.replace，只统计配置文件的写入
+        writes = [args for args, _ in replace.call_args_list if args[1] == self.path]
+        self.assertEqual(len(writes), 1)
+    
+    def test_update_keeps_fields_written_by_other_process(self):
+        """修改开关时保留其他进程写入的字段"""
+        state = analytics_module.AnalyticsState(self.path)
+        device_id = state.get_device_id()
+        config = json.loads(self.path.read_text(encoding='utf-8'))
+        config['extra'] = 'kept'
+        self.path.write_text(json.dumps(config), encoding='utf-8')
+        
+        state.update(analytics_enabled=False)
+        config = json.loads(self.path.read_text(encoding='utf-8'))
+        self.assertEqual(config, {'device_id': device_id, 'analytics_enabled': False, 'extra': 'kept'})
+        self.assertEqual(os.listdir(self.temp_dir), ["analytics_config.json"])
+    
+    def test_concurrent_first_start_shares_device_id(self):
+        """多个进程同时第一次启动时使用同一个设备ID"""
+        barrier = threading.Barrier(8)
+        device_ids = []
+        
+        def start():
+            state = analytics_module.AnalyticsState(self.path)
+            barrier.wait()
+            device_ids.append(state.get_device_id())
+        
+        threads = [threading.Thread(target=start) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        saved = json.loads(self.path.read_text(encoding='utf-8'))['device_id']
+        self.assertEqual(device_ids, [saved] * 8)
+    
+    def test_corrupt_file_replaced(self):
+        """配置文件损坏时重新生成设备ID"""
+        self.path.write_text("{", encoding='utf-8')
+        device_id = analytics_module.AnalyticsState(self.path).get_device_id()
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8'))['device_id'], device_id)
+
+
+class TestAmplitudeHttpSender(unittest.TestCase):
+    """测试通过批量上传接口发送事件（使用本地 Amplitude 替身）"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.server = FakeAmplitudeServer().start()
+        self.sender = analytics_module.AmplitudeHttpSender("test-key", url=self.server.url, timeout=5)
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.server.stop()
+    
+    def event(self, insert_id):
+        return {"event_type": "button_clicked", "device_id": "device", "insert_id": insert_id}
+    
+    def test_send_batch(self):
+        """成功发送，重复的 insert_id 由服务端去重"""
+        self.assertTrue(self.sender.send([self.event("a"), self.event("b")]))
+        self.assertTrue(self.sender.send([self.event("b")]))
+        stats = self.server.stats()
+        self.assertEqual((stats["requests"], stats["events"], stats["duplicate_events"]), (2, 2, 1))
+    
+    def test_server_error_retried(self):
+        """服务端错误时返回False，事件留待重试"""
+        self.server.failure_rate = 1.0
+        self.assertFalse(self.sender.send([self.event("a")]))
+        self.assertEqual(self.server.stats()["events"], 0)
+    
+    def test_invalid_batch_dropped(self):
+        """请求无效（400）时返回True，不再重试"""
+        self.assertTrue(self.sender.send([{"event_type": "button_clicked"}]))
+        self.assertEqual(self.server.stats()["rejected_requests"], 1)
+
+
+class RecordingSpool:
+    """记录写入的事件和写入线程的假本地缓冲"""
+    
+    dropped_events = 0
+    
+    def __init__(self):
+        self.events = []
+        self.threads = []
+    
+    def append(self, events):
+        self.events.extend(events)
+        self.threads.append(threading.current_thread().name)
+    
+    def seal(self):
+        pass
+    
+    def upload(self, send, batch_size=100):
+        return 0, 0
+    
+    def size(self):
+        return 0
+    
+    def event_types(self):
+        return [event["event_type"] for event in self.events]
+
+
+class TestNetworkProbe(unittest.TestCase):
+    """测试网络信息在后台探测并缓存"""
+    
+    NETWORK_INFO = {
+        'public_ip': '203.0.113.7',
+        'local_ip': '192.168.1.2',
+        'hostname': 'devbox',
+        'network_type': 'private'
+    }
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = Path(self.temp_dir) / "network_info.json"
+    
+    def tearDown(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def write_cache(self, age):
+        self.cache_file.write_text(json.dumps({
+            'collected_at': time.time() - age,
+            'network_info': self.NETWORK_INFO,
+        }), encoding='utf-8')
+    
+    def test_fresh_cache_skips_probe(self):
+        """缓存未过期时直接使用，不访问网络"""
+        self.write_cache(age=60)
+        with mock.patch.object(AnalyticsManager, "_collect_network_info") as collect:
+            analytics = AnalyticsManager(config_dir=self.temp_dir)
+        collect.assert_not_called()
+        self.assertEqual(analytics.network_info['public_ip'], '203.0.113.7')
+    
+    def test_probe_runs_in_background_and_enriches_held_events(self):
+        """过期缓存时后台探测，不阻塞初始化；探测前的事件在设置网络用户属性后发送"""
+        self.write_cache(age=analytics_module.NETWORK_INFO_TTL + 1)
+        release = threading.Event()
+        
+        def slow_probe(manager):
+            release.wait(5)
+            return dict(self.NETWORK_INFO, public_ip='198.51.100.1')
+        
+        with mock.patch.object(AnalyticsManager, "_collect_network_info", slow_probe):
+            started = time.monotonic()
+            analytics = AnalyticsManager(config_dir=self.temp_dir)
+            self.assertLess(time.monotonic() - started, 1)
+            spool = analytics.spool = RecordingSpool()
+            
+            analytics.track_app_opened("test")
+            analytics.track_button_clicked("send")
+            analytics.flush()
+            self.assertEqual(spool.events, [])
+            
+            release.set()
+            analytics._network_probe.join(5)
+        
+        self.assertEqual(spool.event_types(), ["$identify", "app_opened", "button_clicked"])
+        self.assertEqual(spool.events[0]["user_properties"]["$set"]["user_public_ip"], '198.51.100.1')
+        
+        # 探测结果写入缓存，下次启动直接使用
+        cached = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        self.assertEqual(cached['network_info']['public_ip'], '198.51.100.1')
+        
+        # 探测完成后的事件直接发送
+        analytics.track_voice_action("start_recording")
+        analytics.flush()
+        self.assertEqual(spool.event_types()[-1], "voice_action")
+    
+    def test_no_network_until_first_event(self):
+        """只创建管理器时不探测网络、不上传；第一个事件启动探测和上传线程，上传到替身"""
+        received = _fake_amplitude.stats()["events"]
+        analytics = AnalyticsManager(config_dir=self.temp_dir)
+        self.assertEqual((analytics._network_probe, analytics._uploader, analytics._flusher), (None, None, None))
+        
+        analytics.track_app_opened("test")
+        analytics._network_probe.join(5)
+        self.assertTrue(analytics._uploader.is_alive())
+        analytics._shutdown()
+        # 封存的分段（$identify 和 app_opened）由上传线程发送到本地替身
+        self.assertTrue(_fake_amplitude.wait_for_events(received + 2, timeout=10))
+    
+    def test_offline_result_not_cached(self):
+        """离线时的探测结果不写入缓存"""
+        offline = dict(analytics_module._UNKNOWN_NETWORK_INFO)
+        with mock.patch.object(AnalyticsManager, "_collect_network_info", return_value=offline):
+            analytics = AnalyticsManager(config_dir=self.temp_dir)
+            analytics.spool = RecordingSpool()
+            analytics.track_app_opened("test")
+            analytics._network_probe.join(5)
+        self.assertTrue(analytics._network_ready.is_set())
+        self.assertFalse(self.cache_file.exists())
+
+
+class TestEventQueue(unittest.TestCase):
+    """测试事件队列和后台批量发送"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        # 网络信息使用缓存，不等待探测
+        (Path(self.temp_dir) / "network_info.json").write_text(json.dumps({
+            'collected_at': time.time(),
+            'network_info': TestNetworkProbe.NETWORK_INFO,
+        }), encoding='utf-8')
+        self.analytics = AnalyticsManager(config_dir=self.temp_dir)
+        self.spool = self.analytics.spool = RecordingSpool()
+    
+    def tearDown(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_events_written_by_background_thread(self):
+        """事件由后台线程写入本地缓冲，调用线程只负责入队"""
+        self.analytics.track_button_clicked("send")
+        self.analytics.track_todo_action("click", "标题", 1)
+        deadline = time.monotonic() + 5
+        while len(self.spool.events) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.spool.event_types(), ["$identify", "button_clicked", "todo_action"])
+        self.assertEqual(set(self.spool.threads), {"analytics-flusher"})
+        stats = self.analytics.stats()
+        self.assertEqual((stats['queued'], stats['delivered'], stats['dropped']), (0, 2, 0))
+    
+    def test_caller_properties_not_modified(self):
+        """调用方传入的属性字典不会被后台线程修改，入队后的修改也不影响已记录的事件"""
+        properties = {"button_name": "send"}
+        self.analytics.track_event("button_clicked", properties)
+        properties["button_name"] = "changed"
+        self.assertTrue(self.analytics.flush(timeout=5))
+        self.assertEqual(properties, {"button_name": "changed"})
+        event_properties = self.spool.events[-1]["event_properties"]
+        self.assertEqual(event_properties["button_name"], "send")
+        self.assertIn("session_id", event_properties)
+    
+    def test_queue_full_drops_and_reports(self):
+        """队列满时丢弃新事件，丢弃数量随下一批上报"""
+        release = threading.Event()
+        original_deliver = self.analytics._deliver
+        
+        def blocked_deliver(batch, **kwargs):
+            release.wait(5)
+            original_deliver(batch, **kwargs)
+        
+        self.analytics._deliver = blocked_deliver
+        self.analytics._queue = analytics_module.queue.Queue(maxsize=5)
+        # 后台线程取出第一批事件后阻塞，其余事件填满队列
+        for i in range(20):
+            self.analytics.track_button_clicked(f"b{i}")
+        self.assertGreater(self.analytics.dropped_events, 0)
+        
+        release.set()
+        self.assertTrue(self.analytics.flush(timeout=5))
+        stats = self.analytics.stats()
+        self.assertEqual(stats['delivered'] + stats['dropped'], 21)
+        self.assertEqual(self.spool.event_types().count("analytics_events_dropped"), 1)
+    
+    def test_event_limits_from_config(self):
+        """analytics_config.json 中的限流配置生效，被抑制的事件在退出前汇总上报"""
+        config_file = Path(self.temp_dir) / "analytics_config.json"
+        config = json.loads(config_file.read_text(encoding='utf-8'))
+        config['event_limits'] = {"voice_action": {"rate": 0, "burst": 2}}
+        config_file.write_text(json.dumps(config), encoding='utf-8')
+        analytics = AnalyticsManager(config_dir=self.temp_dir)
+        spool = analytics.spool = RecordingSpool()
+        
+        for _ in range(10):
+            analytics.track_voice_action("transcription_completed")
+        analytics.track_button_clicked("send")
+        analytics._shutdown()
+        
+        self.assertEqual(spool.event_types(), ["$identify", "voice_action", "voice_action", "button_clicked",
+                                               "analytics_events_suppressed"])
+        report = spool.events[-1]["event_properties"]
+        self.assertEqual((report["event_key"], report["rate_limited"]), ("voice_action", 8))
+        self.assertEqual(analytics.stats()['suppressed'], 8)
+    
+    def test_sampled_event_without_properties_tagged(self):
+        """track_event(事件, None) 的采样事件也带 sample_rate"""
+        analytics = AnalyticsManager(config_dir=self.temp_dir)
+        analytics.limiter = analytics_module.EventLimiter({"app_closed": {"sample_rate": 0.5}}, rng=lambda: 0.1)
+        spool = analytics.spool = RecordingSpool()
+        
+        analytics.track_event("app_closed", None)
+        analytics.flush()
+        
+        self.assertEqual(spool.event_types(), ["$identify", "app_closed"])
+        self.assertEqual(spool.events[-1]["event_properties"]["sample_rate"], 0.5)
+
+
 if __name__ == '__main__':
     # 运行测试
     unittest.main(verbosity=2) 
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高频统计事件采样和限流的单元测试
+测试令牌桶、采样、配置项的查找顺序和被抑制事件的汇总
+"""
+
+import unittest
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.analytics_limits import EventLimiter, TokenBucket, SUPPRESSED_EVENT_TYPE
+
+
+def voice(action):
+    return {"action": action}
+
+
+class TestTokenBucket(unittest.TestCase):
+    """测试令牌桶"""
+
+    def test_burst_then_rate(self):
+        """先允许 burst 个，之后按 rate 补充"""
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.take(100.0) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(bucket.take(100.5))
+        self.assertFalse(bucket.take(100.5))
+        # 长时间空闲后最多补充到 burst 个
+        self.assertEqual(sum(bucket.take(200.0) for _ in range(10)), 3)
+
+    def test_clock_going_backwards(self):
+        """时钟回拨时不补充令牌"""
+        bucket = TokenBucket(rate=1, burst=1)
+        self.assertTrue(bucket.take(100.0))
+        self.assertFalse(bucket.take(50.0))
+
+
+class TestEventLimiter(unittest.TestCase):
+    """测试按事件类型采样和限流"""
+
+    def test_rate_limit_and_report(self):
+        """超过限流的事件被抑制，汇总窗口结束后按键上报计数"""
+        limiter = EventLimiter({"voice_action": {"rate": 0, "burst": 2}}, report_interval=60)
+        allowed = [limiter.admit("voice_action", voice("transcription_started"), 100.0 + i) is not None
+                   for i in range(5)]
+        self.assertEqual(allowed, [True, True, False, False, False])
+        self.assertTrue(limiter.admit("button_clicked", {"button_name": "send"}, 101.0))
+
+        self.assertEqual(limiter.reports(150.0), [])
+        reports = limiter.reports(162.0)
+        self.assertEqual(reports, [(SUPPRESSED_EVENT_TYPE, {"event_key": "voice_action", "sampled_out": 0,
+                                                            "rate_limited": 3, "window_seconds": 60.0}, 162.0)])
+        self.assertEqual(limiter.reports(300.0, force=True), [])
+        self.assertEqual(limiter.suppressed_events, 3)
+
+    def test_sampling_marks_kept_events(self):
+        """按采样率保留事件，保留的事件带 sample_rate 属性"""
+        values = iter([0.1, 0.9, 0.2, 0.7])
+        limiter = EventLimiter({"voice_action": {"sample_rate": 0.5}}, rng=lambda: next(values))
+        kept = []
+        for i in range(4):
+            admitted = limiter.admit("voice_action", voice("transcription_completed"), 100.0 + i)
+            if admitted is not None:
+                kept.append(admitted[1])
+        self.assertEqual(kept, [{"action": "transcription_completed", "sample_rate": 0.5}] * 2)
+        (report,) = limiter.reports(0, force=True)
+        self.assertEqual((report[1]["sampled_out"], report[1]["rate_limited"]), (2, 0))
+
+    def test_sampled_event_without_properties(self):
+        """没有属性的采样事件也带 sample_rate"""
+        limiter = EventLimiter({"app_opened": {"sample_rate": 0.25}}, rng=lambda: 0.1)
+        self.assertEqual(limiter.admit("app_opened", None, 5.0), ("app_opened", {"sample_rate": 0.25}, 5.0))
+        # 不采样的事件保持原样
+        self.assertEqual(limiter.admit("button_clicked", None, 5.0), ("button_clicked", None, 5.0))
+
+    def test_sampled_event_properties_copied(self):
+        """采样事件的 sample_rate 写入新的字典，传入的属性不变"""
+        limiter = EventLimiter({"voice_action": {"sample_rate": 0.5}}, rng=lambda: 0.1)
+        properties = voice("transcription_completed")
+        admitted = limiter.admit("voice_action", properties, 5.0)
+        self.assertEqual(admitted[1], {**voice("transcription_completed"), "sample_rate": 0.5})
+        self.assertEqual(properties, voice("transcription_completed"))
+
+    def test_lookup_order(self):
+        """按 事件类型:action、事件类型、* 的顺序查找，* 按事件类型分别限流"""
+        limiter = EventLimiter({
+            "voice_action": {},
+            "voice_action:error": {"rate": 0, "burst": 1},
+            "*": {"rate": 0, "burst": 1},
+        })
+        # voice_action 的空配置表示不限制，但仍由 * 限流
+        self.assertTrue(limiter.admit("voice_action", voice("error"), 1.0))
+        self.assertFalse(limiter.admit("voice_action", voice("error"), 1.0))
+        self.assertTrue(limiter.admit("voice_action", voice("start_recording"), 1.0))
+        self.assertFalse(limiter.admit("voice_action", voice("stop_recording"), 1.0))
+        self.assertTrue(limiter.admit("todo_action", voice("click"), 1.0))
+        keys = sorted(report[1]["event_key"] for report in limiter.reports(0, force=True))
+        self.assertEqual(keys, ["voice_action", "voice_action:error"])
+
+    def test_no_default_limits(self):
+        """没有配置时不采样也不限流"""
+        limiter = EventLimiter()
+        self.assertTrue(all(limiter.admit("voice_action", voice("transcription_completed"), 1.0)
+                            for _ in range(100)))
+        self.assertTrue(all(limiter.admit("button_clicked", {}, 1.0) for _ in range(100)))
+        self.assertEqual(limiter.reports(1.0, force=True), [])
+
+    def test_invalid_config_ignored(self):
+        """无效的配置项被忽略"""
+        with self.assertLogs(level="WARNING"):
+            limiter = EventLimiter({"button_clicked": {"sample_rate": 2}, "todo_action": "fast",
+                                    "voice_action": {"rate": "slow"}})
+        self.assertTrue(all(limiter.admit("button_clicked", {}, 1.0) for _ in range(50)))
+        # 无效的配置项不产生限制
+        self.assertTrue(all(limiter.admit("voice_action", voice("error"), 1.0) for _ in range(50)))
+        with self.assertLogs(level="WARNING"):
+            EventLimiter(["voice_action"])
+
+
+if __name__ == '__main__':
+    unittest.main()
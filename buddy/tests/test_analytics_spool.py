@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据统计事件本地缓冲的单元测试
+测试分段的写入、封存、按批上传、失败时的压缩、孤立分段的接管和总大小上限
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.analytics_spool import EventSpool
+
+
+def make_events(count, start=0):
+    return [{"event_type": "button_clicked", "insert_id": f"e{i}"} for i in range(start, start + count)]
+
+
+class RecordingSender:
+    """记录每批事件；fail_after 批之后返回失败"""
+
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def send(self, events):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            return False
+        self.batches.append([event["insert_id"] for event in events])
+        return True
+
+
+class TestEventSpool(unittest.TestCase):
+    """测试本地事件缓冲"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.spool = EventSpool(self.temp_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def files(self):
+        return sorted(path.name for path in Path(self.temp_dir).iterdir())
+
+    def test_unsealed_segment_not_uploaded(self):
+        """正在写入的分段封存后才上传"""
+        self.spool.append(make_events(3))
+        self.assertTrue(self.files()[0].endswith(f"-{os.getpid()}.open"))
+        sender = RecordingSender()
+        self.assertEqual(self.spool.upload(sender.send), (0, 0))
+
+        self.spool.seal()
+        self.assertEqual(self.spool.upload(sender.send), (3, 0))
+        self.assertEqual(sender.batches, [["e0", "e1", "e2"]])
+        self.assertEqual(self.files(), [])
+
+    def test_segments_merged_into_batches(self):
+        """多个进程留下的小分段按时间顺序合并成批"""
+        for start in (0, 3, 6):
+            self.spool.append(make_events(3, start))
+            self.spool.seal()
+        sender = RecordingSender()
+        self.assertEqual(self.spool.upload(sender.send, batch_size=4), (9, 0))
+        self.assertEqual(sender.batches, [["e0", "e1", "e2", "e3"], ["e4", "e5", "e6", "e7"], ["e8"]])
+
+    def test_failed_upload_compacts_remaining(self):
+        """发送失败时，未发送的事件合并为一个分段，下次从这里继续"""
+        for start in (0, 3):
+            self.spool.append(make_events(3, start))
+            self.spool.seal()
+        self.assertEqual(self.spool.upload(RecordingSender(fail_after=1).send, batch_size=2), (2, 4))
+        self.assertEqual(len(self.files()), 1)
+        self.assertTrue(self.files()[0].endswith("-c.jsonl"))
+
+        # 再次失败不会让文件名继续变长
+        self.spool.upload(RecordingSender(fail_after=0).send)
+        self.assertEqual(len(self.files()), 1)
+
+        sender = RecordingSender()
+        self.assertEqual(self.spool.upload(sender.send), (4, 0))
+        self.assertEqual(sender.batches, [["e2", "e3", "e4", "e5"]])
+
+    def test_orphaned_segments_adopted(self):
+        """已退出进程的 .open 和 .uploading 分段被重新封存上传；其他进程正在写入的分段不动"""
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        directory = Path(self.temp_dir)
+        (directory / f"{1:020d}-{exited.pid}.open").write_text('{"insert_id":"a"}\n{"insert_id', encoding="utf-8")
+        (directory / f"{2:020d}-1.uploading-{exited.pid}").write_text('{"insert_id":"b"}\n', encoding="utf-8")
+        (directory / f"{3:020d}-{os.getppid()}.open").write_text('{"insert_id":"c"}\n', encoding="utf-8")
+
+        sender = RecordingSender()
+        self.assertEqual(self.spool.upload(sender.send), (2, 0))
+        # 写了一半的最后一行被跳过
+        self.assertEqual(sender.batches, [["a", "b"]])
+        self.assertEqual(self.files(), [f"{3:020d}-{os.getppid()}.open"])
+
+    def test_claimed_segment_uploaded_once(self):
+        """同一个分段只会被一个进程认领"""
+        self.spool.append(make_events(2))
+        self.spool.seal()
+        segment = self.spool.sealed_segments()[0]
+        self.assertIsNotNone(self.spool._claim(segment))
+        self.assertIsNone(EventSpool(self.temp_dir)._claim(segment))
+
+    def test_size_cap_drops_oldest(self):
+        """总大小超过上限时丢弃最旧的分段"""
+        spool = EventSpool(self.temp_dir, max_segment_bytes=200, max_total_bytes=600)
+        for start in range(0, 40, 4):
+            spool.append(make_events(4, start))
+        self.assertLessEqual(spool.size(), 600)
+        self.assertGreater(spool.dropped_events, 0)
+
+        sender = RecordingSender()
+        spool.seal()
+        sent, _ = spool.upload(sender.send)
+        uploaded = [insert_id for batch in sender.batches for insert_id in batch]
+        # 留下的是最新的事件
+        self.assertEqual(uploaded[-1], "e39")
+        self.assertEqual(sent + spool.dropped_events, 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本应答后端的单元测试
+测试思考时间分布、按规则生成回答，以及通过服务器的完整往返
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+from buddy.ui.answer_scripted import ScriptedResponder, ThinkTime
+
+
+class TestThinkTime(unittest.TestCase):
+    """测试思考时间分布"""
+
+    def test_distributions_within_bounds(self):
+        """各分布的取值非负，且不超过 max_ms"""
+        configs = [
+            {"distribution": "fixed", "ms": 30},
+            {"distribution": "uniform", "min_ms": 10, "max_ms": 20},
+            {"distribution": "exponential", "mean_ms": 50, "max_ms": 200},
+            {"distribution": "lognormal", "median_ms": 50, "sigma": 1.0, "max_ms": 200},
+        ]
+        for config in configs:
+            think_time = ThinkTime(config, seed=1)
+            samples = [think_time.sample() for _ in range(500)]
+            self.assertTrue(all(0 <= s <= 0.2 for s in samples), config)
+        self.assertEqual(ThinkTime({"distribution": "fixed", "ms": 30}).sample(), 0.03)
+
+    def test_same_seed_same_samples(self):
+        """相同种子得到相同的序列，便于重复压测"""
+        config = {"distribution": "lognormal", "median_ms": 100}
+        first = ThinkTime(config, seed=7)
+        second = ThinkTime(config, seed=7)
+        self.assertEqual([first.sample() for _ in range(10)], [second.sample() for _ in range(10)])
+
+    def test_unknown_distribution_rejected(self):
+        """未知的分布名称报错"""
+        with self.assertRaises(ValueError):
+            ThinkTime({"distribution": "poisson"})
+
+
+class TestScriptedResponder(unittest.TestCase):
+    """测试按脚本生成回答"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.responder = ScriptedResponder({
+            "rules": [{"pattern": "部署|上线", "answer": "先不要部署"}],
+            "default_answer": "auto:{summary}",
+        }, channel=None)
+
+    def test_rule_and_default_answers(self):
+        """命中规则使用规则的回答，否则使用默认回答"""
+        self.assertEqual(self.responder.answer_for({"summary": "准备上线"}), {"result": "先不要部署"})
+        self.assertEqual(self.responder.answer_for({"summary": "完成"}), {"result": "auto:完成"})
+
+    def test_questions_answered_with_first_option(self):
+        """有选项的问题回答第一个选项"""
+        response = self.responder.answer_for({
+            "summary": "选择",
+            "questions": [{"id": "db", "options": ["SQLite", "Postgres"]}, {"id": "name", "options": []}],
+        })
+        self.assertEqual(response["answers"], [{"id": "db", "answer": "SQLite"},
+                                               {"id": "name", "answer": "auto:选择"}])
+
+
+class TestScriptedBackend(unittest.TestCase):
+    """测试服务器使用脚本应答后端"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        script = Path(self.temp_dir) / "script.json"
+        script.write_text(json.dumps({
+            "default_answer": "auto:{summary}",
+            "think_time": {"distribution": "uniform", "min_ms": 10, "max_ms": 50},
+        }), encoding="utf-8")
+        self.env = mock.patch.dict("os.environ", {
+            "VC_BUDDY_ANSWER_BACKEND": "scripted",
+            "VC_BUDDY_ANSWER_SCRIPT": str(script),
+        })
+        self.env.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.env.stop()
+        server_main._open_windows.clear()
+        server_main._window_locks.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_concurrent_requests_answered_by_script(self):
+        """同一项目的并发请求都由脚本回答，各自拿到自己的结果"""
+        async def scenario():
+            results = await asyncio.gather(*[
+                server_main._ask_ui({"summary": f"call {i}"}, "demo") for i in range(5)
+            ])
+            await asyncio.gather(*server_main._background_tasks)
+            return results
+
+        results = [json.loads(r)["result"] for r in asyncio.run(scenario())]
+        self.assertEqual(results, [f"auto:call {i}" for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+终端回答后端的单元测试
+通过伪终端模拟用户输入，验证与Qt窗口相同的请求/结果协议
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+
+BUDDY_DIR = Path(__file__).parent.parent
+
+
+class TerminalUser(threading.Thread):
+    """读取伪终端的输出，每出现一个输入提示就依次输入一个回答"""
+
+    def __init__(self, master_fd: int, replies):
+        super().__init__(daemon=True)
+        self.master_fd = master_fd
+        self.replies = list(replies)
+        self.output = ""
+
+    def run(self):
+        answered = 0
+        while True:
+            try:
+                chunk = os.read(self.master_fd, 4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            self.output += chunk.decode("utf-8", errors="replace")
+            while answered < len(self.replies) and self.output.count("> ") > answered:
+                os.write(self.master_fd, (self.replies[answered] + "\n").encode("utf-8"))
+                answered += 1
+
+
+@unittest.skipUnless(hasattr(os, "openpty"), "需要伪终端")
+class TestTerminalBackend(unittest.TestCase):
+    """测试终端后端的完整往返"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.master_fd, self.slave_fd = os.openpty()
+        self.env = mock.patch.dict("os.environ", {
+            "VC_BUDDY_ANSWER_BACKEND": "tty",
+            "VC_BUDDY_TTY": os.ttyname(self.slave_fd),
+        })
+        self.env.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.env.stop()
+        server_main._open_windows.clear()
+        server_main._window_locks.clear()
+        os.close(self.slave_fd)
+        os.close(self.master_fd)
+
+    def _run(self, coro_factory, replies):
+        user = TerminalUser(self.master_fd, replies)
+        user.start()
+
+        async def scenario():
+            result = await coro_factory()
+            await asyncio.gather(*server_main._background_tasks)
+            return result
+
+        return json.loads(asyncio.run(scenario())), user
+
+    def test_feedback_answered_in_terminal(self):
+        """摘要显示在终端中，输入的内容作为反馈返回"""
+        result, user = self._run(
+            lambda: server_main.ask_for_feedback("已完成登录页面", "/work/demo"), ["继续\\\n加上测试"]
+        )
+        self.assertEqual(result, {"result": "继续\n加上测试"})
+        self.assertIn("已完成登录页面", user.output)
+        self.assertIn("demo", user.output)
+
+    def test_questions_answered_by_option_number(self):
+        """选项可以输入编号，没有选项的问题自由回答"""
+        result, _ = self._run(
+            lambda: server_main.ask_questions([
+                {"id": "db", "question": "用哪个数据库？", "options": ["SQLite", "Postgres"]},
+                "项目名称？",
+            ]),
+            ["2", "buddy", ""],
+        )
+        self.assertEqual([a["answer"] for a in result["answers"]], ["Postgres", "buddy"])
+        self.assertEqual(result["result"], "")
+
+    def test_cancel_aborts_prompt(self):
+        """调用方取消时终端中的提问被放弃，进程随即退出"""
+        user = TerminalUser(self.master_fd, [])
+        user.start()
+
+        async def scenario():
+            task = asyncio.create_task(server_main._ask_ui({"summary": "等待中"}, "demo"))
+            while "> " not in user.output:
+                await asyncio.sleep(0.05)
+            window = server_main._open_windows["tty:demo"]
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.gather(*server_main._background_tasks)
+            return window.process.returncode
+
+        self.assertEqual(asyncio.run(asyncio.wait_for(scenario(), timeout=10)), 0)
+
+    def test_missing_terminal_reported(self):
+        """无法打开终端时返回错误原因"""
+        with mock.patch.dict("os.environ", {"VC_BUDDY_TTY": "/nonexistent/tty"}):
+            async def scenario():
+                result = await server_main._ask_ui({"summary": "x"}, "demo")
+                await asyncio.gather(*server_main._background_tasks)
+                return result
+
+            result = json.loads(asyncio.run(scenario()))
+        self.assertIn("无法打开终端", result["result"])
+
+
+class TestBackendSelection(unittest.TestCase):
+    """测试回答后端的选择"""
+
+    def test_auto_uses_terminal_without_display(self):
+        """auto 在没有图形显示的 Linux 上使用终端"""
+        with mock.patch.object(server_main.sys, "platform", "linux"), \
+                mock.patch.dict("os.environ", {"VC_BUDDY_ANSWER_BACKEND": "auto"}, clear=True):
+            self.assertEqual(server_main._get_answer_backend(), "tty")
+            os.environ["DISPLAY"] = ":0"
+            self.assertEqual(server_main._get_answer_backend(), "qt")
+
+    def test_unknown_backend_falls_back_to_qt(self):
+        """未知的后端名称退回 qt"""
+        with mock.patch.dict("os.environ", {"VC_BUDDY_ANSWER_BACKEND": "curses"}):
+            self.assertEqual(server_main._get_answer_backend(), "qt")
+
+    def test_terminal_ui_does_not_import_qt(self):
+        """终端界面不加载 PySide6"""
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, ui.answer_tty; print('PySide6' in sys.modules)"],
+            cwd=str(BUDDY_DIR), capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
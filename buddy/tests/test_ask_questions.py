@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ask_questions 批量提问工具的单元测试
+测试问题列表的规范化、答案整理，以及通过假UI脚本的一次完整往返
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+
+# 对每个问题回答第一个选项，没有选项时回答问题本身
+FAKE_UI_SCRIPT = '''
+import sys
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+request = read_frame(sys.stdin.buffer).payload
+answers = [
+    {{"id": q["id"], "answer": q["options"][0] if q["options"] else q["question"]}}
+    for q in request.get("questions", [])
+]
+channel.send(FrameType.RESULT, {{"result": "补充说明", "answers": answers}})
+'''
+
+
+class TestNormalizeQuestions(unittest.TestCase):
+    """测试问题列表规范化"""
+
+    def test_strings_and_dicts(self):
+        """字符串和字典混用，缺省ID按顺序生成"""
+        questions = server_main._normalize_questions([
+            "用哪个数据库？",
+            {"id": "lang", "question": "用什么语言？", "options": ["Python", "Go"]},
+        ])
+        self.assertEqual(questions, [
+            {"id": "q1", "question": "用哪个数据库？", "options": []},
+            {"id": "lang", "question": "用什么语言？", "options": ["Python", "Go"]},
+        ])
+
+    def test_invalid_lists_rejected(self):
+        """空列表、缺少问题内容和重复ID都被拒绝"""
+        for questions in ([], [{"options": ["a"]}], ["a", {"id": "q1", "question": "b"}]):
+            with self.assertRaises(ValueError):
+                server_main._normalize_questions(questions)
+
+    def test_missing_answers_are_empty(self):
+        """窗口未作答时每个问题的答案为空"""
+        questions = server_main._normalize_questions(["a", "b"])
+        result = server_main._collect_answers(questions, {"result": "", "answers": [{"id": "q2", "answer": "x"}]})
+        self.assertEqual([a["answer"] for a in result["answers"]], ["", "x"])
+
+
+class TestAskQuestions(unittest.TestCase):
+    """测试一次往返返回所有答案"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.script = Path(self.temp_dir) / "fake_ui.py"
+        self.script.write_text(
+            FAKE_UI_SCRIPT.format(buddy_dir=str(Path(__file__).parent.parent)), encoding="utf-8"
+        )
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_answers_returned_in_order(self):
+        """所有问题在同一个窗口中回答，按问题顺序返回"""
+        async def scenario():
+            result = await server_main.ask_questions([
+                {"id": "db", "question": "用哪个数据库？", "options": ["SQLite", "Postgres"]},
+                "项目名称？",
+            ])
+            await asyncio.gather(*server_main._background_tasks)
+            return result
+
+        with mock.patch.object(server_main, "UI_SCRIPT", self.script), \
+                mock.patch.dict("os.environ", {"VC_BUDDY_UI_MODE": "spawn"}):
+            result = json.loads(asyncio.run(scenario()))
+
+        self.assertEqual(result, {
+            "answers": [
+                {"id": "db", "question": "用哪个数据库？", "answer": "SQLite"},
+                {"id": "q2", "question": "项目名称？", "answer": "项目名称？"},
+            ],
+            "result": "补充说明",
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动应答规则的单元测试
+测试规则编译、匹配顺序、配置文件变化后的重新加载，以及命中后不打开窗口
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server.auto_answer import AutoAnswerEngine, AutoAnswerRules, compile_rules
+from buddy.server import main as server_main
+from buddy.server.project_config import ProjectSettings
+
+
+class TestAutoAnswerEngine(unittest.TestCase):
+    """测试AutoAnswerEngine类"""
+
+    def test_first_matching_rule_wins(self):
+        """按规则顺序返回第一个命中的规则"""
+        engine = AutoAnswerEngine(compile_rules([
+            {"name": "continue", "pattern": r"继续[？?]\s*$", "answer": ""},
+            {"name": "done", "keywords": ["Step Done"], "answer": "ok"},
+        ], "test"))
+        self.assertEqual(engine.match("第一步完成，是否继续？").name, "continue")
+        self.assertEqual(engine.match("step done, 继续?").name, "continue")
+        self.assertEqual(engine.match("STEP DONE").name, "done")
+        self.assertIsNone(engine.match("请确认数据库设计"))
+
+    def test_invalid_rules_skipped(self):
+        """无效的规则被跳过，不影响其他规则"""
+        rules = compile_rules([
+            {"name": "bad", "pattern": "("},
+            {"name": "empty"},
+            {"name": "off", "pattern": "x", "enabled": False},
+            {"name": "good", "pattern": "x"},
+        ], "test")
+        self.assertEqual([rule.name for rule in rules], ["good"])
+
+    def test_many_rules(self):
+        """数百条规则仍能正确匹配"""
+        engine = AutoAnswerEngine(compile_rules(
+            [{"name": f"r{i}", "keywords": [f"<checkpoint-{i}>"]} for i in range(500)], "test"
+        ))
+        self.assertEqual(engine.match("reached <checkpoint-499> now").name, "r499")
+        self.assertIsNone(engine.match("nothing to see " * 100))
+
+
+class TestAutoAnswerRules(unittest.TestCase):
+    """测试项目规则的加载和缓存"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = Path(self.temp_dir) / ".vc-buddy" / "config.json"
+        self.config_file.parent.mkdir()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_rules(self, auto_answer: dict, mtime: int):
+        self.config_file.write_text(json.dumps({"auto_answer": auto_answer}), encoding="utf-8")
+        os.utime(self.config_file, ns=(mtime, mtime))
+
+    def test_reload_on_change(self):
+        """配置文件不变时复用编译结果，变化后重新加载"""
+        rules = AutoAnswerRules(ProjectSettings({}))
+        self._write_rules({"rules": [{"name": "a", "pattern": "alpha"}]}, 1_000_000_000)
+        engine = rules.engine_for(self.temp_dir)
+        self.assertIs(rules.engine_for(self.temp_dir), engine)
+        self.assertEqual(rules.match("alpha", self.temp_dir).name, "a")
+
+        self._write_rules({"rules": [{"name": "b", "pattern": "beta"}]}, 2_000_000_000)
+        self.assertIsNone(rules.match("alpha", self.temp_dir))
+        self.assertEqual(rules.match("beta", self.temp_dir).name, "b")
+
+    def test_project_rules_before_global(self):
+        """项目规则优先，项目禁用时全局规则也不生效"""
+        rules = AutoAnswerRules(ProjectSettings({}), [{"name": "global", "pattern": "继续"}])
+        self.assertEqual(rules.match("继续吗", None).name, "global")
+
+        self._write_rules({"rules": [{"name": "project", "pattern": "继续"}]}, 1_000_000_000)
+        self.assertEqual(rules.match("继续吗", self.temp_dir).name, "project")
+
+        self._write_rules({"enabled": False, "rules": []}, 2_000_000_000)
+        self.assertIsNone(rules.match("继续吗", self.temp_dir))
+
+    def test_shares_project_settings_cache(self):
+        """规则和项目设置共用 ProjectSettings 的缓存：文件不变时两者都不再读取文件"""
+        settings = ProjectSettings({})
+        rules = AutoAnswerRules(settings)
+        self.config_file.write_text(json.dumps({
+            "server": {"feedback_timeout": 60},
+            "auto_answer": {"rules": [{"name": "a", "pattern": "alpha"}]},
+        }), encoding="utf-8")
+        self.assertEqual(settings.get(self.temp_dir, "server.feedback_timeout"), 60)
+        self.assertEqual(rules.match("alpha", self.temp_dir).name, "a")
+
+        with mock.patch("builtins.open", side_effect=AssertionError("不应重新读取配置文件")):
+            self.assertEqual(rules.match("alpha", self.temp_dir).name, "a")
+            self.assertEqual(settings.get(self.temp_dir, "server.feedback_timeout"), 60)
+
+        # 配置文件删除后回到全局规则
+        self.config_file.unlink()
+        self.assertIsNone(rules.match("alpha", self.temp_dir))
+
+    def test_matched_request_skips_ui(self):
+        """命中规则时直接返回预设答案，不启动反馈窗口"""
+        self._write_rules({"rules": [{"name": "routine", "keywords": ["continue?"], "answer": "继续"}]},
+                          1_000_000_000)
+        with mock.patch.object(server_main, "auto_answers", AutoAnswerRules(ProjectSettings({}))), \
+                mock.patch.object(server_main, "_ask_ui") as ask_ui:
+            result = asyncio.run(server_main.ask_for_feedback("Step done, continue?", self.temp_dir))
+        self.assertEqual(json.loads(result), {"result": "继续"})
+        ask_ui.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 Amplitude 批量上传接口替身的单元测试
+验证请求校验、insert_id 去重、延迟和失败注入，其他测试依赖这些行为判断上传结果
+"""
+
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core import fake_amplitude
+from buddy.core.fake_amplitude import FakeAmplitudeServer
+
+
+class TestFakeAmplitudeServer(unittest.TestCase):
+    """测试FakeAmplitudeServer类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = FakeAmplitudeServer(seed=1).start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.server.stop()
+
+    def post(self, payload, headers=None) -> int:
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.server.url, data=data, method="POST",
+                                         headers={"Content-Type": "application/json", **(headers or {})})
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    @staticmethod
+    def batch(*insert_ids):
+        return {"api_key": "test-key",
+                "events": [{"event_type": "app_opened", "device_id": "device", "insert_id": i} for i in insert_ids]}
+
+    def test_duplicate_insert_ids_counted_once(self):
+        """重复的 insert_id 只计一次"""
+        self.assertEqual(self.post(self.batch("a", "b")), 200)
+        self.assertEqual(self.post(self.batch("b", "c")), 200)
+        stats = self.server.stats()
+        self.assertEqual((stats["requests"], stats["events"], stats["duplicate_events"]), (2, 3, 1))
+
+    def test_invalid_requests_rejected(self):
+        """缺少 api_key、事件缺少 device_id、请求体不是 JSON 时返回 400"""
+        self.assertEqual(self.post({"events": [{"event_type": "x", "device_id": "d"}]}), 400)
+        self.assertEqual(self.post({"api_key": "k", "events": [{"event_type": "x"}]}), 400)
+        self.assertEqual(self.post(b"not json"), 400)
+        self.assertEqual(self.server.stats()["rejected_requests"], 3)
+        self.assertEqual(self.server.stats()["events"], 0)
+
+    def test_oversized_body_rejected(self):
+        """请求体超过上限时返回 413"""
+        original = fake_amplitude.MAX_BODY_BYTES
+        fake_amplitude.MAX_BODY_BYTES = 64
+        try:
+            self.assertEqual(self.post(self.batch(*[str(i) for i in range(10)])), 413)
+        finally:
+            fake_amplitude.MAX_BODY_BYTES = original
+        self.assertEqual(self.server.stats()["rejected_requests"], 1)
+
+    def test_injected_latency_and_failures(self):
+        """注入的延迟作用于每个请求，失败请求不记录事件"""
+        self.server.latency = 0.05
+        self.server.failure_rate = 1.0
+        self.server.failure_status = 429
+        started = time.monotonic()
+        self.assertEqual(self.post(self.batch("a")), 429)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual((self.server.stats()["failed_requests"], self.server.stats()["events"]), (1, 0))
+
+    def test_wait_for_events(self):
+        """等待事件到达，超时返回False"""
+        self.assertFalse(self.server.wait_for_events(1, timeout=0.05))
+        threading.Timer(0.05, self.post, args=(self.batch("a", "b"),)).start()
+        self.assertTrue(self.server.wait_for_events(2, timeout=5))
+        self.assertIsNotNone(self.server.last_event_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步 ask_for_feedback 的单元测试
+使用读取请求帧、延迟后输出结果帧的假UI脚本，验证等待期间不阻塞事件循环
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+
+FAKE_UI_SCRIPT = '''
+import sys, time
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+request = read_frame(sys.stdin.buffer).payload
+time.sleep({delay})
+print("DEBUG: 窗口已关闭")
+channel.send(FrameType.RESULT, {{"result": "done:" + request["summary"]}})
+'''
+
+
+class TestAsyncFeedback(unittest.TestCase):
+    """测试ask_for_feedback的异步行为"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {"VC_BUDDY_UI_MODE": "spawn"})
+        self.env.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.env.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _script(self, delay: float) -> Path:
+        script = Path(self.temp_dir) / "fake_ui.py"
+        buddy_dir = str(Path(__file__).parent.parent)
+        script.write_text(FAKE_UI_SCRIPT.format(buddy_dir=buddy_dir, delay=delay), encoding="utf-8")
+        return script
+
+    def test_concurrent_requests_do_not_block(self):
+        """不同项目的两个请求同时等待UI，总耗时接近单个请求，等待期间事件循环仍可调度其他任务"""
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.05)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                server_main.ask_for_feedback("a", str(Path(self.temp_dir) / "a")),
+                server_main.ask_for_feedback("b", str(Path(self.temp_dir) / "b")),
+            )
+            elapsed = time.perf_counter() - start
+            tick_task.cancel()
+            # 等待后台回收完成，避免进程泄漏到其他测试
+            await asyncio.gather(*server_main._background_tasks)
+            return results, elapsed, ticks
+
+        with mock.patch.object(server_main, "UI_SCRIPT", self._script(delay=1.0)):
+            results, elapsed, ticks = asyncio.run(scenario())
+
+        self.assertEqual([json.loads(r)["result"] for r in results], ["done:a", "done:b"])
+        self.assertLess(elapsed, 1.9)
+        self.assertGreater(ticks, 5)
+
+    def test_timeout_kills_ui(self):
+        """超过项目配置的反馈超时时间时结束UI进程并返回超时提示"""
+        config_dir = Path(self.temp_dir) / ".vc-buddy"
+        config_dir.mkdir()
+        (config_dir / "config.json").write_text(json.dumps({"server": {"feedback_timeout": 0.5}}), encoding="utf-8")
+        with mock.patch.object(server_main, "UI_SCRIPT", self._script(delay=30)):
+            start = time.perf_counter()
+            result = asyncio.run(server_main.ask_for_feedback("slow", self.temp_dir))
+
+        self.assertEqual(json.loads(result), {"result": "UI界面超时关闭"})
+        self.assertLess(time.perf_counter() - start, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
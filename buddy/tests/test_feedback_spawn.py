@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+spawn模式反馈流程的单元测试
+使用实现 --ipc 帧协议的假UI脚本，验证结果帧到达即返回
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.ipc import FrameType
+from buddy.server import main as server_main
+
+# 返回结果后故意延迟退出，模拟Qt事件循环收尾和统计上报
+FAKE_UI_SCRIPT = '''
+import sys, time
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+request = read_frame(sys.stdin.buffer).payload
+channel.send(FrameType.PROGRESS, {{"stage": "shown"}})
+if request["summary"] == "wait":
+    # 等待取消帧，收到后记录并退出
+    frame = read_frame(sys.stdin.buffer)
+    open({marker!r}, "w").write(str(frame.type if frame else "eof"))
+    sys.exit(0)
+if request["summary"] == "crash":
+    print("ERROR: 加载QML失败", file=sys.stderr)
+    sys.exit(3)
+if request["summary"] != "close":
+    channel.send(FrameType.RESULT, {{"result": "done:" + request["summary"]}})
+time.sleep({exit_delay})
+'''
+
+
+class TestSpawnFeedback(unittest.TestCase):
+    """测试_ask_via_spawn"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_script(self, exit_delay: float) -> Path:
+        script = Path(self.temp_dir) / "fake_ui.py"
+        buddy_dir = str(Path(__file__).parent.parent)
+        self.marker = Path(self.temp_dir) / "cancelled"
+        script.write_text(FAKE_UI_SCRIPT.format(
+            buddy_dir=buddy_dir, exit_delay=exit_delay, marker=str(self.marker),
+        ), encoding="utf-8")
+        return script
+
+    def _ask(self, script: Path, summary: str):
+        async def scenario():
+            start = time.perf_counter()
+            result = await server_main._ask_via_spawn({"summary": summary, "project_directory": None})
+            elapsed = time.perf_counter() - start
+            # 等待后台回收完成，避免进程泄漏到其他测试
+            await asyncio.gather(*server_main._background_tasks)
+            return result, elapsed
+
+        with mock.patch.object(server_main, "UI_SCRIPT", script):
+            return asyncio.run(scenario())
+
+    def test_result_returned_before_process_exits(self):
+        """收到结果帧即返回，不等待UI进程退出"""
+        result, elapsed = self._ask(self._write_script(exit_delay=2), "ok")
+        self.assertEqual(json.loads(result), {"result": "done:ok"})
+        self.assertLess(elapsed, 1.5)
+
+    def test_window_closed_without_result(self):
+        """UI未返回结果就退出时返回空反馈"""
+        result, _ = self._ask(self._write_script(exit_delay=0), "close")
+        self.assertEqual(json.loads(result), {"result": ""})
+
+    def test_crash_reports_stderr_tail(self):
+        """UI异常退出时返回退出码和最后的错误输出"""
+        result, _ = self._ask(self._write_script(exit_delay=0), "crash")
+        text = json.loads(result)["result"]
+        self.assertIn("退出码 3", text)
+        self.assertIn("加载QML失败", text)
+
+    def test_cancel_closes_window(self):
+        """调用被取消时通知窗口关闭，并计入取消次数"""
+        script = self._write_script(exit_delay=0)
+
+        async def scenario():
+            task = asyncio.create_task(server_main.ask_for_feedback("wait"))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            start = time.perf_counter()
+            await asyncio.gather(*server_main._background_tasks)
+            return time.perf_counter() - start
+
+        cancelled_before = server_main.metrics.get("feedback.cancelled")
+        with mock.patch.object(server_main, "UI_SCRIPT", script), \
+                mock.patch.dict("os.environ", {"VC_BUDDY_UI_MODE": "spawn"}):
+            reap_seconds = asyncio.run(scenario())
+
+        self.assertEqual(self.marker.read_text(), str(int(FrameType.CANCEL)))
+        self.assertLess(reap_seconds, server_main.UI_CANCEL_GRACE)
+        self.assertEqual(server_main.metrics.get("feedback.cancelled"), cancelled_before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分帧通信协议的单元测试
+测试帧的编码、增量解码、阻塞/异步读取和错误处理
+"""
+
+import asyncio
+import io
+import unittest
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.ipc import (
+    HEADER, MAGIC, FrameDecoder, FrameType, FrameWriter, IPCError,
+    encode_frame, read_frame, read_frame_async,
+)
+
+
+class TestFrameCodec(unittest.TestCase):
+    """测试帧编码与解码"""
+
+    def test_round_trip(self):
+        """编码后读取得到相同的负载"""
+        payload = {"summary": "完成了解析功能", "project_directory": "/tmp/项目"}
+        frame = read_frame(io.BytesIO(encode_frame(FrameType.REQUEST, payload)))
+        self.assertEqual(frame.type, FrameType.REQUEST)
+        self.assertEqual(frame.payload, payload)
+
+    def test_large_payload(self):
+        """多KB负载完整传输"""
+        payload = {"summary": "摘要" * 100000}
+        frame = read_frame(io.BytesIO(encode_frame(FrameType.REQUEST, payload)))
+        self.assertEqual(frame.payload, payload)
+
+    def test_decoder_handles_split_chunks(self):
+        """数据分块到达时按帧边界解码"""
+        data = encode_frame(FrameType.PROGRESS, {"stage": "shown"}) + \
+            encode_frame(FrameType.RESULT, {"result": "好的"})
+        decoder = FrameDecoder()
+        frames = []
+        for i in range(len(data)):
+            frames.extend(decoder.feed(data[i:i + 1]))
+        self.assertEqual([f.type for f in frames], [FrameType.PROGRESS, FrameType.RESULT])
+        self.assertEqual(frames[1].payload, {"result": "好的"})
+
+    def test_eof_returns_none(self):
+        """流结束时返回None"""
+        self.assertIsNone(read_frame(io.BytesIO(b"")))
+
+    def test_truncated_payload_raises(self):
+        """负载不完整时报错"""
+        data = encode_frame(FrameType.RESULT, {"result": "abc"})
+        with self.assertRaises(IPCError):
+            read_frame(io.BytesIO(data[:-2]))
+
+    def test_bad_magic_raises(self):
+        """魔数错误时报错"""
+        with self.assertRaises(IPCError):
+            FrameDecoder().feed(b'{"result": ""}\n')
+
+    def test_unknown_version_raises(self):
+        """协议版本不匹配时报错"""
+        data = HEADER.pack(MAGIC, 99, FrameType.RESULT, 2) + b"{}"
+        with self.assertRaises(IPCError):
+            read_frame(io.BytesIO(data))
+
+    def test_oversized_length_raises(self):
+        """长度字段超出上限时报错，不分配内存"""
+        data = HEADER.pack(MAGIC, 1, FrameType.RESULT, 0xFFFFFFFF)
+        with self.assertRaises(IPCError):
+            FrameDecoder().feed(data)
+
+    def test_writer_writes_frames(self):
+        """FrameWriter写出的数据可以被读取"""
+        stream = io.BytesIO()
+        writer = FrameWriter(stream)
+        writer.send(FrameType.DRAFT, {"text": "草稿"})
+        stream.seek(0)
+        self.assertEqual(read_frame(stream).payload, {"text": "草稿"})
+
+    def test_read_frame_async(self):
+        """异步读取多帧"""
+        async def scenario():
+            reader = asyncio.StreamReader()
+            reader.feed_data(encode_frame(FrameType.READY, {"port": 1}))
+            reader.feed_data(encode_frame(FrameType.RESULT, {"result": "ok"}))
+            reader.feed_eof()
+            return [await read_frame_async(reader) for _ in range(3)]
+
+        ready, result, end = asyncio.run(scenario())
+        self.assertEqual(ready.payload, {"port": 1})
+        self.assertEqual(result.type, FrameType.RESULT)
+        self.assertIsNone(end)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+等待反馈期间的进度通知和项目级超时设置的单元测试
+通过 FastMCP 客户端调用工具，窗口由脚本应答后端代替
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastmcp import Client
+
+from buddy.server import main as server_main
+from buddy.server.project_config import ProjectSettings
+
+
+class FakeGlobalConfig:
+    """只提供 get 的全局配置"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key_path, default=None):
+        return self.values.get(key_path, default)
+
+
+class TestProjectSettings(unittest.TestCase):
+    """测试项目设置覆盖全局配置"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = Path(self.temp_dir) / ".vc-buddy" / "config.json"
+        self.config_file.parent.mkdir()
+        self.settings = ProjectSettings(FakeGlobalConfig({"server.feedback_timeout": 600}))
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_project_overrides_global(self):
+        """项目中设置的项优先，没有设置的项使用全局配置"""
+        self.config_file.write_text(json.dumps({"server": {"keepalive_interval": 5}}), encoding="utf-8")
+        self.assertEqual(self.settings.get(self.temp_dir, "server.keepalive_interval", 15), 5)
+        self.assertEqual(self.settings.get(self.temp_dir, "server.feedback_timeout"), 600)
+        self.assertEqual(self.settings.get(None, "server.keepalive_interval", 15), 15)
+
+    def test_reload_on_change(self):
+        """配置文件变化后重新读取，损坏的文件退回全局配置"""
+        self.config_file.write_text(json.dumps({"server": {"feedback_timeout": 60}}), encoding="utf-8")
+        self.assertEqual(self.settings.get(self.temp_dir, "server.feedback_timeout"), 60)
+
+        self.config_file.write_text(json.dumps({"server": {"feedback_timeout": 1800}}), encoding="utf-8")
+        os.utime(self.config_file, ns=(0, 1))
+        self.assertEqual(self.settings.get(self.temp_dir, "server.feedback_timeout"), 1800)
+
+        self.config_file.write_text("{", encoding="utf-8")
+        self.assertEqual(self.settings.get(self.temp_dir, "server.feedback_timeout"), 600)
+
+
+class TestKeepalive(unittest.TestCase):
+    """测试服务器在等待用户期间发送进度通知"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        script = Path(self.temp_dir) / "script.json"
+        script.write_text(json.dumps({
+            "default_answer": "auto:{summary}",
+            "think_time": {"distribution": "fixed", "ms": 600},
+        }), encoding="utf-8")
+        self.env = mock.patch.dict("os.environ", {
+            "VC_BUDDY_ANSWER_BACKEND": "scripted",
+            "VC_BUDDY_ANSWER_SCRIPT": str(script),
+        })
+        self.env.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.env.stop()
+        server_main._open_windows.clear()
+        server_main._window_locks.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_project_config(self, server_settings):
+        config_file = Path(self.temp_dir) / ".vc-buddy" / "config.json"
+        config_file.parent.mkdir(exist_ok=True)
+        config_file.write_text(json.dumps({"server": server_settings}), encoding="utf-8")
+
+    def call_feedback(self):
+        """通过MCP客户端调用 ask_for_feedback，返回结果和收到的进度通知"""
+        progress = []
+
+        async def on_progress(value, total, message):
+            progress.append((value, total, message))
+
+        async def scenario():
+            async with Client(server_main.mcp) as client:
+                result = await client.call_tool(
+                    "ask_for_feedback",
+                    {"summary": "长时间审阅", "project_directory": self.temp_dir},
+                    progress_handler=on_progress,
+                )
+            await asyncio.gather(*server_main._background_tasks)
+            return json.loads(result[0].text)
+
+        return asyncio.run(asyncio.wait_for(scenario(), timeout=20)), progress
+
+    def test_progress_sent_while_waiting(self):
+        """按项目设置的间隔发送进度通知，total 为项目设置的超时时间"""
+        self.write_project_config({"keepalive_interval": 0.1, "feedback_timeout": 30})
+        result, progress = self.call_feedback()
+        self.assertEqual(result, {"result": "auto:长时间审阅"})
+        self.assertGreaterEqual(len(progress), 3)
+        self.assertTrue(all(total == 30 for _, total, _ in progress))
+        self.assertIn("等待用户反馈", progress[0][2])
+
+    def test_keepalive_disabled(self):
+        """间隔为0时不发送进度通知"""
+        self.write_project_config({"keepalive_interval": 0})
+        result, progress = self.call_feedback()
+        self.assertEqual(result, {"result": "auto:长时间审阅"})
+        self.assertEqual(progress, [])
+
+    def test_project_feedback_timeout(self):
+        """项目设置的超时时间代替默认的10分钟"""
+        self.write_project_config({"feedback_timeout": 0.2, "keepalive_interval": 0})
+        result, _ = self.call_feedback()
+        self.assertEqual(result, {"result": "UI界面超时关闭"})
+
+
+if __name__ == '__main__':
+    unittest.main()
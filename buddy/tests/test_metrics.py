@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器指标的单元测试
+测试耗时直方图、调用阶段计算、环形缓冲区，以及一次真实调用记录的阶段
+"""
+
+import asyncio
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+from buddy.server.metrics import CallTrace, LatencyHistogram, ServerMetrics
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """测试耗时直方图"""
+
+    def test_percentiles_use_bucket_bounds(self):
+        """分位数取所在桶的上界，且不超过最大值"""
+        histogram = LatencyHistogram()
+        for ms in [3] * 90 + [150] * 9 + [4000]:
+            histogram.observe(ms)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["p50_ms"], 5)
+        self.assertEqual(summary["p95_ms"], 200)
+        self.assertEqual(summary["p99_ms"], 200)
+        self.assertEqual(summary["max_ms"], 4000)
+        self.assertEqual(sum(b["count"] for b in histogram.to_dict()["buckets"]), 100)
+
+    def test_empty_histogram(self):
+        """没有数据时分位数为空"""
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+
+class TestCallTrace(unittest.TestCase):
+    """测试调用阶段的计算"""
+
+    def test_phases_from_marks(self):
+        """按时间戳计算各阶段，缺少首帧时交互从请求发出算起"""
+        trace = CallTrace("demo")
+        trace._marks.update(start=0.0, slot=0.01, window_opened=0.05, request_sent=0.06,
+                            result_frame=1.06)
+        trace._marks["done"] = 1.07
+        trace.finish("completed")
+        self.assertEqual(trace.phases, {
+            "queue": 10.0, "spawn": 40.0, "interaction": 1000.0, "return": 10.0, "total": 1070.0,
+        })
+        self.assertTrue(trace.to_dict()["spawned"])
+
+    def test_ring_buffer_keeps_recent_calls(self):
+        """环形缓冲区只保留最近的调用，直方图统计全部调用"""
+        metrics = ServerMetrics(recent_calls=3)
+        for i in range(5):
+            metrics.record_call(CallTrace(f"p{i}").finish("completed"))
+        self.assertEqual([c["project"] for c in metrics.recent_calls()], ["p2", "p3", "p4"])
+        self.assertEqual(metrics.histogram("total").count, 5)
+
+
+class TestRecordedPhases(unittest.TestCase):
+    """测试一次真实调用记录的阶段"""
+
+    def test_feedback_call_records_phases(self):
+        """脚本应答后端的调用记录启动、首帧、交互和进程退出的耗时"""
+        async def scenario():
+            result = await server_main.ask_for_feedback("阶段耗时", "/tmp/vc-buddy-metrics")
+            await asyncio.gather(*server_main._background_tasks)
+            return result
+
+        exits_before = server_main.metrics.histogram("exit")
+        exits_before = exits_before.count if exits_before else 0
+        with mock.patch.dict("os.environ", {"VC_BUDDY_ANSWER_BACKEND": "scripted"}):
+            asyncio.run(scenario())
+        server_main._open_windows.clear()
+        server_main._window_locks.clear()
+
+        snapshot = json.loads(server_main.call_metrics())
+        call = snapshot["recent_calls"][-1]
+        self.assertEqual(call["project"], "vc-buddy-metrics")
+        self.assertEqual(call["outcome"], "completed")
+        self.assertTrue(call["spawned"])
+        for phase in ("queue", "spawn", "first_frame", "interaction", "return", "total"):
+            self.assertIn(phase, call["phases_ms"])
+        self.assertEqual(snapshot["histograms"]["exit"]["count"], exits_before + 1)
+        resource = json.loads(server_main.server_metrics())
+        self.assertIn("total", resource["phases"])
+        # 调用结束后项目队列已释放
+        self.assertEqual(resource["router"]["projects"], {})
+        self.assertIn("sessions", resource["router"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地性能指标存储和 vc-buddy metrics 命令的单元测试
+"""
+
+import contextlib
+import io
+import json
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy import cli
+from buddy.core import metrics_store
+from buddy.core.metrics_store import MetricsStore
+
+
+class TestMetricsStore(unittest.TestCase):
+    """测试耗时记录的写入和汇总"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "metrics.db"
+        self.store = MetricsStore(self.path, enabled=True)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_percentiles_per_operation(self):
+        """按操作汇总分位数"""
+        for ms in range(1, 101):
+            self.store.record("voice.transcription", ms)
+        self.store.record("todo.save", 3, ok=False)
+        self.assertTrue(self.store.flush(timeout=5))
+
+        summaries = {summary["operation"]: summary for summary in self.store.summarize()}
+        voice = summaries["voice.transcription"]
+        self.assertEqual((voice["count"], voice["errors"]), (100, 0))
+        self.assertEqual((voice["p50_ms"], voice["p95_ms"], voice["p99_ms"], voice["max_ms"]), (50, 95, 99, 100))
+        self.assertEqual((summaries["todo.save"]["count"], summaries["todo.save"]["errors"]), (1, 1))
+
+    def test_span_records_failure(self):
+        """with 块抛出异常时记为失败，附加属性写入数据库"""
+        with self.assertRaises(RuntimeError):
+            with self.store.span("deepseek.summary", model="deepseek-chat"):
+                raise RuntimeError("offline")
+        with self.store.span("deepseek.summary"):
+            time.sleep(0.01)
+        self.store.flush(timeout=5)
+
+        (summary,) = self.store.summarize()
+        self.assertEqual((summary["count"], summary["errors"]), (2, 1))
+        self.assertGreaterEqual(summary["max_ms"], 10)
+        with contextlib.closing(sqlite3.connect(self.path)) as conn:
+            attrs = conn.execute("SELECT attrs FROM spans WHERE ok = 0").fetchone()[0]
+        self.assertEqual(json.loads(attrs), {"model": "deepseek-chat"})
+
+    def test_time_range_and_prefix(self):
+        """按时间范围和操作名前缀筛选"""
+        now = time.time()
+        self.store.record("window.startup", 800, started_at=now - 3 * 86400)
+        self.store.record("window.startup", 500, started_at=now - 60)
+        self.store.record("window.qml_load", 200, started_at=now - 60)
+        self.store.record("todo.save", 5, started_at=now - 60)
+        self.store.flush(timeout=5)
+
+        summaries = self.store.summarize(since=now - 86400, operation="window.")
+        self.assertEqual([(s["operation"], s["count"], s["max_ms"]) for s in summaries],
+                         [("window.qml_load", 1, 200), ("window.startup", 1, 500)])
+        self.assertEqual(self.store.summarize(until=now - 86400)[0]["max_ms"], 800)
+
+    def test_old_records_pruned(self):
+        """超过保留天数的记录在打开数据库时删除"""
+        self.store.record("todo.save", 5, started_at=time.time() - (metrics_store.RETENTION_DAYS + 1) * 86400)
+        self.store.flush(timeout=5)
+        self.assertEqual(self.store.summarize()[0]["count"], 1)
+
+        store = MetricsStore(self.path, enabled=True)
+        store.record("todo.save", 7)
+        store.flush(timeout=5)
+        self.assertEqual((store.summarize()[0]["count"], store.summarize()[0]["max_ms"]), (1, 7))
+
+    def test_disabled_by_environment(self):
+        """VC_BUDDY_METRICS_DISABLED=1 时不记录"""
+        with mock.patch.dict("os.environ", {"VC_BUDDY_METRICS_DISABLED": "1"}):
+            store = MetricsStore(self.path)
+        store.record("todo.save", 5)
+        self.assertIsNone(store._writer)
+        self.assertFalse(self.path.exists())
+
+    def test_summarize_without_database(self):
+        """没有数据库时返回空结果，不创建文件"""
+        self.assertEqual(self.store.summarize(), [])
+        self.assertFalse(self.path.exists())
+
+
+class TestMetricsCommand(unittest.TestCase):
+    """测试 vc-buddy metrics 命令"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "metrics.db"
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.main(["metrics", "--db", str(self.path), *args]), 0)
+        return output.getvalue()
+
+    def test_table_and_json(self):
+        """输出各操作的分位数表格或 JSON"""
+        store = MetricsStore(self.path, enabled=True)
+        for ms in (100, 200, 300):
+            store.record("window.startup", ms)
+        store.flush(timeout=5)
+
+        table = self.run_cli("--since", "1h")
+        self.assertIn("p95 ms", table)
+        self.assertRegex(table, r"window\.startup\s+3\s+0\s+200\.0\s+300\.0\s+300\.0\s+300\.0")
+
+        report = json.loads(self.run_cli("--json", "--operation", "window."))
+        self.assertEqual(report["operations"][0]["p50_ms"], 200)
+        self.assertIn("没有记录", self.run_cli("--operation", "voice."))
+
+    def test_installed_command(self):
+        """安装后的 vc-buddy 命令（pyproject.toml 的 [project.scripts]）输出 JSON 汇总"""
+        command = shutil.which("vc-buddy", path=str(Path(sys.executable).parent)) or shutil.which("vc-buddy")
+        if command is None:
+            self.skipTest("vc-buddy 未安装（uv sync 或 pip install -e . 后可用）")
+        store = MetricsStore(self.path, enabled=True)
+        store.record("todo.save", 12)
+        store.flush(timeout=5)
+
+        completed = subprocess.run([command, "metrics", "--db", str(self.path), "--json"],
+                                   capture_output=True, text=True, timeout=60)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        report = json.loads(completed.stdout)
+        self.assertEqual([(s["operation"], s["count"], s["max_ms"]) for s in report["operations"]],
+                         [("todo.save", 1, 12)])
+
+    def test_parse_time(self):
+        """相对时长和 ISO 时间"""
+        now = 1_000_000.0
+        self.assertEqual(cli.parse_time("30m", now), now - 1800)
+        self.assertEqual(cli.parse_time("7d", now), now - 7 * 86400)
+        self.assertEqual(cli.parse_time("now", now), now)
+        self.assertEqual(cli.parse_time("2026-01-31T09:00"),
+                         time.mktime((2026, 1, 31, 9, 0, 0, 0, 0, -1)))
+        with self.assertRaises(Exception):
+            cli.parse_time("yesterday")
+
+
+if __name__ == '__main__':
+    unittest.main()
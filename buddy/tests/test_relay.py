@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程反馈窗口中继的单元测试
+在本机上连接服务器侧的 RelayClient 与中继宿主 RelayHost，窗口由假的应答函数代替
+"""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.ipc import FrameType, encode_frame, read_frame_async
+from buddy.server import main as server_main
+from buddy.server.relay import RelayClient, RelayHost, RelayUnavailable, parse_address
+
+
+class FakeWindow:
+    """按摘要回答的假窗口；summary 以 wait 开头的请求等到 release 后才回答"""
+
+    def __init__(self):
+        self.shown = []
+        self.cancelled = []
+        self.release = asyncio.Event()
+
+    async def answer(self, input_data, on_frame):
+        self.shown.append(input_data["summary"])
+        on_frame(type("Frame", (), {"type": FrameType.PROGRESS, "payload": {"stage": "shown"}})())
+        try:
+            if input_data["summary"].startswith("wait"):
+                await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(input_data["summary"])
+            raise
+        return {"result": "answer:" + input_data["summary"]}
+
+
+class TestRelay(unittest.TestCase):
+    """测试中继的往返、复用、取消和重连"""
+
+    def run_async(self, coro):
+        return asyncio.run(asyncio.wait_for(coro, timeout=20))
+
+    async def start(self, token="", **client_options):
+        self.window = FakeWindow()
+        self.host = RelayHost(self.window.answer, token="secret", resume_timeout=5)
+        self.server = await self.host.serve("127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.client = RelayClient("127.0.0.1", port, token=token or "secret", **client_options)
+        return port
+
+    async def stop(self):
+        await self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def test_parse_address(self):
+        """地址解析"""
+        self.assertEqual(parse_address("devbox:9000"), ("devbox", 9000))
+        self.assertEqual(parse_address("[::1]:9000"), ("::1", 9000))
+        self.assertEqual(parse_address("localhost"), ("localhost", 8765))
+
+    def test_concurrent_requests_share_one_connection(self):
+        """多个请求在同一条连接上复用，各自拿到自己的结果和进度"""
+        async def scenario():
+            await self.start()
+            frames = []
+            results = await asyncio.gather(*[
+                self.client.ask({"summary": f"s{i}"}, timeout=5, on_frame=frames.append) for i in range(5)
+            ])
+            await self.stop()
+            return results, frames
+
+        results, frames = self.run_async(scenario())
+        self.assertEqual([r["result"] for r in results], [f"answer:s{i}" for i in range(5)])
+        self.assertEqual(len(frames), 5)
+        self.assertEqual(self.client.connections, 1)
+
+    def test_cancel_closes_remote_window(self):
+        """调用方取消时通知宿主关闭对应的窗口"""
+        async def scenario():
+            await self.start()
+            task = asyncio.create_task(self.client.ask({"summary": "wait-cancel"}, timeout=5))
+            while not self.window.shown:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            while not self.window.cancelled:
+                await asyncio.sleep(0.01)
+            await self.stop()
+
+        self.run_async(scenario())
+        self.assertEqual(self.window.cancelled, ["wait-cancel"])
+
+    def test_reconnect_resumes_pending_request(self):
+        """连接断开后重连，窗口不会重复显示，结果在重连后送达"""
+        async def scenario():
+            await self.start()
+            task = asyncio.create_task(self.client.ask({"summary": "wait-resume"}, timeout=10))
+            while not self.window.shown:
+                await asyncio.sleep(0.01)
+            # 模拟网络中断
+            self.client._writer.transport.abort()
+            while self.client.connections < 2:
+                await asyncio.sleep(0.01)
+            self.window.release.set()
+            result = await task
+            await self.stop()
+            return result
+
+        self.assertEqual(self.run_async(scenario()), {"result": "answer:wait-resume"})
+        self.assertEqual(self.window.shown, ["wait-resume"])
+
+    def test_heartbeat_timeout_reconnects(self):
+        """宿主不回复心跳时断开并重连"""
+        async def silent_host(reader, writer):
+            await read_frame_async(reader)
+            writer.write(encode_frame(FrameType.READY, {}))
+            accepted.append(writer)
+            # 只读取不回复
+            while await read_frame_async(reader) is not None:
+                pass
+
+        async def scenario():
+            server = await asyncio.start_server(silent_host, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            client = RelayClient("127.0.0.1", port, heartbeat_interval=0.05, heartbeat_timeout=0.2)
+            client.start()
+            while len(accepted) < 2:
+                await asyncio.sleep(0.02)
+            await client.close()
+            server.close()
+            return client.connections
+
+        accepted = []
+        self.assertGreaterEqual(self.run_async(scenario()), 2)
+
+    def test_wrong_token_rejected(self):
+        """token 不匹配时连接被拒绝，请求报告中继不可用"""
+        async def scenario():
+            await self.start(token="wrong", connect_timeout=0.5)
+            with self.assertRaises(RelayUnavailable) as raised:
+                await self.client.ask({"summary": "x"}, timeout=5)
+            await self.stop()
+            return str(raised.exception)
+
+        self.assertIn("token", self.run_async(scenario()))
+        self.assertEqual(self.window.shown, [])
+
+    def test_host_requires_token(self):
+        """宿主不能在没有 token 的情况下启动，缺少 token 的连接被拒绝"""
+        with self.assertRaises(ValueError):
+            RelayHost(FakeWindow().answer, token="")
+
+        async def scenario():
+            port = await self.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(encode_frame(FrameType.READY, {}))
+            rejected = await read_frame_async(reader)
+            writer.close()
+            await self.stop()
+            return rejected
+
+        rejected = self.run_async(scenario())
+        self.assertEqual(rejected.type, FrameType.CANCEL)
+        self.assertIn("token", rejected.payload["error"])
+
+    def test_unreachable_host(self):
+        """没有中继宿主时很快报告不可用"""
+        async def scenario():
+            client = RelayClient("127.0.0.1", 1, connect_timeout=0.3)
+            try:
+                await client.ask({"summary": "x"}, timeout=5)
+            finally:
+                await client.close()
+
+        with self.assertRaises(RelayUnavailable):
+            self.run_async(scenario())
+
+
+class TestRelayBackend(unittest.TestCase):
+    """测试服务器通过 relay 后端回答反馈请求"""
+
+    def tearDown(self):
+        """测试后清理"""
+        server_main._relay_client = None
+
+    def test_feedback_answered_through_relay(self):
+        """ask_for_feedback 的请求转发到中继宿主"""
+        async def scenario():
+            window = FakeWindow()
+            server = await RelayHost(window.answer, token="secret").serve("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            with mock.patch.dict("os.environ", {"VC_BUDDY_ANSWER_BACKEND": "relay",
+                                                "VC_BUDDY_RELAY": f"127.0.0.1:{port}",
+                                                "VC_BUDDY_RELAY_TOKEN": "secret"}):
+                server_main._relay_client = None
+                result = await server_main.ask_for_feedback("远程请求")
+            await server_main._relay_client.close()
+            server.close()
+            return json.loads(result)
+
+        result = asyncio.run(asyncio.wait_for(scenario(), timeout=20))
+        self.assertEqual(result, {"result": "answer:远程请求"})
+
+
+if __name__ == '__main__':
+    unittest.main()
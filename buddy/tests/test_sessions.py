@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+反馈请求路由的单元测试
+测试FeedbackRouter的按项目排队和队列上限
+"""
+
+import asyncio
+import unittest
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server.sessions import FeedbackRouter, ProjectQueueFull
+
+
+class TestFeedbackRouter(unittest.TestCase):
+    """测试FeedbackRouter类"""
+
+    def test_same_project_is_serialized(self):
+        """同一项目的请求依次处理"""
+        async def scenario():
+            router = FeedbackRouter(max_pending_per_project=4)
+            active = []
+            overlaps = []
+
+            async def request(session_id):
+                async with router.slot("/project", session_id):
+                    active.append(session_id)
+                    overlaps.append(len(active))
+                    await asyncio.sleep(0.01)
+                    active.remove(session_id)
+
+            await asyncio.gather(*[request(f"s{i}") for i in range(3)])
+            return overlaps
+
+        self.assertEqual(asyncio.run(scenario()), [1, 1, 1])
+
+    def test_coalesced_requests_run_concurrently(self):
+        """合并模式下同一项目的请求同时处理，总数仍受上限限制"""
+        async def scenario():
+            router = FeedbackRouter(max_pending_per_project=3)
+            release = asyncio.Event()
+            entered = []
+
+            async def request(session_id):
+                async with router.slot("/project", session_id, exclusive=False):
+                    entered.append(session_id)
+                    await release.wait()
+
+            tasks = [asyncio.create_task(request(f"s{i}")) for i in range(3)]
+            await asyncio.sleep(0)
+            with self.assertRaises(ProjectQueueFull):
+                async with router.slot("/project", "s4", exclusive=False):
+                    pass
+            active = router.status()["projects"]["/project"]["active"]
+            release.set()
+            await asyncio.gather(*tasks)
+            return len(entered), active
+
+        self.assertEqual(asyncio.run(scenario()), (3, 3))
+
+    def test_status_lists_all_active_sessions(self):
+        """合并模式下状态列出所有正在处理的会话，请求结束后移除"""
+        async def scenario():
+            router = FeedbackRouter()
+            release = asyncio.Event()
+
+            async def request(session_id):
+                async with router.slot("/project", session_id, exclusive=False):
+                    await release.wait()
+
+            tasks = [asyncio.create_task(request(s)) for s in ("s1", "s2", "s1")]
+            await asyncio.sleep(0)
+            during = router.status()["projects"]["/project"]
+            release.set()
+            await asyncio.gather(*tasks)
+            return during, router.status()["projects"]
+
+        during, after = asyncio.run(scenario())
+        self.assertEqual(during, {"active_sessions": ["s1", "s2", "s1"], "active": 3, "waiting": 0})
+        self.assertEqual(after, {})
+
+    def test_different_projects_run_concurrently(self):
+        """不同项目的请求可以同时处理"""
+        async def scenario():
+            router = FeedbackRouter(max_pending_per_project=1)
+            entered = asyncio.Event()
+
+            async def first():
+                async with router.slot("/a", "s1"):
+                    await entered.wait()
+
+            async def second():
+                async with router.slot("/b", "s2"):
+                    entered.set()
+
+            await asyncio.wait_for(asyncio.gather(first(), second()), timeout=1)
+
+        asyncio.run(scenario())
+
+    def test_queue_full_rejects(self):
+        """排队数量达到上限时立即拒绝"""
+        async def scenario():
+            router = FeedbackRouter(max_pending_per_project=2)
+            release = asyncio.Event()
+
+            async def hold(session_id):
+                async with router.slot("/project", session_id):
+                    await release.wait()
+
+            tasks = [asyncio.create_task(hold("s1")), asyncio.create_task(hold("s2"))]
+            await asyncio.sleep(0)
+            with self.assertRaises(ProjectQueueFull):
+                async with router.slot("/project", "s3"):
+                    pass
+            release.set()
+            await asyncio.gather(*tasks)
+            # 队列清空后项目记录被移除
+            return router.status()["projects"]
+
+        self.assertEqual(asyncio.run(scenario()), {})
+
+    def test_register_session_counts_requests(self):
+        """会话记录请求次数"""
+        async def scenario():
+            router = FeedbackRouter()
+            router.register_session("s1", "cursor")
+            async with router.slot("/project", "s1"):
+                pass
+            return router.status()["sessions"]
+
+        sessions = asyncio.run(scenario())
+        self.assertEqual(sessions, [{"session_id": "s1", "client_name": "cursor", "requests": 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器冷启动的回归测试
+在新的解释器中导入服务器模块，检查只在特定模式下使用的模块没有在启动时被导入；并测试版本号的获取
+（不检查导入耗时：墙钟时间在负载较高的CI上波动太大，延迟导入的模块集合才是稳定的回归信号）
+"""
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core import version
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+
+# 启动时不应导入的模块：进程池、中继、TODO 索引只在对应模式或工具中使用，Qt和网络库属于UI进程
+DEFERRED_MODULES = {"server.ui_pool", "server.relay", "server.todo_index", "ui.todo_parser",
+                    "PySide6", "requests", "openai", "amplitude"}
+
+
+def _imported_modules() -> set:
+    """在新的解释器中导入服务器模块，返回导入后已加载的模块名"""
+    completed = subprocess.run(
+        [sys.executable, "-c", "import json, sys; import main; print(json.dumps(sorted(sys.modules)))"],
+        cwd=SERVER_DIR, capture_output=True, text=True, timeout=60,
+    )
+    if completed.returncode != 0:
+        raise AssertionError(completed.stderr[-2000:])
+    return set(json.loads(completed.stdout.splitlines()[-1]))
+
+
+class TestServerImports(unittest.TestCase):
+    """测试服务器启动时导入的模块"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.modules = _imported_modules()
+
+    def test_mode_specific_modules_deferred(self):
+        """只在特定模式下使用的模块不在启动时导入"""
+        self.assertIn("server.ui_daemon", self.modules)
+        imported = {name for name in self.modules if name.split(".")[0] in DEFERRED_MODULES or name in DEFERRED_MODULES}
+        self.assertEqual(imported, set())
+
+
+class TestAppVersion(unittest.TestCase):
+    """测试版本号的获取"""
+
+    def setUp(self):
+        """测试前准备"""
+        version.get_app_version.cache_clear()
+
+    def tearDown(self):
+        """测试后清理"""
+        version.get_app_version.cache_clear()
+
+    def test_generated_module_preferred(self):
+        """有生成的版本模块时不查询包元数据"""
+        with mock.patch.object(version, "_get_version_from_module", return_value="9.9.9"), \
+                mock.patch.object(version, "_get_version_from_metadata") as metadata:
+            self.assertEqual(version.get_app_version(), "9.9.9")
+            metadata.assert_not_called()
+
+    def test_result_cached(self):
+        """版本号只解析一次"""
+        with mock.patch.object(version, "_get_version_from_module", return_value=None), \
+                mock.patch.object(version, "_get_version_from_metadata", return_value=None), \
+                mock.patch.object(version, "_get_version_from_pyproject", return_value="1.2.3") as pyproject:
+            self.assertEqual(version.get_app_version(), "1.2.3")
+            self.assertEqual(version.get_app_version(), "1.2.3")
+            self.assertEqual(pyproject.call_count, 1)
+
+    def test_write_version_file(self):
+        """生成的版本模块包含 pyproject.toml 中的版本号"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "_version.py"
+            written = version.write_version_file(path)
+            namespace = {}
+            exec(path.read_text(encoding="utf-8"), namespace)
+        self.assertEqual(namespace["__version__"], written)
+        self.assertEqual(written, version._get_version_from_pyproject())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目 TODO 索引的单元测试
+测试路径解析、完成状态写回，以及按文件变化失效的缓存
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+from buddy.server.todo_index import TodoIndex, TodoNotFound
+
+TODO_CONTENT = """# 功能
+priority=high
+
+## 登录页面
+state=done
+
+## 注册页面
+
+实现邮箱注册
+
+# 文档
+"""
+
+
+class TestTodoIndex(unittest.TestCase):
+    """测试 TODO 索引"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.todo_file = Path(self.temp_dir) / "TODO.md"
+        self.todo_file.write_text(TODO_CONTENT, encoding="utf-8")
+        self.index = TodoIndex()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_list_tree_with_paths(self):
+        """任务树中每个任务带有序号路径"""
+        todos = self.index.list(self.temp_dir)
+        self.assertEqual([t["title"] for t in todos], ["功能", "文档"])
+        children = todos[0]["children"]
+        self.assertEqual([(c["path"], c["title"], c["done"]) for c in children],
+                         [("1.1", "登录页面", True), ("1.2", "注册页面", False)])
+        self.assertNotIn("content", children[1])
+
+    def test_get_by_index_or_title_path(self):
+        """序号路径和标题路径指向同一个任务"""
+        by_index = self.index.get(self.temp_dir, "1.2")
+        by_title = self.index.get(self.temp_dir, "功能/注册页面")
+        self.assertEqual(by_index, by_title)
+        self.assertEqual(by_index["content"], "实现邮箱注册")
+
+    def test_missing_path_and_file(self):
+        """路径不存在或项目没有 TODO.md 时报错"""
+        for path in ("3", "1.5", "功能/不存在", ""):
+            with self.assertRaises(TodoNotFound):
+                self.index.get(self.temp_dir, path)
+        with self.assertRaises(TodoNotFound):
+            self.index.list(tempfile.gettempdir() + "/vc-buddy-no-such-project")
+
+    def test_set_done_writes_file(self):
+        """标记完成/未完成写回文件，其他内容保持不变"""
+        self.index.set_done(self.temp_dir, "1.2", True)
+        self.index.set_done(self.temp_dir, "功能/登录页面", False)
+        content = self.todo_file.read_text(encoding="utf-8")
+        fresh = TodoIndex().list(self.temp_dir)
+        self.assertEqual([c["done"] for c in fresh[0]["children"]], [False, True])
+        self.assertIn("priority=high", content)
+        self.assertIn("实现邮箱注册", content)
+
+    def test_cache_invalidated_by_file_change(self):
+        """文件未变化时不重新解析，变化后重新解析"""
+        self.index.list(self.temp_dir)
+        with mock.patch.object(self.index._parser, "parse_file",
+                               wraps=self.index._parser.parse_file) as parse_file:
+            self.index.list(self.temp_dir)
+            self.index.set_done(self.temp_dir, "2", True)
+            self.index.list(self.temp_dir)
+            self.assertEqual(parse_file.call_count, 0)
+
+            self.todo_file.write_text(TODO_CONTENT + "\n# 发布\n", encoding="utf-8")
+            os.utime(self.todo_file, ns=(0, 1))
+            todos = self.index.list(self.temp_dir)
+            self.assertEqual(parse_file.call_count, 1)
+        self.assertEqual(todos[-1]["title"], "发布")
+
+
+class TestTodoTools(unittest.TestCase):
+    """测试 TODO 工具的返回值"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        (Path(self.temp_dir) / "TODO.md").write_text(TODO_CONTENT, encoding="utf-8")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_tools_return_json(self):
+        """正常情况下返回任务数据"""
+        todos = json.loads(server_main.list_todos(self.temp_dir))["todos"]
+        self.assertEqual([t["title"] for t in todos], ["功能", "文档"])
+        self.assertEqual(json.loads(server_main.get_todo(self.temp_dir, "1.2"))["title"], "注册页面")
+
+    def test_missing_todo_file_returns_error(self):
+        """项目目录不存在或没有 TODO.md 时返回 error 字段，而不是抛出异常"""
+        missing = str(Path(self.temp_dir) / "missing")
+        for output in (server_main.list_todos(missing),
+                       server_main.get_todo(missing, "1"),
+                       server_main.set_todo_done(missing, "1")):
+            self.assertIn("TODO.md", json.loads(output)["error"])
+
+    def test_bad_path_returns_error(self):
+        """任务路径不存在或为空时返回 error 字段"""
+        self.assertIn("9.9", json.loads(server_main.get_todo(self.temp_dir, "9.9"))["error"])
+        self.assertIn("error", json.loads(server_main.set_todo_done(self.temp_dir, "功能/不存在")))
+        self.assertIn("error", json.loads(server_main.get_todo(self.temp_dir, "")))
+
+    def test_write_failure_returns_error(self):
+        """TODO 文件无法写入时返回 error 字段"""
+        index = server_main._get_todo_index()
+        with mock.patch.object(index._parser, "save_todos_to_file", return_value=False):
+            output = json.loads(server_main.set_todo_done(self.temp_dir, "1.2"))
+        self.assertIn("无法写入", output["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻宿主进程客户端的单元测试
+使用一个实现宿主协议（READY 帧携带端口和 token，连接的第一帧校验 token，之后一个请求帧、若干进度帧和一个结果帧）的假宿主脚本
+"""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.core.ipc import FrameType, encode_frame, read_frame_async
+from buddy.server.ui_daemon import AnswerBoxDaemon, DaemonError
+
+FAKE_HOST_SCRIPT = '''
+import os, secrets, socket, sys, threading
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, encode_frame, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+token = secrets.token_urlsafe(16)
+server = socket.socket()
+server.bind(("127.0.0.1", 0))
+server.listen()
+
+def serve():
+    while True:
+        conn, _ = server.accept()
+        stream = conn.makefile("rb")
+        hello = read_frame(stream)
+        if hello is None or hello.type != FrameType.READY or hello.payload.get("token") != token:
+            conn.sendall(encode_frame(FrameType.CANCEL, {{"error": "token 不匹配"}}))
+            conn.close()
+            continue
+        request = read_frame(stream).payload
+        conn.sendall(encode_frame(FrameType.PROGRESS, {{"stage": "shown"}}))
+        conn.sendall(encode_frame(FrameType.RESULT, {{"result": "echo:" + request["summary"]}}))
+        conn.close()
+
+threading.Thread(target=serve, daemon=True).start()
+print("starting")
+channel.send(FrameType.READY, {{"port": server.getsockname()[1], "token": token}})
+sys.stdin.buffer.read()
+os._exit(0)
+'''
+
+
+class TestAnswerBoxDaemon(unittest.TestCase):
+    """测试AnswerBoxDaemon类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.script = Path(self.temp_dir) / "fake_host.py"
+        buddy_dir = str(Path(__file__).parent.parent)
+        self.script.write_text(FAKE_HOST_SCRIPT.format(buddy_dir=buddy_dir), encoding="utf-8")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, scenario):
+        """在新的事件循环中运行场景，结束时关闭宿主进程"""
+        async def wrapper():
+            daemon = AnswerBoxDaemon(self.script, Path(self.temp_dir), startup_timeout=10)
+            try:
+                return await scenario(daemon)
+            finally:
+                await daemon.shutdown()
+
+        return asyncio.run(wrapper())
+
+    def test_requests_reuse_host(self):
+        """多次请求复用同一个宿主进程，结果之前的进度帧交给 on_frame"""
+        frames = []
+
+        async def scenario(daemon):
+            first = await daemon.ask({"summary": "a"}, timeout=5, on_frame=frames.append)
+            pid = daemon._process.pid
+            second = await daemon.ask({"summary": "b"}, timeout=5)
+            return first, second, pid == daemon._process.pid
+
+        self.assertEqual(self._run(scenario), ({"result": "echo:a"}, {"result": "echo:b"}, True))
+        self.assertEqual([(f.type, f.payload) for f in frames], [(FrameType.PROGRESS, {"stage": "shown"})])
+
+    def test_concurrent_requests(self):
+        """多个请求可以同时等待同一个宿主"""
+        async def scenario(daemon):
+            return await asyncio.gather(*(daemon.ask({"summary": str(i)}, timeout=5) for i in range(3)))
+
+        self.assertEqual(self._run(scenario), [{"result": "echo:%d" % i} for i in range(3)])
+
+    def test_dead_host_restarted(self):
+        """宿主进程退出后，下一个请求重启宿主并重试"""
+        async def scenario(daemon):
+            await daemon.ensure_started()
+            first = daemon._process
+            first.kill()
+            await first.wait()
+            result = await daemon.ask({"summary": "again"}, timeout=5)
+            return result, daemon._process.pid != first.pid
+
+        self.assertEqual(self._run(scenario), ({"result": "echo:again"}, True))
+
+    def test_missing_script(self):
+        """宿主脚本不存在时抛出DaemonError，调用方据此退回独立进程模式"""
+        daemon = AnswerBoxDaemon(Path(self.temp_dir) / "missing.py", Path(self.temp_dir))
+        with self.assertRaises(DaemonError):
+            asyncio.run(daemon.ensure_started())
+
+    def test_shutdown_stops_host(self):
+        """关闭后宿主进程退出"""
+        async def scenario(daemon):
+            await daemon.ensure_started()
+            process = daemon._process
+            await daemon.shutdown()
+            return process.returncode is not None, daemon.is_running
+
+        self.assertEqual(self._run(scenario), (True, False))
+
+    def test_request_carries_launch_token(self):
+        """客户端使用宿主启动时告知的 token，没有 token 的连接被拒绝"""
+        async def scenario(daemon):
+            result = await daemon.ask({"summary": "hi"}, timeout=5)
+            self.assertTrue(daemon._token)
+
+            # 不知道 token 的本地进程
+            reader, writer = await asyncio.open_connection("127.0.0.1", daemon._port)
+            writer.write(encode_frame(FrameType.REQUEST, {"summary": "intruder"}))
+            rejected = await read_frame_async(reader)
+            writer.close()
+            return result, rejected.type
+
+        self.assertEqual(self._run(scenario), ({"result": "echo:hi"}, FrameType.CANCEL))
+
+    def test_rejected_token_restarts_host(self):
+        """token 被拒绝时按连接失败处理：重启宿主后重试"""
+        async def scenario(daemon):
+            await daemon.ensure_started()
+            first_pid = daemon._process.pid
+            daemon._token = "stale"
+            result = await daemon.ask({"summary": "again"}, timeout=5)
+            return result, first_pid != daemon._process.pid
+
+        self.assertEqual(self._run(scenario), ({"result": "echo:again"}, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI子进程错误输出收集的单元测试
+测试StderrCapture的日志写入、轮转和内存上限
+"""
+
+import asyncio
+import logging
+import shutil
+import tempfile
+import unittest
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server.ui_logs import MAX_LINE_LENGTH, StderrCapture
+
+
+class TestStderrCapture(unittest.TestCase):
+    """测试StderrCapture类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = Path(self.temp_dir) / "ui.log"
+        self.logger = logging.getLogger(f"vc_buddy.test.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = RotatingFileHandler(self.log_file, maxBytes=4096, backupCount=2, encoding="utf-8")
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _drain(self, capture: StderrCapture, data: bytes):
+        async def scenario():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            await capture.drain(reader)
+
+        asyncio.run(scenario())
+
+    def test_tail_is_bounded(self):
+        """内存中只保留最后几行"""
+        capture = StderrCapture("spawn:1", self.logger, tail_lines=3)
+        self._drain(capture, b"".join(f"DEBUG: line {i}\n".encode() for i in range(100)))
+        self.assertEqual(capture.total_lines, 100)
+        self.assertEqual(capture.tail(), "DEBUG: line 97\nDEBUG: line 98\nDEBUG: line 99")
+        self.assertEqual(capture.tail(1), "DEBUG: line 99")
+
+    def test_lines_written_to_rotating_log(self):
+        """输出写入日志文件并按大小轮转"""
+        capture = StderrCapture("spawn:2", self.logger)
+        self._drain(capture, "调试信息\n".encode("utf-8") * 1000)
+        self.assertIn("[spawn:2] 调试信息", self.log_file.read_text(encoding="utf-8"))
+        self.assertTrue(Path(f"{self.log_file}.1").exists())
+        self.assertFalse(Path(f"{self.log_file}.3").exists())
+
+    def test_long_line_is_truncated(self):
+        """超长行被截断"""
+        capture = StderrCapture("spawn:3", self.logger)
+        self._drain(capture, b"x" * (MAX_LINE_LENGTH * 3) + b"\nend")
+        self.assertEqual(capture.tail(1), "end")
+        self.assertTrue(all(len(line) <= MAX_LINE_LENGTH for line in capture.tail().split("\n")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预热进程池的单元测试
+使用一个实现 --prewarm 协议的假UI脚本，验证取用、补充和内存上限
+"""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server.ui_pool import AnswerBoxPool
+
+FAKE_UI_SCRIPT = '''
+import os, sys
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+channel.send(FrameType.READY, {{"pid": os.getpid()}})
+frame = read_frame(sys.stdin.buffer)
+if frame is not None:
+    channel.send(FrameType.PROGRESS, {{"stage": "shown"}})
+    channel.send(FrameType.RESULT, {{"result": "echo:" + frame.payload["summary"]}})
+'''
+
+
+class TestAnswerBoxPool(unittest.TestCase):
+    """测试AnswerBoxPool类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.script = Path(self.temp_dir) / "fake_ui.py"
+        buddy_dir = str(Path(__file__).parent.parent)
+        self.script.write_text(FAKE_UI_SCRIPT.format(buddy_dir=buddy_dir), encoding="utf-8")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def _wait_idle(self, pool, count):
+        for _ in range(100):
+            if pool.status()["idle"] >= count and pool.status()["spawning"] == 0:
+                return
+            await asyncio.sleep(0.05)
+
+    def test_warm_process_is_used_and_replaced(self):
+        """预热进程被取用后自动补充"""
+        async def scenario():
+            pool = AnswerBoxPool(self.script, Path(self.temp_dir), size=1)
+            pool.start()
+            await self._wait_idle(pool, 1)
+            result = await pool.ask({"summary": "hi"}, timeout=5)
+            await self._wait_idle(pool, 1)
+            status = pool.status()
+            await pool.shutdown()
+            return result, status
+
+        result, status = asyncio.run(scenario())
+        self.assertEqual(result, {"result": "echo:hi"})
+        self.assertEqual(status["warm_hits"], 1)
+        self.assertEqual(status["cold_starts"], 0)
+        self.assertEqual(status["idle"], 1)
+
+    def test_empty_pool_starts_cold_process(self):
+        """池为空时当场启动进程"""
+        async def scenario():
+            pool = AnswerBoxPool(self.script, Path(self.temp_dir), size=0)
+            result = await pool.ask({"summary": "cold"}, timeout=5)
+            status = pool.status()
+            await pool.shutdown()
+            return result, status
+
+        result, status = asyncio.run(scenario())
+        self.assertEqual(result, {"result": "echo:cold"})
+        self.assertEqual(status["cold_starts"], 1)
+
+    def test_empty_pool_waits_for_spawning_process(self):
+        """池为空但有进程正在后台启动时，请求等待该进程，不再冷启动"""
+        async def scenario():
+            pool = AnswerBoxPool(self.script, Path(self.temp_dir), size=1)
+            pool.start()
+            results = await asyncio.gather(
+                pool.ask({"summary": "a"}, timeout=5), pool.ask({"summary": "b"}, timeout=5),
+            )
+            await self._wait_idle(pool, 1)
+            status = pool.status()
+            await pool.shutdown()
+            return results, status
+
+        results, status = asyncio.run(scenario())
+        self.assertEqual(results, [{"result": "echo:a"}, {"result": "echo:b"}])
+        # 第一个请求等待启动中的进程；第二个请求没有可等待的进程，冷启动
+        self.assertEqual((status["pool_misses"], status["cold_starts"], status["warm_hits"]), (2, 1, 0))
+        self.assertEqual(status["waiting"], 0)
+
+    def test_waiter_cold_starts_when_spawn_fails(self):
+        """等待的进程启动失败时，请求改为冷启动"""
+        marker = Path(self.temp_dir) / "first_launch_failed"
+        script = Path(self.temp_dir) / "flaky_ui.py"
+        script.write_text(
+            "import os, sys\n"
+            f"if not os.path.exists({str(marker)!r}):\n"
+            f"    open({str(marker)!r}, 'w').close()\n"
+            "    sys.exit(1)\n" + self.script.read_text(encoding="utf-8"),
+            encoding="utf-8",
+        )
+
+        async def scenario():
+            pool = AnswerBoxPool(script, Path(self.temp_dir), size=1)
+            pool.start()
+            result = await pool.ask({"summary": "retry"}, timeout=5)
+            status = pool.status()
+            await pool.shutdown()
+            return result, status
+
+        result, status = asyncio.run(scenario())
+        self.assertEqual(result, {"result": "echo:retry"})
+        self.assertEqual((status["spawn_failures"], status["pool_misses"], status["cold_starts"]), (1, 1, 1))
+
+    @unittest.skipUnless(Path("/proc/self/status").exists(), "需要/proc读取进程内存")
+    def test_memory_budget_limits_idle_processes(self):
+        """空闲进程超出内存上限时不再补充"""
+        async def scenario():
+            pool = AnswerBoxPool(self.script, Path(self.temp_dir), size=2, max_idle_memory_mb=0.001)
+            pool.start()
+            for _ in range(100):
+                if pool.status()["spawning"] == 0:
+                    break
+                await asyncio.sleep(0.05)
+            status = pool.status()
+            await pool.shutdown()
+            return status
+
+        status = asyncio.run(scenario())
+        self.assertEqual(status["idle"], 0)
+        self.assertEqual(status["memory_rejections"], 2)
+
+
+    def test_spawn_failures_counted(self):
+        """后台补充时的启动失败（如文件描述符耗尽）被计数，不会留下未取回的任务异常"""
+        errors = []
+
+        async def scenario():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            pool = AnswerBoxPool(self.script, Path(self.temp_dir), size=2)
+            with mock.patch("asyncio.create_subprocess_exec", side_effect=OSError(24, "Too many open files")):
+                pool.start()
+                await asyncio.gather(*pool._spawn_tasks)
+            status = pool.status()
+            await pool.shutdown()
+            return status
+
+        status = asyncio.run(scenario())
+        self.assertEqual((status["spawn_failures"], status["spawning"], status["idle"]), (2, 0, 0))
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+反馈窗口合并的单元测试
+使用支持多个请求的假UI脚本，验证同一项目的并发请求共用一个窗口进程、结果按 request_id 返回
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import sys
+
+# 添加buddy模块到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from buddy.server import main as server_main
+from buddy.server.ui_logs import StderrCapture
+from buddy.server.ui_window import UIWindow
+
+# 收到摘要为 go 的请求后，倒序回答所有等待中的请求（摘要为 wait 的除外）；
+# 收到的每一帧记录到日志文件
+FAKE_UI_SCRIPT = '''
+import sys
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+pending = []
+log = open({log!r}, "a")
+while True:
+    frame = read_frame(sys.stdin.buffer)
+    if frame is None:
+        break
+    log.write("%d %s\\n" % (frame.type, frame.payload.get("summary", frame.payload.get("request_id"))))
+    log.flush()
+    if frame.type == FrameType.CANCEL:
+        pending = [p for p in pending if p["request_id"] != frame.payload["request_id"]]
+    elif frame.type == FrameType.REQUEST:
+        pending.append(frame.payload)
+        if frame.payload["summary"] == "go":
+            for request in reversed(pending):
+                if request["summary"] != "wait":
+                    channel.send(FrameType.RESULT, {{"result": "done:" + request["summary"],
+                                                     "request_id": request["request_id"]}})
+log.write("exit\\n")
+'''
+
+
+class TestWindowCoalescing(unittest.TestCase):
+    """测试同一项目的请求合并到一个窗口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log = Path(self.temp_dir) / "frames.log"
+        self.script = Path(self.temp_dir) / "fake_ui.py"
+        self.script.write_text(FAKE_UI_SCRIPT.format(
+            buddy_dir=str(Path(__file__).parent.parent), log=str(self.log),
+        ), encoding="utf-8")
+
+    def tearDown(self):
+        """测试后清理"""
+        server_main._open_windows.clear()
+        server_main._window_locks.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, scenario):
+        async def wrapped():
+            result = await scenario()
+            # 等待窗口回收完成，避免进程泄漏到其他测试
+            await asyncio.gather(*server_main._background_tasks)
+            return result
+
+        with mock.patch.object(server_main, "UI_SCRIPT", self.script), \
+                mock.patch.dict("os.environ", {"VC_BUDDY_UI_MODE": "spawn"}):
+            return asyncio.run(wrapped())
+
+    def _frames(self):
+        return self.log.read_text(encoding="utf-8").splitlines()
+
+    def test_concurrent_requests_share_window(self):
+        """同一项目的并发请求进入同一个窗口，结果各自返回"""
+        coalesced_before = server_main.metrics.get("feedback.coalesced")
+
+        async def scenario():
+            first = asyncio.create_task(server_main.ask_for_feedback("first", self.temp_dir))
+            await asyncio.sleep(0.3)
+            second = await server_main.ask_for_feedback("go", self.temp_dir)
+            return json.loads(await first), json.loads(second)
+
+        first, second = self._run(scenario)
+        self.assertEqual(first, {"result": "done:first"})
+        self.assertEqual(second, {"result": "done:go"})
+        self.assertEqual(server_main.metrics.get("feedback.coalesced"), coalesced_before + 1)
+        # 只启动了一个进程，所有请求完成后进程退出
+        self.assertEqual(self._frames(), ["1 first", "1 go", "exit"])
+        # 请求全部完成后不再保留项目的窗口和锁
+        self.assertEqual((server_main._open_windows, server_main._window_locks, server_main._window_users),
+                         ({}, {}, {}))
+
+    def test_cancel_closes_only_its_tab(self):
+        """一个请求被取消时只关闭对应的标签页"""
+        async def scenario():
+            waiting = asyncio.create_task(server_main.ask_for_feedback("wait", self.temp_dir))
+            await asyncio.sleep(0.3)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            return json.loads(await server_main.ask_for_feedback("go", self.temp_dir))
+
+        self.assertEqual(self._run(scenario), {"result": "done:go"})
+        frames = self._frames()
+        self.assertEqual(frames[0], "1 wait")
+        self.assertTrue(frames[1].startswith("6 "))
+
+    def test_other_projects_get_own_window(self):
+        """不同项目的请求使用各自的窗口"""
+        other = Path(self.temp_dir) / "other"
+        other.mkdir()
+
+        async def scenario():
+            return await asyncio.gather(
+                server_main.ask_for_feedback("go", self.temp_dir),
+                server_main.ask_for_feedback("go", str(other)),
+            )
+
+        results = self._run(scenario)
+        self.assertEqual([json.loads(r) for r in results], [{"result": "done:go"}] * 2)
+        self.assertEqual(self._frames().count("exit"), 2)
+        self.assertEqual(server_main._open_windows, {})
+
+
+# 返回结果后忽略标准输入的EOF，一直不退出
+STUBBORN_UI_SCRIPT = '''
+import sys, time
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+request = read_frame(sys.stdin.buffer).payload
+channel.send(FrameType.RESULT, {{"result": "done", "request_id": request["request_id"]}})
+while True:
+    time.sleep(1)
+'''
+
+
+class TestWindowReap(unittest.TestCase):
+    """测试窗口进程的回收"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.script = Path(self.temp_dir) / "stubborn_ui.py"
+        self.script.write_text(STUBBORN_UI_SCRIPT.format(buddy_dir=str(Path(__file__).parent.parent)),
+                               encoding="utf-8")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_process_ignoring_eof_is_killed(self):
+        """UI进程超过宽限时间仍不退出时被强制结束，不留下无人取回的异常"""
+        errors = []
+
+        async def scenario():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, str(self.script),
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            capture = StderrCapture("test", logger=logging.getLogger("test_ui_window"))
+            stderr_task = asyncio.create_task(capture.drain(process.stderr))
+            reaps = []
+            window = UIWindow(process, capture, stderr_task,
+                              run_in_background=lambda coro: reaps.append(asyncio.create_task(coro)),
+                              exit_grace=0.3)
+            result = await window.ask({"summary": "hi"}, timeout=5)
+            await asyncio.gather(*reaps)
+            gc.collect()
+            await asyncio.sleep(0)
+            return result, process.returncode
+
+        result, returncode = asyncio.run(scenario())
+        self.assertEqual(result, {"result": "done"})
+        self.assertIsNotNone(returncode)
+        self.assertEqual([context.get("message") for context in errors], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
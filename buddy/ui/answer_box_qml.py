@@ -1,9 +1,14 @@
 import sys
 import json
 import os
+import threading
+import time
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
+# 窗口启动耗时从导入 Qt 之前开始计算
+_IMPORT_STARTED = time.perf_counter()
+
 from PySide6.QtCore import QObject, Signal, Slot, Property, QAbstractListModel, QModelIndex, Qt, QSettings, QTimer, QThread
 from PySide6.QtGui import QGuiApplication
 from PySide6.QtQml import QQmlApplicationEngine, qmlRegisterType
@@ -16,6 +21,8 @@ try:
     from .voice_recorder import VoiceRecorder
     from .streaming_voice_recorder import StreamingVoiceRecorder
     from ..core.analytics import get_analytics_manager, track_app_opened, track_button_clicked, track_todo_action, track_voice_action
+    from ..core.ipc import FrameType, read_frame, take_stdout_channel
+    from ..core.metrics_store import metrics_span, record_metric
 except ImportError:
     # 如果作为脚本直接运行，需要添加路径
     current_dir = Path(__file__).parent
@@ -26,6 +33,11 @@ except ImportError:
     from ui.voice_recorder import VoiceRecorder
     from ui.streaming_voice_recorder import StreamingVoiceRecorder
     from core.analytics import get_analytics_manager, track_app_opened, track_button_clicked, track_todo_action, track_voice_action
+    from core.ipc import FrameType, read_frame, take_stdout_channel
+    from core.metrics_store import metrics_span, record_metric
+
+# 模块导入（Qt、QML、录音和统计模块）耗时
+_IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
 
 
 class DeepSeekSummaryWorker(QThread):
@@ -74,12 +86,13 @@ class DeepSeekSummaryWorker(QThread):
             system_prompt = get_deepseek_prompt()
             
             # 调用DeepSeek处理
-            response = client.simple_chat(
-                user_input=f"请总结以下内容：\n\n{self.content}",
-                system_prompt=system_prompt,
-                model=config.deepseek_model,
-                temperature=config.deepseek_temperature
-            )
+            with metrics_span("deepseek.summary", model=config.deepseek_model, input_chars=len(self.content)):
+                response = client.simple_chat(
+                    user_input=f"请总结以下内容：\n\n{self.content}",
+                    system_prompt=system_prompt,
+                    model=config.deepseek_model,
+                    temperature=config.deepseek_temperature
+                )
             
             # 发送完成信号
             self.summaryCompleted.emit(response)
@@ -169,6 +182,52 @@ class ConfigManagerProxy(QObject):
         return self._config_manager.config_file_path
 
 
+def read_stdin_request() -> Optional[Dict[str, Any]]:
+    """从标准输入读取请求数据（管道输入时）"""
+    data = None
+    input_data = ""
+    try:
+        # 检查是否有标准输入数据
+        if not sys.stdin.isatty():  # 如果有管道输入
+            # 尝试多种方式读取UTF-8编码的输入
+            try:
+                if hasattr(sys.stdin, 'buffer'):
+                    # 方法1：使用buffer以UTF-8编码读取
+                    input_bytes = sys.stdin.buffer.read()
+                    input_data = input_bytes.decode('utf-8').strip()
+                else:
+                    # 方法2：直接读取
+                    input_data = sys.stdin.read().strip()
+            except UnicodeDecodeError:
+                # 方法3：尝试其他编码
+                try:
+                    if hasattr(sys.stdin, 'buffer'):
+                        input_bytes = sys.stdin.buffer.read()
+                        # 尝试GBK编码（Windows中文系统）
+                        input_data = input_bytes.decode('gbk').strip()
+                    else:
+                        input_data = sys.stdin.read().strip()
+                except UnicodeDecodeError:
+                    # 方法4：忽略错误字符
+                    if hasattr(sys.stdin, 'buffer'):
+                        input_bytes = sys.stdin.buffer.read()
+                        input_data = input_bytes.decode('utf-8', errors='ignore').strip()
+                    else:
+                        input_data = sys.stdin.read().strip()
+            
+            if input_data:
+                data = json.loads(input_data)
+                print(f"DEBUG: 成功读取输入数据: {len(input_data)} 字符", file=sys.stderr)
+            else:
+                print("DEBUG: 标准输入为空", file=sys.stderr)
+    except json.JSONDecodeError as e:
+        print(f"DEBUG: JSON解析错误: {e}", file=sys.stderr)
+        print(f"DEBUG: 原始输入数据: {input_data[:100]}...", file=sys.stderr)
+    except Exception as e:
+        print(f"DEBUG: 读取输入时出错: {e}", file=sys.stderr)
+    return data
+
+
 class AnswerBoxBackend(QObject):
     """QML后端逻辑类"""
     
@@ -188,95 +247,52 @@ class AnswerBoxBackend(QObject):
     deepseekSummaryReady = Signal(str, arguments=['summary'])  # 新增：DeepSeek总结完成信号
     deepseekSummaryStateChanged = Signal(bool, arguments=['isSummarizing'])  # 新增：DeepSeek总结状态信号
     deepseekSummaryError = Signal(str, arguments=['errorMessage'])  # 新增：DeepSeek总结错误信号
+    requestChanged = Signal()  # 请求内容（摘要、项目、TODO）变化信号
+    requestLoaded = Signal()  # 新请求加载完成信号，QML据此清空输入
+    requestsChanged = Signal()  # 窗口中等待回答的请求（标签页）变化信号
+    frameReady = Signal(int, 'QVariant', arguments=['frameType', 'payload'])  # 进度/草稿帧，由常驻宿主转发
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, request_data=None, host_mode=False, channel=None):
         super().__init__(parent)
         
+        # 常驻宿主模式下，响应通过信号交给宿主进程，而不是直接输出并退出
+        self._host_mode = host_mode
+        # 分帧通信通道（--ipc / --prewarm 模式），为None时使用旧的标准输出JSON行
+        self._channel = channel
+        
         # 首先初始化默认值
         self._summary_text = "等待数据输入..."
         self._project_directory = None
         self._is_transcribing = False  # 新增：转写状态标志
         self._is_summarizing = False  # 新增：总结状态标志
         
-        # 尝试读取输入数据（非阻塞）
-        data = None
-        input_data = ""
-        try:
-            # 检查是否有标准输入数据
-            if not sys.stdin.isatty():  # 如果有管道输入
-                # 尝试多种方式读取UTF-8编码的输入
-                try:
-                    if hasattr(sys.stdin, 'buffer'):
-                        # 方法1：使用buffer以UTF-8编码读取
-                        input_bytes = sys.stdin.buffer.read()
-                        input_data = input_bytes.decode('utf-8').strip()
-                    else:
-                        # 方法2：直接读取
-                        input_data = sys.stdin.read().strip()
-                except UnicodeDecodeError:
-                    # 方法3：尝试其他编码
-                    try:
-                        if hasattr(sys.stdin, 'buffer'):
-                            input_bytes = sys.stdin.buffer.read()
-                            # 尝试GBK编码（Windows中文系统）
-                            input_data = input_bytes.decode('gbk').strip()
-                        else:
-                            input_data = sys.stdin.read().strip()
-                    except UnicodeDecodeError:
-                        # 方法4：忽略错误字符
-                        if hasattr(sys.stdin, 'buffer'):
-                            input_bytes = sys.stdin.buffer.read()
-                            input_data = input_bytes.decode('utf-8', errors='ignore').strip()
-                        else:
-                            input_data = sys.stdin.read().strip()
-                
-                if input_data:
-                    data = json.loads(input_data)
-                    print(f"DEBUG: 成功读取输入数据: {len(input_data)} 字符", file=sys.stderr)
-                else:
-                    print("DEBUG: 标准输入为空", file=sys.stderr)
-        except json.JSONDecodeError as e:
-            print(f"DEBUG: JSON解析错误: {e}", file=sys.stderr)
-            print(f"DEBUG: 原始输入数据: {input_data[:100]}...", file=sys.stderr)
-        except Exception as e:
-            print(f"DEBUG: 读取输入时出错: {e}", file=sys.stderr)
+        # 读取输入数据：宿主模式下请求通过socket到达，不读取标准输入
+        data = request_data
+        if data is None and not host_mode:
+            data = read_stdin_request()
         
         # 如果没有输入数据，使用测试数据
-        if not data:
+        if not data and not host_mode:
             current_dir = os.getcwd()
             data = {
                 "summary": f"QML测试模式 - 当前目录: {current_dir}",
                 "project_directory": current_dir
             }
         
-        # 解析输入数据
-        self._summary_text = data.get("summary", "无任务摘要")
-        self._project_directory = data.get("project_directory", None)
+        # 窗口中等待回答的请求，每个请求一个标签页（同一项目的并发请求合并到一个窗口）
+        self._requests: List[Dict[str, Any]] = [data] if data else []
+        self._current_request: Dict[str, Any] = data or {}
+        # 切换标签页时保存的各请求输入草稿
+        self._drafts: Dict[str, str] = {}
+        self._draft_text = ""
         
-        # 根据项目目录获取配置管理器
-        if self._project_directory:
-            self._config_mgr = get_project_config_manager(self._project_directory)
-            project_name = os.path.basename(self._project_directory)
-            self._window_title = f"Answer Box - {project_name}"
-        else:
-            self._config_mgr = config_manager
-            self._window_title = "Answer Box"
-        
-        # 创建设置管理器（用于保存窗口几何信息）
-        self._settings = QSettings(
-            self._config_mgr.organization_name,
-            self._config_mgr.application_name
-        )
-        
-        # 加载TODO数据
+        # 创建TODO解析器和模型
         self._todo_parser = TodoParser()
         self._todo_items = []
-        if self._project_directory:
-            self._todo_items = self._todo_parser.load_project_todos(self._project_directory)
-        
-        # 创建TODO模型
         self._todo_model = TodoListModel(self)
-        self._todo_model.setTodos(self._todo_items)
+        
+        # 解析输入数据（项目配置、窗口标题、TODO列表）
+        self._apply_request(data or {"summary": self._summary_text})
         
         # 选中的TODO详情
         self._selected_todo_detail = "选择一个任务查看详情"
@@ -310,37 +326,190 @@ class AnswerBoxBackend(QObject):
         # 初始化统计管理器
         self._analytics = get_analytics_manager()
         
-        # 统计应用打开
+        # 统计应用打开（宿主模式在每次请求到达时统计）
+        if data:
+            self._track_request_opened()
+    
+    def _apply_request(self, data: Dict[str, Any]):
+        """根据请求数据更新摘要、项目配置和TODO列表"""
+        self._current_request = data
+        self._summary_text = data.get("summary", "无任务摘要")
+        self._project_directory = data.get("project_directory", None)
+        # ask_questions 工具的问题列表：[{"id", "question", "options"}]
+        self._questions = list(data.get("questions") or [])
+        
+        # 根据项目目录获取配置管理器
+        if self._project_directory:
+            self._config_mgr = get_project_config_manager(self._project_directory)
+            project_name = os.path.basename(self._project_directory)
+            self._window_title = f"Answer Box - {project_name}"
+        else:
+            self._config_mgr = config_manager
+            self._window_title = "Answer Box"
+        
+        # 多会话模式下标明提问的客户端
+        if data.get("client"):
+            self._window_title += f" ({data['client']})"
+        
+        # 创建设置管理器（用于保存窗口几何信息）
+        self._settings = QSettings(
+            self._config_mgr.organization_name,
+            self._config_mgr.application_name
+        )
+        
+        # 加载TODO数据
+        self._todo_items = []
+        if self._project_directory:
+            self._todo_items = self._todo_parser.load_project_todos(self._project_directory)
+        self._todo_model.setTodos(self._todo_items)
+    
+    def _track_request_opened(self):
+        """统计应用打开"""
         if self._project_directory:
             track_app_opened(source="project")
         else:
             track_app_opened(source="general")
+    
+    def loadRequest(self, data: Dict[str, Any]):
+        """加载新的请求（常驻宿主模式下复用同一个窗口）"""
+        self._requests = [data]
+        self._drafts = {}
+        self._show_request(data)
+        self._track_request_opened()
+    
+    def addRequest(self, data: Dict[str, Any]):
+        """同一项目的并发请求：窗口中已有请求时作为新的标签页加入"""
+        if not self._requests:
+            self.loadRequest(data)
+            return
+        self._requests.append(data)
+        self.requestsChanged.emit()
+        self._track_request_opened()
+    
+    def removeRequest(self, request_id: Optional[str]) -> bool:
+        """移除已回答或被取消的请求，返回窗口中是否还有请求"""
+        was_current = self._current_request.get("request_id") == request_id
+        self._requests = [r for r in self._requests if r.get("request_id") != request_id]
+        self._drafts.pop(request_id, None)
+        if was_current and self._requests:
+            self._show_request(self._requests[0])
+        else:
+            self.requestsChanged.emit()
+        return bool(self._requests)
+    
+    @Slot(int, str)
+    def selectRequest(self, index: int, draft: str):
+        """切换到另一个标签页，保存当前标签页的输入草稿"""
+        if not 0 <= index < len(self._requests) or self._requests[index] is self._current_request:
+            return
+        self._drafts[self._current_request.get("request_id")] = draft
+        self._show_request(self._requests[index])
+    
+    def _show_request(self, data: Dict[str, Any]):
+        """在窗口中显示一个请求"""
+        self._apply_request(data)
+        self._draft_text = self._drafts.pop(data.get("request_id"), "")
+        
+        # 录音器跟随项目配置切换
+        self._voice_recorder.set_config_manager(self._config_mgr)
+        self._streaming_voice_recorder.set_config_manager(self._config_mgr)
         
+        # 重置选中状态
+        self._selected_todo_title = None
+        self._selected_todo_detail = "选择一个任务查看详情"
+        
+        self.requestChanged.emit()
+        self.requestsChanged.emit()
+        self.selectedTodoDetailChanged.emit()
+        self.windowGeometryChanged.emit()
+        self.requestLoaded.emit()
+    
+    def _emit_frame(self, frame_type: int, payload: Dict[str, Any]):
+        """发送进度/草稿帧：有通道时直接写入，常驻宿主模式下交给宿主转发"""
+        # 标明帧属于哪个请求（标签页）
+        if self._current_request.get("request_id"):
+            payload = {**payload, "request_id": self._current_request["request_id"]}
+        try:
+            if self._channel is not None:
+                self._channel.send(frame_type, payload)
+            elif self._host_mode:
+                self.frameReady.emit(int(frame_type), payload)
+        except OSError as e:
+            print(f"DEBUG: 发送帧失败: {e}", file=sys.stderr)
+    
+    def reportProgress(self, stage: str):
+        """报告窗口状态变化（shown、recording、transcribing、summarizing）"""
+        self._emit_frame(FrameType.PROGRESS, {"stage": stage})
+    
+    @Slot(str)
+    def updateDraft(self, text: str):
+        """上报用户正在输入的草稿"""
+        self._emit_frame(FrameType.DRAFT, {"text": text})
+    
+    def scheduleAutoSubmit(self):
+        """设置了VC_BUDDY_AUTO_SUBMIT_MS时，在窗口显示后自动提交空反馈（用于延迟测量）"""
+        auto_submit_ms = os.environ.get("VC_BUDDY_AUTO_SUBMIT_MS")
+        if auto_submit_ms:
+            QTimer.singleShot(int(auto_submit_ms), lambda: self.sendResponse(""))
+    
     # 属性定义
-    @Property(str, constant=True)
+    @Property(str, notify=requestChanged)
     def summaryText(self):
         return self._summary_text
     
-    @Property(str, constant=True)
+    @Property(str, notify=requestChanged)
     def windowTitle(self):
         return self._window_title
     
-    @Property(int, constant=True)
+    @Property(int, notify=requestChanged)
     def defaultWidth(self):
         return self._config_mgr.get("ui.window.default_width", 400)
     
-    @Property(int, constant=True)
+    @Property(int, notify=requestChanged)
     def defaultHeight(self):
         return self._config_mgr.get("ui.window.default_height", 600)
     
-    @Property(bool, constant=True)
+    @Property(bool, notify=requestChanged)
     def stayOnTop(self):
         return self._config_mgr.get("ui.window.stay_on_top", True)
     
-    @Property(bool, constant=True)
+    @Property(bool, notify=requestChanged)
     def hasTodos(self):
         return len(self._todo_items) > 0
     
+    @Property('QVariantList', notify=requestChanged)
+    def questions(self):
+        return self._questions
+    
+    @Property(str, notify=requestChanged)
+    def draftText(self):
+        return self._draft_text
+    
+    @Property('QVariantList', notify=requestsChanged)
+    def requestTabs(self):
+        """标签页标题：摘要的第一行"""
+        tabs = []
+        for request in self._requests:
+            title = (request.get("summary") or "").strip().splitlines()[0:1]
+            title = title[0] if title else "反馈请求"
+            tabs.append({"title": title if len(title) <= 24 else title[:23] + "…"})
+        return tabs
+    
+    @Property(int, notify=requestsChanged)
+    def currentRequestIndex(self):
+        for index, request in enumerate(self._requests):
+            if request is self._current_request:
+                return index
+        return -1
+    
+    @Property(bool, notify=requestsChanged)
+    def hasPendingRequests(self):
+        return len(self._requests) > 0
+    
+    @Property(bool, notify=requestChanged)
+    def hasQuestions(self):
+        return len(self._questions) > 0
+    
     @Property(QObject, constant=True)
     def todoModel(self):
         return self._todo_model
@@ -353,7 +522,7 @@ class AnswerBoxBackend(QObject):
     def selectedTodoTitle(self):
         return self._selected_todo_title
     
-    @Property(bool, constant=True)
+    @Property(bool, notify=requestChanged)
     def rememberPosition(self):
         """是否记住窗口位置"""
         return self._config_mgr.get("ui.window.remember_position", True)
@@ -467,6 +636,7 @@ class AnswerBoxBackend(QObject):
         """录音开始（原版本）"""
         self._is_recording = True
         self.voiceRecordingStateChanged.emit(True)
+        self.reportProgress("recording")
     
     def _on_recording_stopped(self):
         """录音停止（原版本）"""
@@ -475,6 +645,7 @@ class AnswerBoxBackend(QObject):
         # 录音停止后开始转写
         self._is_transcribing = True
         self.voiceTranscriptionStateChanged.emit(True)
+        self.reportProgress("transcribing")
     
     def _on_transcription_ready(self, transcription: str):
         """转写结果准备就绪（原版本）"""
@@ -623,7 +794,9 @@ class AnswerBoxBackend(QObject):
             
             if todo_file:
                 # 保存更新后的TODO列表
-                success = self._todo_parser.save_todos_to_file(self._todo_items, todo_file)
+                with metrics_span("todo.save", items=len(self._todo_items)) as span:
+                    success = self._todo_parser.save_todos_to_file(self._todo_items, todo_file)
+                    span.ok = success
                 if not success:
                     print("WARNING: 无法保存TODO文件，请检查文件权限。", file=sys.stderr)
             else:
@@ -634,30 +807,40 @@ class AnswerBoxBackend(QObject):
     @Slot(str)
     def sendResponse(self, feedback_text: str):
         """发送响应"""
+        self._send_result({"result": feedback_text})
+    
+    @Slot(str, 'QVariant')
+    def sendAnswers(self, feedback_text: str, answers):
+        """发送多个问题的答案（ask_questions），answers 为 [{"id", "answer"}]"""
+        # QML数组可能以QJSValue形式到达
+        if hasattr(answers, "toVariant"):
+            answers = answers.toVariant()
+        self._send_result({
+            "result": feedback_text,
+            "answers": [
+                {"id": str(item.get("id", "")), "answer": str(item.get("answer", ""))}
+                for item in (answers or []) if isinstance(item, dict)
+            ],
+        })
+    
+    def _send_result(self, response: Dict[str, Any]):
+        """把结果交给宿主或写入标准输出"""
         try:
-            response = {
-                "result": feedback_text
-            }
-            
-            # 输出到标准输出，确保使用UTF-8编码
-            output = json.dumps(response, ensure_ascii=False)
+            # 宿主模式（常驻宿主、--ipc、--prewarm）：结果带上请求ID交给宿主转发，
+            # 窗口切换到下一个标签页；没有剩余请求时由宿主隐藏或关闭窗口
+            if self._host_mode:
+                if not self._requests:
+                    return
+                request_id = self._current_request.get("request_id")
+                if request_id:
+                    response["request_id"] = request_id
+                self.removeRequest(request_id)
+                self.responseReady.emit(json.dumps(response, ensure_ascii=False))
+                return
             
-            # 只输出JSON结果到stdout，所有调试信息都发送到stderr
-            try:
-                # 方法1：直接使用UTF-8编码写入
-                print(output, flush=True)
-            except UnicodeEncodeError:
-                # 方法2：如果print失败，使用buffer方式
-                if hasattr(sys.stdout, 'buffer'):
-                    sys.stdout.buffer.write(output.encode('utf-8'))
-                    sys.stdout.buffer.write(b'\n')
-                    sys.stdout.buffer.flush()
-                else:
-                    # 方法3：最后的后备方案，使用ASCII安全输出
-                    ascii_output = json.dumps(response, ensure_ascii=True)
-                    sys.stdout.write(ascii_output)
-                    sys.stdout.write('\n')
-                    sys.stdout.flush()
+            # 旧模式（make show-ui）：一行UTF-8 JSON写入标准输出
+            sys.stdout.buffer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            sys.stdout.buffer.flush()
             
             # 立即退出，避免额外输出
             QGuiApplication.instance().quit()
@@ -666,6 +849,14 @@ class AnswerBoxBackend(QObject):
             print(f"发送响应时出错: {str(e)}", file=sys.stderr)
             QGuiApplication.instance().quit()
     
+    @Slot()
+    def windowClosed(self):
+        """窗口被用户关闭"""
+        # 非宿主模式下关闭窗口即退出进程；宿主模式下所有标签页视为空反馈
+        if self._host_mode:
+            while self._requests:
+                self.sendResponse("")
+    
     @Slot(str, result=str)
     def summarizeWithDeepSeek(self, content: str) -> str:
         """使用DeepSeek总结文本内容 - 异步版本"""
@@ -684,6 +875,7 @@ class AnswerBoxBackend(QObject):
         
         self._is_summarizing = True
         self.deepseekSummaryStateChanged.emit(True)
+        self.reportProgress("summarizing")
         
         # 保存原始内容
         self._pending_summary_content = content
@@ -820,12 +1012,19 @@ class AnswerBoxBackend(QObject):
 class AnswerBoxQML:
     """QML版本的AnswerBox应用"""
     
-    def __init__(self):
+    def __init__(self, host_mode=False, request_data=None, channel=None):
         # 设置 QML 样式，避免样式警告
         import os
         os.environ["QT_QUICK_CONTROLS_STYLE"] = "Material"
         
+        self.host_mode = host_mode
+        # 启动各阶段的耗时写入本地性能指标（window.*）
+        started = time.perf_counter()
         self.app = QGuiApplication(sys.argv)
+        app_created = time.perf_counter()
+        
+        # 宿主模式下窗口只隐藏不退出
+        self.app.setQuitOnLastWindowClosed(not host_mode)
         
         # 初始化样式管理器
         self.style_manager = StyleManager()
@@ -841,10 +1040,13 @@ class AnswerBoxQML:
         qmlRegisterType(ConfigManagerProxy, "ConfigManagerProxy", 1, 0, "ConfigManagerProxy")
         
         # 创建后端对象
-        self.backend = AnswerBoxBackend()
+        backend_started = time.perf_counter()
+        self.backend = AnswerBoxBackend(request_data=request_data, host_mode=host_mode, channel=channel)
+        backend_created = time.perf_counter()
         
         # 设置QML上下文属性
         self.engine.rootContext().setContextProperty("backend", self.backend)
+        self.engine.rootContext().setContextProperty("hostMode", host_mode)
         self.engine.rootContext().setContextProperty("styleManager", self.style_manager)
         
         # 添加QML模块路径
@@ -862,7 +1064,9 @@ class AnswerBoxQML:
         
         # 加载QML文件
         qml_file = qml_dir / "Main.qml"
+        qml_started = time.perf_counter()
         self.engine.load(qml_file)
+        qml_loaded = time.perf_counter()
         
         # 检查是否加载成功
         if not self.engine.rootObjects():
@@ -870,14 +1074,141 @@ class AnswerBoxQML:
             sys.exit(-1)
         else:
             print("DEBUG: QML界面加载成功", file=sys.stderr)
+        
+        record_metric("window.import", _IMPORT_MS, host_mode=host_mode)
+        record_metric("window.qapp", (app_created - started) * 1000, host_mode=host_mode)
+        record_metric("window.backend", (backend_created - backend_started) * 1000, host_mode=host_mode)
+        record_metric("window.qml_load", (qml_loaded - qml_started) * 1000, host_mode=host_mode)
+        record_metric("window.startup", (qml_loaded - _IMPORT_STARTED) * 1000, host_mode=host_mode)
+        
+        self.window = self.engine.rootObjects()[0]
+        if not host_mode:
+            self.backend.reportProgress("shown")
+            self.backend.scheduleAutoSubmit()
+    
+    def show_window(self):
+        """显示并激活窗口（宿主模式）"""
+        self.window.show()
+        self.window.raise_()
+        self.window.requestActivate()
+        self.backend.reportProgress("shown")
+        self.backend.scheduleAutoSubmit()
+    
+    def hide_window(self):
+        """隐藏窗口（宿主模式）"""
+        self.window.hide()
     
     def run(self):
         """运行应用"""
         return self.app.exec()
 
 
+class IpcController(QObject):
+    """--ipc / --prewarm 模式下处理标准输入上的帧
+    
+    后台线程持续读取标准输入：
+    - REQUEST：加载请求并显示窗口；窗口已显示时作为新的标签页加入
+    - 带 request_id 的 CANCEL：该请求已被取消，关闭对应的标签页
+    - 不带 request_id 的 CANCEL 或标准输入关闭：调用方已放弃（服务器退出或池被关闭），立即退出
+    
+    所有标签页都回答后只隐藏窗口，由服务器关闭标准输入通知进程退出，
+    避免进程退出的同时服务器又发来新的请求。
+    """
+    
+    # 由读取线程发出，跨线程排队到主线程处理
+    _requestFrame = Signal('QVariant')
+    _cancelRequest = Signal(str)
+    _cancelFrame = Signal()
+    
+    def __init__(self, answer_box, channel, parent=None):
+        super().__init__(parent)
+        self._answer_box = answer_box
+        self._channel = channel
+        self._requestFrame.connect(self._on_request)
+        self._cancelRequest.connect(self._on_cancel_request)
+        self._cancelFrame.connect(self._on_cancel)
+        answer_box.backend.responseReady.connect(self._on_response_ready)
+    
+    def start(self):
+        # 守护线程：阻塞在stdin上也不会妨碍进程退出
+        threading.Thread(target=self._read_frames, daemon=True).start()
+    
+    def _read_frames(self):
+        try:
+            while True:
+                frame = read_frame(sys.stdin.buffer)
+                if frame is None:
+                    break
+                if frame.type == FrameType.CANCEL:
+                    if not frame.payload.get("request_id"):
+                        break
+                    self._cancelRequest.emit(frame.payload["request_id"])
+                elif frame.type == FrameType.REQUEST:
+                    self._requestFrame.emit(frame.payload)
+        except Exception as e:
+            print(f"DEBUG: 读取标准输入帧时出错: {e}", file=sys.stderr)
+        self._cancelFrame.emit()
+    
+    @Slot('QVariant')
+    def _on_request(self, request):
+        backend = self._answer_box.backend
+        if backend.hasPendingRequests and self._answer_box.window.isVisible():
+            backend.addRequest(request)
+            backend.scheduleAutoSubmit()
+            return
+        backend.loadRequest(request)
+        self._answer_box.show_window()
+    
+    @Slot(str)
+    def _on_cancel_request(self, request_id):
+        print("DEBUG: 请求已被取消，关闭对应的标签页", file=sys.stderr)
+        if not self._answer_box.backend.removeRequest(request_id):
+            self._answer_box.hide_window()
+    
+    @Slot()
+    def _on_cancel(self):
+        print("DEBUG: 调用方已关闭，退出", file=sys.stderr)
+        self._answer_box.hide_window()
+        self._answer_box.app.quit()
+    
+    @Slot(str)
+    def _on_response_ready(self, response: str):
+        self._channel.send(FrameType.RESULT, json.loads(response))
+        if not self._answer_box.backend.hasPendingRequests:
+            self._answer_box.hide_window()
+
+
+def run_prewarmed():
+    """预热模式：提前完成导入、QML加载和配置解析，隐藏等待请求
+    
+    协议（由 buddy/server/ui_pool.py 使用，帧格式见 buddy/core/ipc.py）：
+    - 就绪后在标准输出写入 READY 帧 {"pid": N}
+    - 之后与 --ipc 模式相同，见 IpcController
+    """
+    # 标准输出只用于协议帧，其余输出全部转到stderr
+    channel = take_stdout_channel()
+    
+    answer_box = AnswerBoxQML(host_mode=True, channel=channel)
+    controller = IpcController(answer_box, channel)
+    controller.start()
+    
+    channel.send(FrameType.READY, {"pid": os.getpid()})
+    print("DEBUG: Answer Box 预热完成，等待请求", file=sys.stderr)
+    
+    return answer_box.run()
+
+
 def main():
     """主函数"""
+    if "--prewarm" in sys.argv[1:]:
+        return run_prewarmed()
+    if "--ipc" in sys.argv[1:]:
+        # 分帧模式：请求帧从标准输入读取，结果帧写入专用通道
+        channel = take_stdout_channel()
+        answer_box = AnswerBoxQML(host_mode=True, channel=channel)
+        controller = IpcController(answer_box, channel)
+        controller.start()
+        return answer_box.run()
     answer_box = AnswerBoxQML()
     return answer_box.run()
 
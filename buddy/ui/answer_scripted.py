@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+脚本驱动的 Answer Box 替身
+
+按脚本文件自动回答反馈请求，不需要人工操作，也不加载 Qt，用于压测和无人值守的测试。
+与 answer_box_qml.py --ipc 使用相同的分帧协议（帧格式见 buddy/core/ipc.py），
+同一窗口中的多个请求各自计时、并发回答，带 request_id 的 CANCEL 帧取消对应的请求。
+
+脚本文件由环境变量 VC_BUDDY_ANSWER_SCRIPT 指定（JSON），未指定时立即回答空反馈：
+
+    {
+        "rules": [
+            {"pattern": "部署|上线", "answer": "先不要部署"},
+            {"keywords": ["完成"], "answer": "继续"}
+        ],
+        "default_answer": "auto:{summary}",
+        "think_time": {"distribution": "lognormal", "median_ms": 800, "sigma": 0.6, "max_ms": 10000},
+        "seed": 42
+    }
+
+- rules：与自动应答规则相同的格式（pattern/keywords/ignore_case），按顺序匹配摘要
+- default_answer：没有规则命中时的回答；回答中的 {summary} 替换为请求摘要
+- think_time：模拟用户思考时间，distribution 可选
+  fixed（ms）、uniform（min_ms/max_ms）、exponential（mean_ms）、lognormal（median_ms/sigma），
+  max_ms 限制单次最长时间
+- ask_questions 的请求：有选项的问题回答第一个选项，没有选项的问题使用同样的回答
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 处理相对导入问题
+try:
+    from ..core.ipc import FrameType, read_frame, take_stdout_channel
+    from ..server.auto_answer import AutoAnswerEngine, compile_rules
+except ImportError:
+    # 如果作为脚本直接运行，需要添加路径
+    sys.path.insert(0, str(Path(__file__).parent.parent))  # 添加buddy目录到路径
+    from core.ipc import FrameType, read_frame, take_stdout_channel
+    from server.auto_answer import AutoAnswerEngine, compile_rules
+
+
+class ThinkTime:
+    """模拟的用户思考时间分布"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, seed: Any = None):
+        config = config or {}
+        self.distribution = config.get("distribution", "fixed")
+        self.config = config
+        self.max_seconds = float(config.get("max_ms", 0)) / 1000
+        self._random = random.Random(seed)
+        if self.distribution not in ("fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"未知的思考时间分布: {self.distribution}")
+
+    def sample(self) -> float:
+        """抽取一次思考时间（秒）"""
+        config = self.config
+        if self.distribution == "uniform":
+            ms = self._random.uniform(float(config.get("min_ms", 0)), float(config.get("max_ms", 0)))
+        elif self.distribution == "exponential":
+            mean = float(config.get("mean_ms", 0))
+            ms = self._random.expovariate(1 / mean) if mean > 0 else 0.0
+        elif self.distribution == "lognormal":
+            median = float(config.get("median_ms", 0))
+            ms = self._random.lognormvariate(math.log(median), float(config.get("sigma", 0.5))) if median > 0 else 0.0
+        else:
+            ms = float(config.get("ms", 0))
+        seconds = max(0.0, ms / 1000)
+        return min(seconds, self.max_seconds) if self.max_seconds else seconds
+
+
+class ScriptedResponder:
+    """按脚本回答请求；每个请求独立计时，可以被单独取消"""
+
+    def __init__(self, script: Dict[str, Any], channel):
+        self.engine = AutoAnswerEngine(compile_rules(script.get("rules"), "script"))
+        self.default_answer = str(script.get("default_answer", ""))
+        self.think_time = ThinkTime(script.get("think_time"), script.get("seed"))
+        self._channel = channel
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def answer_for(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """生成请求的结果负载"""
+        summary = request.get("summary", "")
+        rule = self.engine.match(summary)
+        answer = (rule.answer if rule else self.default_answer).replace("{summary}", summary)
+        response = {"result": answer}
+        if request.get("questions"):
+            response["answers"] = [
+                {"id": q["id"], "answer": q["options"][0] if q.get("options") else answer}
+                for q in request["questions"]
+            ]
+        return response
+
+    def handle(self, request: Dict[str, Any]):
+        """在思考时间之后回答请求"""
+        request_id = request.get("request_id") or ""
+        # 与图形窗口一样先上报已显示，服务器据此区分显示延迟和思考时间
+        with self._lock:
+            self._channel.send(FrameType.PROGRESS, {"stage": "shown", "request_id": request_id})
+        timer = threading.Timer(self.think_time.sample(), self._answer, args=(request_id, request))
+        timer.daemon = True
+        with self._lock:
+            self._timers[request_id] = timer
+        timer.start()
+
+    def cancel(self, request_id: str):
+        with self._lock:
+            timer = self._timers.pop(request_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def wait(self):
+        """等待所有未完成的请求回答完毕"""
+        while True:
+            with self._lock:
+                timers = list(self._timers.values())
+            if not timers:
+                return
+            for timer in timers:
+                timer.join()
+
+    def _answer(self, request_id: str, request: Dict[str, Any]):
+        response = self.answer_for(request)
+        with self._lock:
+            if self._timers.pop(request_id, None) is None:
+                return
+            if request_id:
+                response["request_id"] = request_id
+            self._channel.send(FrameType.RESULT, response)
+
+
+def load_script(path: Optional[str]) -> Dict[str, Any]:
+    """读取脚本文件；未指定时返回空脚本"""
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    if not isinstance(script, dict):
+        raise ValueError("脚本文件的顶层必须是对象")
+    return script
+
+
+def main():
+    """主函数"""
+    # 标准输出只用于协议帧，其余输出全部转到stderr
+    channel = take_stdout_channel()
+
+    script_path = os.environ.get("VC_BUDDY_ANSWER_SCRIPT")
+    try:
+        responder = ScriptedResponder(load_script(script_path), channel)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: 无法加载应答脚本 {script_path}: {e}", file=sys.stderr)
+        return 2
+
+    while True:
+        frame = read_frame(sys.stdin.buffer)
+        if frame is None:
+            # 服务器关闭标准输入：回答完已收到的请求后退出
+            responder.wait()
+            return 0
+        if frame.type == FrameType.REQUEST:
+            responder.handle(frame.payload)
+        elif frame.type == FrameType.CANCEL:
+            if not frame.payload.get("request_id"):
+                return 0
+            responder.cancel(frame.payload["request_id"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
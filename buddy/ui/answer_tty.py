@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+终端版 Answer Box
+
+不依赖 PySide6 和图形界面，在终端中显示反馈请求并读取回答，启动只需几十毫秒，
+适用于 SSH 远程开发机等没有显示器的环境。
+
+与 answer_box_qml.py --ipc 使用相同的分帧协议（帧格式见 buddy/core/ipc.py）：
+- 从标准输入读取 REQUEST 帧，按到达顺序在终端中逐个显示
+- 用户回答后写入 RESULT 帧（ask_questions 的请求附带每个问题的答案）
+- 带 request_id 的 CANCEL 帧取消对应的请求；标准输入关闭时退出
+
+终端默认为 /dev/tty（启动服务器的终端），可以用环境变量 VC_BUDDY_TTY 指定其他终端，
+例如 tmux 另一个窗格中 `tty` 命令输出的路径。
+"""
+
+import os
+import queue
+import select
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 处理相对导入问题
+try:
+    from ..core.ipc import FrameType, read_frame, take_stdout_channel
+except ImportError:
+    # 如果作为脚本直接运行，需要添加路径
+    sys.path.insert(0, str(Path(__file__).parent.parent))  # 添加buddy目录到路径
+    from core.ipc import FrameType, read_frame, take_stdout_channel
+
+# 等待输入时检查请求是否被取消的间隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class RequestCancelled(Exception):
+    """正在回答的请求已被取消，或调用方已关闭"""
+
+
+class TerminalAnswerBox:
+    """在终端中逐个回答反馈请求"""
+
+    def __init__(self, tty_fd: int, channel):
+        self._fd = tty_fd
+        self._channel = channel
+        self._requests: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._cancelled = set()
+        self._closed = threading.Event()
+        self._current_id: Optional[str] = None
+        self._buffer = b""
+
+    def start(self):
+        # 守护线程：阻塞在stdin上也不会妨碍进程退出
+        threading.Thread(target=self._read_frames, daemon=True).start()
+
+    def _read_frames(self):
+        try:
+            while True:
+                frame = read_frame(sys.stdin.buffer)
+                if frame is None:
+                    break
+                if frame.type == FrameType.REQUEST:
+                    self._requests.put(frame.payload)
+                elif frame.type == FrameType.CANCEL:
+                    if not frame.payload.get("request_id"):
+                        break
+                    self._cancelled.add(frame.payload["request_id"])
+        except Exception as e:
+            print(f"DEBUG: 读取标准输入帧时出错: {e}", file=sys.stderr)
+        self._closed.set()
+        self._requests.put(None)
+
+    def run(self) -> int:
+        """依次回答请求，直到调用方关闭标准输入"""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return 0
+            request_id = request.get("request_id")
+            if request_id in self._cancelled:
+                continue
+
+            self._current_id = request_id
+            self._channel.send(FrameType.PROGRESS, self._tag({"stage": "shown"}))
+            try:
+                response = self._prompt(request)
+            except RequestCancelled:
+                if self._closed.is_set():
+                    return 0
+                self._write("\n（该请求已被取消）\n")
+                continue
+            self._channel.send(FrameType.RESULT, self._tag(response))
+            self._write("✓ 已发送\n")
+
+    def _tag(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._current_id:
+            payload["request_id"] = self._current_id
+        return payload
+
+    def _prompt(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """显示一个请求并读取回答"""
+        title = "反馈请求"
+        if request.get("project_directory"):
+            title += f" · {os.path.basename(os.path.normpath(request['project_directory']))}"
+        if request.get("client"):
+            title += f" ({request['client']})"
+        waiting = self._requests.qsize()
+        if waiting:
+            title += f"  [另有 {waiting} 个请求等待]"
+
+        self._write(f"\n━━━ {title} ━━━\n{request.get('summary', '')}\n\n")
+        self._discard_typeahead()
+
+        questions = request.get("questions") or []
+        if not questions:
+            text = self._read_text("反馈（直接回车表示满意，行尾输入 \\ 换行）> ")
+            return {"result": text}
+
+        answers = [{"id": q["id"], "answer": self._ask_question(i, q)} for i, q in enumerate(questions, 1)]
+        text = self._read_text("补充说明（可选）> ")
+        return {"result": text, "answers": answers}
+
+    def _ask_question(self, index: int, question: Dict[str, Any]) -> str:
+        options: List[str] = question.get("options") or []
+        self._write(f"{index}. {question.get('question', '')}\n")
+        for number, option in enumerate(options, 1):
+            self._write(f"   [{number}] {option}\n")
+        answer = self._read_text("   选择编号或输入回答> " if options else "   回答> ")
+        if answer.isdigit() and 1 <= int(answer) <= len(options):
+            return options[int(answer) - 1]
+        return answer
+
+    def _read_text(self, prompt: str) -> str:
+        """读取回答；行尾的 \\ 表示继续下一行"""
+        self._write(prompt)
+        lines = []
+        while True:
+            line = self._readline()
+            if line.endswith("\\"):
+                lines.append(line[:-1])
+                self._write("... ")
+                continue
+            lines.append(line)
+            return "\n".join(lines).strip()
+
+    def _readline(self) -> str:
+        """从终端读取一行，等待期间请求被取消或调用方关闭时抛出 RequestCancelled"""
+        while b"\n" not in self._buffer:
+            if self._closed.is_set() or self._current_id in self._cancelled:
+                raise RequestCancelled()
+            readable, _, _ = select.select([self._fd], [], [], POLL_INTERVAL)
+            if not readable:
+                continue
+            chunk = os.read(self._fd, 4096)
+            if not chunk:
+                # Ctrl-D：结束当前输入
+                chunk = b"\n"
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode("utf-8", errors="replace").rstrip("\r")
+
+    def _discard_typeahead(self):
+        """丢弃显示请求之前输入的内容，避免误把旧输入当作回答"""
+        self._buffer = b""
+        try:
+            import termios
+            termios.tcflush(self._fd, termios.TCIFLUSH)
+        except (ImportError, OSError):
+            pass
+
+    def _write(self, text: str):
+        os.write(self._fd, text.replace("\n", "\r\n").encode("utf-8"))
+
+
+def main():
+    """主函数"""
+    # 标准输出只用于协议帧，其余输出全部转到stderr
+    channel = take_stdout_channel()
+
+    tty_path = os.environ.get("VC_BUDDY_TTY") or "/dev/tty"
+    try:
+        tty_fd = os.open(tty_path, os.O_RDWR | getattr(os, "O_NOCTTY", 0))
+    except OSError as e:
+        print(f"ERROR: 无法打开终端 {tty_path}: {e}", file=sys.stderr)
+        return 2
+
+    answer_box = TerminalAnswerBox(tty_fd, channel)
+    answer_box.start()
+    try:
+        return answer_box.run()
+    finally:
+        os.close(tty_fd)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -106,6 +106,27 @@ class ConfigManager:
                 "model": "deepseek-chat",
                 "temperature": 1.0,
                 "max_tokens": 8000
+            },
+            "server": {
+                "answer_backend": "qt",
+                "ui_mode": "daemon",
+                "coalesce_requests": True,
+                "feedback_timeout": 600,
+                "keepalive_interval": 15,
+                "pool": {
+                    "size": 2,
+                    "max_idle_memory_mb": 0
+                },
+                "ui_log": {
+                    "max_bytes": 1048576,
+                    "backup_count": 3
+                },
+                "relay": {
+                    "address": "127.0.0.1:8765",
+                    "token": "",
+                    "heartbeat_interval": 10,
+                    "heartbeat_timeout": 30
+                }
             }
         }
     
@@ -7,7 +7,8 @@ import "."
 
 ApplicationWindow {
     id: window
-    visible: true
+    // 常驻宿主模式下启动时隐藏，收到请求后再显示
+    visible: !hostMode
     
     // 窗口尺寸和位置
     width: backend && backend.hasValidSavedGeometry() ? backend.savedWidth : (backend ? backend.defaultWidth : 400)
@@ -131,6 +132,15 @@ ApplicationWindow {
         }
     }
     
+    // 提交反馈：有问题列表时连同每个问题的答案一起返回
+    function submitFeedback(feedbackText) {
+        if (backend.hasQuestions) {
+            backend.sendAnswers(feedbackText, questionsPanel.collectAnswers())
+        } else {
+            backend.sendResponse(feedbackText)
+        }
+    }
+    
     function openQtWidgetsSettingsDialog(configManager) {
         // 暂时作为备用方案，如果需要的话可以通过Python后端调用Qt Widgets版本
         console.log("Qt Widgets settings dialog is not yet implemented in QML context")
@@ -142,6 +152,25 @@ ApplicationWindow {
         anchors.margins: Theme.spacing.medium
         spacing: Theme.spacing.medium
         
+        // 同一项目的并发请求：每个请求一个标签页（多于一个请求时显示）
+        TabBar {
+            id: requestTabBar
+            Layout.fillWidth: true
+            visible: backend && backend.requestTabs.length > 1
+            
+            Repeater {
+                model: backend ? backend.requestTabs : []
+                
+                TabButton {
+                    text: modelData.title
+                    width: implicitWidth
+                    font.pixelSize: Theme.fonts.normal
+                    font.family: Theme.fonts.family
+                    onClicked: backend.selectRequest(index, inputArea.text)
+                }
+            }
+        }
+        
         // 摘要显示区域
         Rectangle {
             Layout.fillWidth: true
@@ -296,6 +325,15 @@ ApplicationWindow {
                         }
                     }
                     
+                    // ask_questions 的问题列表（仅在有问题时显示）
+                    QuestionsPanel {
+                        id: questionsPanel
+                        Layout.fillWidth: true
+                        Layout.preferredHeight: Math.min(80 + questions.length * 70, 320)
+                        visible: backend && backend.hasQuestions
+                        questions: backend ? backend.questions : []
+                    }
+                    
                     // 输入区域
                     ColumnLayout {
                         Layout.fillWidth: true
@@ -334,6 +372,9 @@ ApplicationWindow {
                                     // 移除内置的背景，使用外层Rectangle作为背景
                                     background: Item {}
                                     
+                                    // 输入变化后延迟上报草稿
+                                    onTextChanged: draftTimer.restart()
+                                    
                                     // Ctrl+Enter快捷键
                                     Keys.onPressed: function(event) {
                                         if ((event.key === Qt.Key_Return || event.key === Qt.Key_Enter) && 
@@ -611,7 +652,7 @@ ApplicationWindow {
                                     // 发送后自动取消Commit复选框的选中状态
                                     commitCheckbox.checked = false
                                 }
-                                backend.sendResponse(feedbackText)
+                                window.submitFeedback(feedbackText)
                             }
                         }
                     }
@@ -679,6 +720,17 @@ ApplicationWindow {
             inputArea.cursorPosition = inputArea.length
         }
         
+        function onRequestsChanged() {
+            requestTabBar.currentIndex = backend.currentRequestIndex
+        }
+        
+        function onRequestLoaded() {
+            // 常驻宿主模式下复用窗口，新请求到达时清空上一次的输入（切换标签页时恢复该请求的草稿）
+            inputArea.text = backend.draftText
+            commitCheckbox.checked = false
+            todoListView.currentIndex = -1
+        }
+        
         function onDeepseekSummaryError(errorMessage) {
             // DeepSeek总结出错，显示错误信息
             console.log("DeepSeek总结错误:", errorMessage)
@@ -695,7 +747,7 @@ ApplicationWindow {
             if (backend) {
                 var currentText = backend.getCurrentTranscription()
                 if (currentText.trim() !== "") {
-                    backend.sendResponse(currentText)
+                    window.submitFeedback(currentText)
                 }
             }
         }
@@ -711,6 +763,7 @@ ApplicationWindow {
     onClosing: {
         if (backend) {
             backend.saveWindowGeometry(x, y, width, height)
+            backend.windowClosed()
         }
     }
     
@@ -730,4 +783,14 @@ ApplicationWindow {
             }
         }
     }
+    
+    Timer {
+        id: draftTimer
+        interval: 500  // 500ms 延迟，避免每次按键都上报
+        onTriggered: {
+            if (backend) {
+                backend.updateDraft(inputArea.text)
+            }
+        }
+    }
 } 
\ No newline at end of file
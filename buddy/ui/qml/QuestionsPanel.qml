@@ -0,0 +1,106 @@
+import QtQuick 2.15
+import QtQuick.Controls 2.15
+import QtQuick.Layouts 1.15
+import "."
+
+// ask_questions 工具的问题列表：有选项的问题单选，没有选项的问题自由输入
+Rectangle {
+    id: root
+
+    property var questions: []
+    // 按问题ID记录的答案
+    property var answers: ({})
+
+    color: Theme.colors.surface
+    border.color: Theme.colors.borderDark
+    border.width: 1
+    radius: Theme.radius.medium
+    clip: true
+
+    // 新的问题列表到达时清空上一次的答案
+    onQuestionsChanged: answers = ({})
+
+    function setAnswer(questionId, value) {
+        answers[questionId] = value
+    }
+
+    // 按问题顺序收集答案 [{"id", "answer"}]
+    function collectAnswers() {
+        var result = []
+        for (var i = 0; i < questions.length; i++) {
+            var questionId = questions[i].id
+            result.push({"id": questionId, "answer": answers[questionId] || ""})
+        }
+        return result
+    }
+
+    ScrollView {
+        anchors.fill: parent
+        anchors.margins: Theme.spacing.normal
+        clip: true
+
+        ColumnLayout {
+            width: root.width - Theme.spacing.normal * 2
+            spacing: Theme.spacing.medium
+
+            Repeater {
+                model: root.questions
+
+                delegate: ColumnLayout {
+                    id: questionItem
+                    Layout.fillWidth: true
+                    spacing: Theme.spacing.small
+
+                    property var question: modelData
+                    property bool hasOptions: question.options && question.options.length > 0
+
+                    Text {
+                        Layout.fillWidth: true
+                        text: (index + 1) + ". " + questionItem.question.question
+                        wrapMode: Text.WordWrap
+                        font.bold: true
+                        font.pixelSize: Theme.fonts.normal
+                        font.family: Theme.fonts.family
+                        color: Theme.colors.text
+                    }
+
+                    ButtonGroup {
+                        id: optionGroup
+                    }
+
+                    Flow {
+                        Layout.fillWidth: true
+                        spacing: Theme.spacing.normal
+                        visible: questionItem.hasOptions
+
+                        Repeater {
+                            model: questionItem.hasOptions ? questionItem.question.options : []
+
+                            delegate: RadioButton {
+                                text: modelData
+                                font.pixelSize: Theme.fonts.normal
+                                font.family: Theme.fonts.family
+                                ButtonGroup.group: optionGroup
+                                onCheckedChanged: {
+                                    if (checked) {
+                                        root.setAnswer(questionItem.question.id, modelData)
+                                    }
+                                }
+                            }
+                        }
+                    }
+
+                    TextField {
+                        Layout.fillWidth: true
+                        visible: !questionItem.hasOptions
+                        placeholderText: "输入回答..."
+                        font.pixelSize: Theme.fonts.normal
+                        font.family: Theme.fonts.family
+                        selectByMouse: true
+                        onTextChanged: root.setAnswer(questionItem.question.id, text)
+                    }
+                }
+            }
+        }
+    }
+}
@@ -14,6 +14,7 @@ from PySide6.QtCore import QObject, Signal, QTimer
 try:
     from .config import ConfigManager
     from ..core.analytics import track_voice_action
+    from ..core.metrics_store import metrics_span
 except ImportError:
     # 如果作为脚本直接运行，需要添加路径
     import sys
@@ -21,6 +22,7 @@ except ImportError:
     sys.path.insert(0, str(current_dir.parent))  # 添加buddy目录到路径
     from ui.config import ConfigManager
     from core.analytics import track_voice_action
+    from core.metrics_store import metrics_span
 
 # 尝试导入OpenAI客户端
 try:
@@ -155,6 +157,14 @@ class StreamingVoiceRecorder(QObject):
         except Exception as e:
             self.error_occurred.emit(f"更新API配置失败: {str(e)}")
     
+    def set_config_manager(self, config_manager: Optional[ConfigManager]):
+        """切换配置管理器（例如切换到另一个项目），重新加载命令并重置客户端"""
+        self.config_manager = config_manager
+        self._openai_initialized = False
+        self.openai_client = None
+        self._stop_commands = self._load_stop_commands()
+        self._send_commands = self._load_send_commands()
+    
     def start_recording(self):
         """开始流式录音"""
         if self.is_recording:
@@ -393,14 +403,16 @@ class StreamingVoiceRecorder(QObject):
             print("DEBUG: 开始调用OpenAI API...")
             response = None
             try:
-                response = self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_buffer,
-                    response_format="text",
-                    language="zh",  # 指定中文
-                    temperature=0.0,  # 降低随机性，减少幻觉
-                    prompt=""  # 空提示，避免引导生成特定内容
-                )
+                # 每个分片的转写往返耗时写入本地性能指标
+                with metrics_span("voice.transcription_chunk", is_final=is_final):
+                    response = self.openai_client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_buffer,
+                        response_format="text",
+                        language="zh",  # 指定中文
+                        temperature=0.0,  # 降低随机性，减少幻觉
+                        prompt=""  # 空提示，避免引导生成特定内容
+                    )
                 print(f"DEBUG: API调用成功，响应类型: {type(response)}")
                 print(f"DEBUG: API响应内容: {response}")
             except Exception as api_error:
@@ -1,4 +1,5 @@
 import re
+import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
@@ -102,7 +103,7 @@ class TodoParser:
             self.current_file_path = file_path
             return self.parse_content(content)
         except (IOError, UnicodeDecodeError) as e:
-            print(f"Warning: Could not read TODO file {file_path}: {e}")
+            print(f"Warning: Could not read TODO file {file_path}: {e}", file=sys.stderr)
             return []
     
     def save_todos_to_file(self, todos: List[TodoItem], file_path: Optional[str] = None) -> bool:
@@ -111,7 +112,7 @@ class TodoParser:
             file_path = self.current_file_path
         
         if not file_path:
-            print("Error: No file path specified for saving")
+            print("Error: No file path specified for saving", file=sys.stderr)
             return False
         
         try:
@@ -125,7 +126,7 @@ class TodoParser:
             
             return True
         except (IOError, UnicodeEncodeError) as e:
-            print(f"Error: Could not save TODO file {file_path}: {e}")
+            print(f"Error: Could not save TODO file {file_path}: {e}", file=sys.stderr)
             return False
     
     def _todos_to_markdown(self, todos: List[TodoItem]) -> str:
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Answer Box 常驻宿主进程
+
+MCP 服务器只启动一次本进程，之后通过本地 TCP 连接发送反馈请求。
+宿主进程预先完成 PySide6/QML 导入、引擎加载、配置解析和统计初始化，
+每个请求只需要显示/隐藏已有窗口，避免每次调用都冷启动一个 Qt 进程。
+
+通信协议（每个连接处理一个请求，帧格式见 buddy/core/ipc.py）：
+- 宿主每次启动生成随机 token，只通过标准输出的 READY 帧告知父进程；
+  客户端的第一帧必须是携带该 token 的 READY 帧，否则宿主发送带 error 的 CANCEL 帧并断开，
+  本机其他进程即使连上端口也无法提交请求或读取回答
+- 客户端随后发送 REQUEST 帧：{"summary": "...", "project_directory": "..."}
+- 窗口显示期间，宿主转发 PROGRESS / DRAFT 帧
+- 宿主在用户提交后回写 RESULT 帧：{"result": "..."}，然后关闭连接
+- 客户端发送 CANCEL 帧或断开连接表示请求已被取消，宿主关闭对应的标签页，没有剩余请求时隐藏窗口
+- 启动完成后，宿主在标准输出写入 READY 帧 {"port": N, "token": "..."}
+- 标准输入关闭（父进程退出）时宿主自动退出
+"""
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import uuid
+from collections import deque
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from PySide6.QtNetwork import QAbstractSocket, QHostAddress, QTcpServer
+
+# 处理相对导入问题
+try:
+    from .answer_box_qml import AnswerBoxQML
+    from ..core.ipc import FrameDecoder, FrameType, IPCError, encode_frame, take_stdout_channel
+except ImportError:
+    # 如果作为脚本直接运行，需要添加路径
+    current_dir = Path(__file__).parent
+    sys.path.insert(0, str(current_dir.parent))  # 添加buddy目录到路径
+    from ui.answer_box_qml import AnswerBoxQML
+    from core.ipc import FrameDecoder, FrameType, IPCError, encode_frame, take_stdout_channel
+
+
+class StdinWatcher(QThread):
+    """监听标准输入，父进程退出（EOF）时通知宿主退出"""
+
+    eof = Signal()
+
+    def run(self):
+        try:
+            while sys.stdin.buffer.read(4096):
+                pass
+        except Exception:
+            pass
+        self.eof.emit()
+
+
+class AnswerBoxHost(QObject):
+    """常驻宿主：通过本地TCP连接接收请求，按需显示/隐藏同一个窗口"""
+
+    def __init__(self, answer_box: AnswerBoxQML, token: str, parent=None):
+        super().__init__(parent)
+        self._answer_box = answer_box
+        self._token = token
+        self._backend = answer_box.backend
+        self._server = QTcpServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+
+        # 窗口同一时间只显示一个项目：同一项目的请求合并为标签页，其他项目的请求排队
+        self._pending = deque()  # (socket, request)
+        self._active = {}  # request_id -> socket，窗口中正在显示的请求
+        self._project = None
+        self._decoders = {}
+        self._authenticated = set()  # 已通过 token 校验的连接
+
+        self._backend.responseReady.connect(self._on_response_ready)
+        self._backend.frameReady.connect(self._on_frame_ready)
+
+    def listen(self, port: int = 0) -> int:
+        """监听本地端口，返回实际端口号"""
+        if not self._server.listen(QHostAddress.LocalHost, port):
+            raise RuntimeError(f"无法监听端口 {port}: {self._server.errorString()}")
+        return self._server.serverPort()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            self._decoders[sock] = FrameDecoder()
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _on_ready_read(self, sock):
+        decoder = self._decoders.get(sock)
+        if decoder is None:
+            return
+        try:
+            frames = decoder.feed(bytes(sock.readAll()))
+        except IPCError as e:
+            print(f"DEBUG: 宿主收到无效请求: {e}", file=sys.stderr)
+            sock.disconnectFromHost()
+            return
+
+        for frame in frames:
+            if sock not in self._authenticated:
+                if not self._check_token(frame):
+                    print("DEBUG: 拒绝宿主连接: token 不匹配", file=sys.stderr)
+                    self._decoders.pop(sock, None)
+                    sock.write(encode_frame(FrameType.CANCEL, {"error": "token 不匹配"}))
+                    sock.disconnectFromHost()
+                    return
+                self._authenticated.add(sock)
+            elif frame.type == FrameType.REQUEST:
+                self._on_request(sock, frame.payload)
+            elif frame.type == FrameType.CANCEL:
+                self._cancel(sock)
+                return
+        self._dispatch()
+
+    def _check_token(self, frame) -> bool:
+        """连接的第一帧必须是携带本次启动 token 的 READY 帧"""
+        token = frame.payload.get("token") if frame.type == FrameType.READY else None
+        return isinstance(token, str) and hmac.compare_digest(token.encode(), self._token.encode())
+
+    @staticmethod
+    def _project_key(request) -> str:
+        directory = request.get("project_directory")
+        return os.path.normcase(os.path.abspath(directory)) if directory else ""
+
+    def _on_request(self, sock, request):
+        request.setdefault("request_id", uuid.uuid4().hex)
+        if self._active and self._project_key(request) == self._project:
+            # 窗口正在显示同一项目的请求：作为新的标签页加入
+            self._active[request["request_id"]] = sock
+            self._backend.addRequest(request)
+            self._backend.scheduleAutoSubmit()
+        else:
+            self._pending.append((sock, request))
+
+    def _dispatch(self):
+        """显示下一个排队的请求，同一项目的其他排队请求一并作为标签页加入"""
+        if self._active or not self._pending:
+            return
+
+        sock, request = self._pending.popleft()
+        self._project = self._project_key(request)
+        self._active[request["request_id"]] = sock
+        self._backend.loadRequest(request)
+
+        remaining = deque()
+        for other_sock, other in self._pending:
+            if self._project_key(other) == self._project:
+                self._active[other["request_id"]] = other_sock
+                self._backend.addRequest(other)
+            else:
+                remaining.append((other_sock, other))
+        self._pending = remaining
+        self._answer_box.show_window()
+
+    @Slot(str)
+    def _on_response_ready(self, response: str):
+        payload = json.loads(response)
+        sock = self._active.pop(payload.get("request_id"), None)
+        if sock is not None and sock.state() == QAbstractSocket.ConnectedState:
+            sock.write(encode_frame(FrameType.RESULT, payload))
+            sock.flush()
+            sock.disconnectFromHost()
+
+        if not self._active:
+            self._answer_box.hide_window()
+            self._dispatch()
+
+    @Slot(int, 'QVariant')
+    def _on_frame_ready(self, frame_type: int, payload):
+        """把窗口的进度/草稿帧转发给对应请求的客户端"""
+        sock = self._active.get(payload.get("request_id"))
+        if sock is not None and sock.state() == QAbstractSocket.ConnectedState:
+            sock.write(encode_frame(frame_type, payload))
+
+    def _cancel(self, sock):
+        """客户端放弃等待：移除排队请求，正在显示的请求关闭对应的标签页"""
+        self._pending = deque(item for item in self._pending if item[0] is not sock)
+        cancelled = [request_id for request_id, s in self._active.items() if s is sock]
+        for request_id in cancelled:
+            print("DEBUG: 请求已被取消，关闭对应的标签页", file=sys.stderr)
+            del self._active[request_id]
+            self._backend.removeRequest(request_id)
+        if cancelled and not self._active:
+            self._answer_box.hide_window()
+            self._dispatch()
+
+    def _on_disconnected(self, sock):
+        self._cancel(sock)
+        self._decoders.pop(sock, None)
+        self._authenticated.discard(sock)
+        sock.deleteLater()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Answer Box 常驻宿主进程")
+    parser.add_argument("--port", type=int, default=0, help="监听端口，0表示自动分配")
+    args, _ = parser.parse_known_args()
+
+    # 标准输出只用于就绪通知，其余输出（包括录音器的调试信息）全部转到stderr
+    announce = take_stdout_channel()
+
+    answer_box = AnswerBoxQML(host_mode=True)
+    token = secrets.token_urlsafe(32)
+    host = AnswerBoxHost(answer_box, token)
+    port = host.listen(args.port)
+
+    watcher = StdinWatcher()
+    watcher.eof.connect(answer_box.app.quit)
+    watcher.start()
+
+    announce.send(FrameType.READY, {"port": port, "token": token})
+    print(f"DEBUG: Answer Box 宿主已就绪，端口: {port}", file=sys.stderr)
+
+    return answer_box.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ from PySide6.QtWidgets import QPushButton, QMessageBox
 try:
     from .config import ConfigManager
     from ..core.analytics import track_voice_action, track_button_clicked
+    from ..core.metrics_store import metrics_span
 except ImportError:
     # 如果作为脚本直接运行，需要添加路径
     import sys
@@ -21,6 +22,7 @@ except ImportError:
     sys.path.insert(0, str(current_dir.parent))  # 添加buddy目录到路径
     from ui.config import ConfigManager
     from core.analytics import track_voice_action, track_button_clicked
+    from core.metrics_store import metrics_span
 
 # 尝试导入OpenAI客户端
 try:
@@ -119,6 +121,12 @@ class VoiceRecorder(QObject):
         """更新API密钥"""
         self.update_api_config(api_key)
     
+    def set_config_manager(self, config_manager: Optional[ConfigManager]):
+        """切换配置管理器（例如切换到另一个项目），下次转写时按新配置初始化客户端"""
+        self.config_manager = config_manager
+        self._openai_initialized = False
+        self.openai_client = None
+    
     def start_recording(self):
         """开始录音"""
         if self.is_recording:
@@ -407,11 +415,13 @@ class VoiceRecorder(QObject):
                     audio_buffer = io.BytesIO(audio_data)
                     audio_buffer.name = "audio.wav"  # 给BytesIO对象一个名称
                     
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_buffer,
-                        language="zh"  # 指定中文
-                    )
+                    # 转写往返耗时写入本地性能指标，异常时记为失败
+                    with metrics_span("voice.transcription", audio_bytes=len(audio_data)):
+                        transcript = self.openai_client.audio.transcriptions.create(
+                            model="whisper-1",
+                            file=audio_buffer,
+                            language="zh"  # 指定中文
+                        )
                     print(f"DEBUG: API调用成功，响应类型: {type(transcript)}")
                     print(f"DEBUG: API响应内容: {transcript}")
                     
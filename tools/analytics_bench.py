@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+数据统计基准测试
+
+1. 热路径：测量 track_* 在调用线程上的耗时（通常是Qt界面线程）
+   - queued：track_* 只把事件放入有界队列，由后台线程批量写入本地缓冲（当前实现）
+   - inline：在调用线程上直接构造事件并写入本地缓冲（作为对照）
+2. 多线程压测：多个线程同时大量调用 track_button_clicked / track_voice_action，报告
+   调用方看到的吞吐量和延迟分位数、管理器锁和队列锁的争用情况，
+   以及事件经本地缓冲上传到服务端的端到端吞吐量
+
+上传地址通过 VC_BUDDY_AMPLITUDE_URL 指向本地的 Amplitude 替身（buddy/core/fake_amplitude.py），不访问网络；
+--latency-ms / --failure-rate 为替身注入延迟和失败。网络信息使用预先写入的缓存。
+
+使用方法：
+    python tools/analytics_bench.py [--events 20000] [--threads 8] [--latency-ms 0] [--failure-rate 0]
+"""
+
+import argparse
+import json
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tools"))
+
+from buddy.core.analytics import AnalyticsManager, MAX_QUEUED_EVENTS
+from buddy.core.fake_amplitude import FakeAmplitudeServer
+from mcp_load_test import percentile
+
+
+class ContentionLock:
+    """包装锁，统计获取次数、需要等待的次数和等待时间（计数在持有锁时更新，不需要额外的锁）"""
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_ns = 0
+        self.max_wait_ns = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter_ns()
+        if not self._lock.acquire(True, timeout):
+            return False
+        waited = time.perf_counter_ns() - start
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait_ns += waited
+        self.max_wait_ns = max(self.max_wait_ns, waited)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class InstrumentedQueue(queue.Queue):
+    """内部互斥锁可统计争用的队列：track_* 的调用线程和后台线程都要获取它"""
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.mutex = ContentionLock(self.mutex)
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.all_tasks_done = threading.Condition(self.mutex)
+
+
+def create_manager(config_dir: str) -> AnalyticsManager:
+    """创建网络信息已缓存、锁和队列可统计争用的统计管理器"""
+    (Path(config_dir) / "network_info.json").write_text(json.dumps({
+        "collected_at": time.time(),
+        "network_info": {"public_ip": "203.0.113.7", "local_ip": "192.168.1.2",
+                         "hostname": "bench", "network_type": "private"},
+    }), encoding="utf-8")
+    manager = AnalyticsManager(config_dir=config_dir)
+    # 在第一次 track_* 启动后台线程之前替换
+    manager._lock = ContentionLock(manager._lock)
+    manager._queue = InstrumentedQueue(maxsize=MAX_QUEUED_EVENTS)
+    return manager
+
+
+def track(manager: AnalyticsManager, i: int):
+    if i % 2:
+        manager.track_voice_action("transcription_completed")
+    else:
+        manager.track_button_clicked("send", "bench")
+
+
+def measure(manager: AnalyticsManager, events: int, inline: bool) -> list:
+    """交替调用 track_button_clicked / track_voice_action，返回每次调用耗时（微秒）"""
+    if inline:
+        def track_inline(event_type, properties):
+            # 不经过队列：持锁构造事件并在调用线程上写入本地缓冲
+            with manager._lock:
+                events = []
+                manager._deliver_event(manager._build_event(event_type, properties, time.time()), events)
+                manager.spool.append(events)
+    durations = []
+    clock = time.perf_counter_ns
+    for i in range(events):
+        start = clock()
+        if not inline:
+            track(manager, i)
+        elif i % 2:
+            track_inline("voice_action", {"action": "transcription_completed"})
+        else:
+            track_inline("button_clicked", {"button_name": "send", "context": "bench"})
+        durations.append((clock() - start) / 1000)
+    return durations
+
+
+def flood(manager: AnalyticsManager, threads: int, events: int) -> tuple:
+    """threads 个线程同时各调用 events 次 track_*，返回 (每次调用耗时（微秒）, 总耗时（秒）)"""
+    barrier = threading.Barrier(threads + 1)
+    results = [None] * threads
+
+    def caller(index: int):
+        durations = []
+        clock = time.perf_counter_ns
+        barrier.wait()
+        for i in range(events):
+            start = clock()
+            track(manager, i)
+            durations.append((clock() - start) / 1000)
+        results[index] = durations
+
+    workers = [threading.Thread(target=caller, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return [duration for durations in results for duration in durations], elapsed
+
+
+def print_report(name: str, durations: list, stats: dict):
+    print(f"{name:>7}: mean {statistics.mean(durations):7.2f} us | "
+          f"p50 {percentile(durations, 50):7.2f} us | p99 {percentile(durations, 99):7.2f} us | "
+          f"max {max(durations):8.1f} us | delivered {stats['delivered']} | dropped {stats['dropped']} | "
+          f"spool {stats['spool_bytes'] // 1024} KB")
+
+
+def print_lock(name: str, lock: ContentionLock):
+    share = lock.contended / lock.acquisitions * 100 if lock.acquisitions else 0
+    print(f"  {name:<16} acquisitions {lock.acquisitions} | contended {lock.contended} ({share:.1f}%) | "
+          f"wait total {lock.wait_ns / 1e6:.1f} ms | max {lock.max_wait_ns / 1000:.1f} us")
+
+
+def run_hot_path(events: int):
+    print(f"track_* 调用耗时（单线程，{events} 次）")
+    for name, inline in (("queued", False), ("inline", True)):
+        with tempfile.TemporaryDirectory() as config_dir:
+            manager = create_manager(config_dir)
+            # 预热：启动后台线程
+            manager.track_app_opened("bench")
+            manager.flush()
+            durations = measure(manager, events, inline)
+            manager.flush(timeout=10)
+            manager._shutdown()
+            print_report(name, durations, manager.stats())
+
+
+def run_flood(server: FakeAmplitudeServer, threads: int, events: int, drain_timeout: float):
+    per_thread = max(1, events // threads)
+    print(f"\n多线程压测（{threads} 个线程 × {per_thread} 次）")
+    with tempfile.TemporaryDirectory() as config_dir:
+        manager = create_manager(config_dir)
+        received_before = server.stats()["events"]
+        start = time.monotonic()
+        durations, elapsed = flood(manager, threads, per_thread)
+        manager.flush(timeout=30)
+        stats = manager.stats()
+
+        print(f"  callers          {len(durations) / elapsed:,.0f} events/s | p50 {percentile(durations, 50):.2f} us | "
+              f"p99 {percentile(durations, 99):.2f} us | p99.9 {percentile(durations, 99.9):.1f} us | "
+              f"max {max(durations):.1f} us")
+        print(f"  events           delivered {stats['delivered']} | dropped {stats['dropped']} "
+              f"(queue full, max {MAX_QUEUED_EVENTS}) | suppressed {stats['suppressed']} (sampling/rate limits)")
+        print_lock("manager._lock", manager._lock)
+        print_lock("queue.mutex", manager._queue.mutex)
+
+        # 等待上传线程把写入本地缓冲的事件（以及 $identify）发送到替身
+        expected = received_before + stats["delivered"] + 1
+        drained = server.wait_for_events(expected, drain_timeout)
+        received = server.stats()["events"] - received_before
+        upload_time = (server.last_event_at or start) - start
+        server_stats = server.stats()
+        print(f"  upload           received {received}{'' if drained else ' (timed out)'} | "
+              f"{received / upload_time if upload_time > 0 else 0:,.0f} events/s end-to-end | "
+              f"requests {server_stats['requests']} | failed {server_stats['failed_requests']} | "
+              f"duplicates {server_stats['duplicate_events']}")
+        manager._shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据统计基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="单线程每种方式的调用次数，以及压测的总调用次数")
+    parser.add_argument("--threads", type=int, default=8, help="压测的调用线程数")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Amplitude 替身每个请求的延迟（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0, help="Amplitude 替身返回 503 的请求比例（0-1）")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="等待事件全部上传的最长时间（秒）")
+    args = parser.parse_args()
+
+    with FakeAmplitudeServer(latency=args.latency_ms / 1000, failure_rate=args.failure_rate) as server:
+        os.environ["VC_BUDDY_AMPLITUDE_URL"] = server.url
+        run_hot_path(args.events)
+        run_flood(server, args.threads, args.events, args.drain_timeout)
+
+
+if __name__ == "__main__":
+    main()
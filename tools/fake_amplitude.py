@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+单独运行本地 Amplitude 批量上传接口替身（实现见 buddy/core/fake_amplitude.py）
+
+把数据统计的上传地址指向它：
+    VC_BUDDY_AMPLITUDE_URL=http://127.0.0.1:8790/batch
+
+使用方法：
+    python tools/fake_amplitude.py [--port 8790] [--latency-ms 0] [--failure-rate 0] [--failure-status 503]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from buddy.core.fake_amplitude import FakeAmplitudeServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Amplitude 批量上传接口替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="额外的随机延迟上限（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0, help="返回失败的请求比例（0-1）")
+    parser.add_argument("--failure-status", type=int, default=503, help="注入失败时返回的状态码")
+    args = parser.parse_args()
+
+    server = FakeAmplitudeServer(args.host, args.port, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                 failure_rate=args.failure_rate, failure_status=args.failure_status)
+    print(f"Fake Amplitude listening: VC_BUDDY_AMPLITUDE_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+反馈窗口延迟测试工具
+
+对比两种 UI 运行模式下 ask_for_feedback 的单次调用延迟：
+- spawn：每次调用启动新的 answer_box_qml.py 进程
+- daemon：复用常驻的 ui_host.py 宿主进程
+- pool：从预热进程池中取出已加载好的 answer_box_qml.py 进程
+
+通过 VC_BUDDY_AUTO_SUBMIT_MS 让窗口显示后自动提交空反馈，无需人工点击。
+
+使用方法：
+    python tools/feedback_latency_bench.py [--rounds 5] [--modes spawn daemon pool]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+async def measure_mode(mode: str, rounds: int) -> list:
+    """在指定模式下连续调用 ask_for_feedback，返回每次调用耗时（秒）"""
+    from fastmcp import Client
+    from buddy.server.main import mcp
+
+    os.environ["VC_BUDDY_UI_MODE"] = mode
+    durations = []
+    async with Client(mcp) as client:
+        if mode == "pool":
+            await wait_for_pool(client)
+        for i in range(rounds):
+            start = time.perf_counter()
+            await client.call_tool("ask_for_feedback", {
+                "summary": f"延迟测试 {mode} #{i + 1}",
+                "project_directory": str(project_root),
+            })
+            durations.append(time.perf_counter() - start)
+            print(f"  {mode} #{i + 1}: {durations[-1] * 1000:.0f} ms")
+    return durations
+
+
+async def wait_for_pool(client, timeout: float = 30.0):
+    """等待预热进程池就绪，测量的是取用预热进程的延迟"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        contents = await client.read_resource("buddy://ui-pool")
+        if json.loads(contents[0].text).get("idle", 0) > 0:
+            return
+        await asyncio.sleep(0.2)
+
+
+def print_report(results: dict):
+    """打印对比报告"""
+    print("\n📊 延迟对比（毫秒）")
+    print(f"{'模式':<8}{'首次':>10}{'后续平均':>12}{'后续中位数':>12}")
+    for mode, durations in results.items():
+        first = durations[0] * 1000
+        warm = durations[1:] or durations
+        print(f"{mode:<8}{first:>10.0f}{statistics.mean(warm) * 1000:>12.0f}"
+              f"{statistics.median(warm) * 1000:>12.0f}")
+
+    if "spawn" in results:
+        spawn_warm = statistics.median(results["spawn"][1:] or results["spawn"])
+        for mode in ("daemon", "pool"):
+            if mode not in results:
+                continue
+            mode_warm = statistics.median(results[mode][1:] or results[mode])
+            print(f"\n{mode} 每次调用节省: {(spawn_warm - mode_warm) * 1000:.0f} ms "
+                  f"（{spawn_warm / mode_warm:.1f}x）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比不同UI模式下的反馈窗口延迟")
+    parser.add_argument("--rounds", type=int, default=5, help="每种模式的调用次数")
+    parser.add_argument("--modes", nargs="+", default=["spawn", "daemon", "pool"],
+                        choices=["spawn", "daemon", "pool"], help="要测试的模式")
+    parser.add_argument("--auto-submit-ms", type=int, default=50,
+                        help="窗口显示后自动提交的延迟（毫秒）")
+    args = parser.parse_args()
+
+    os.environ["VC_BUDDY_AUTO_SUBMIT_MS"] = str(args.auto_submit_ms)
+
+    async def run_all():
+        # 所有模式在同一个事件循环中运行，常驻宿主进程绑定在该循环上
+        results = {}
+        for mode in dict.fromkeys(args.modes):
+            print(f"🚀 测试 {mode} 模式...")
+            results[mode] = await measure_mode(mode, args.rounds)
+        return results
+
+    print_report(asyncio.run(run_all()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+MCP 多会话压测工具
+
+在本机以 SSE 或 streamable-HTTP 模式启动 MCP 服务器，同时打开多个客户端会话，
+并发调用 ask_for_feedback，统计吞吐量、延迟分位数以及被项目队列拒绝的请求数。
+
+反馈窗口由一个自动应答脚本代替（通过 VC_BUDDY_UI_SCRIPT 注入），无需图形界面。
+
+使用方法：
+    python tools/mcp_load_test.py [--sessions 20] [--calls 5] [--projects 4] [--transport sse]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# 自动应答脚本：读取请求帧，模拟思考时间后返回结果帧（协议见 buddy/core/ipc.py）
+AUTO_ANSWER_SCRIPT = '''
+import os, sys, time
+sys.path.insert(0, {buddy_dir!r})
+from core.ipc import FrameType, read_frame, take_stdout_channel
+channel = take_stdout_channel()
+# 同一项目的并发请求会合并到同一个窗口：逐个回答，直到服务器关闭标准输入
+while True:
+    frame = read_frame(sys.stdin.buffer)
+    if frame is None:
+        break
+    if frame.type != FrameType.REQUEST:
+        continue
+    request = frame.payload
+    time.sleep(float(os.environ.get("LOAD_TEST_THINK_TIME", "0.05")))
+    channel.send(FrameType.RESULT, {{"result": "auto:" + request["summary"],
+                                     "request_id": request.get("request_id")}})
+'''
+
+
+def find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"服务器未能在 {timeout}s 内启动")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_session(url: str, session_index: int, calls: int, projects: int, stats: dict):
+    """一个客户端会话：顺序调用若干次 ask_for_feedback"""
+    from fastmcp import Client
+
+    async with Client(url) as client:
+        for call_index in range(calls):
+            project = f"/tmp/vc-buddy-load/project-{(session_index + call_index) % projects}"
+            start = time.perf_counter()
+            try:
+                result = await client.call_tool("ask_for_feedback", {
+                    "summary": f"session {session_index} call {call_index}",
+                    "project_directory": project,
+                })
+                text = json.loads(result[0].text)["result"]
+                if text.startswith("反馈请求被拒绝"):
+                    stats["rejected"] += 1
+                else:
+                    stats["latencies"].append(time.perf_counter() - start)
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"  会话 {session_index} 调用失败: {e}", file=sys.stderr)
+
+
+async def run_load_test(args) -> dict:
+    port = args.port or find_free_port()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script = Path(temp_dir) / "auto_answer.py"
+        script.write_text(AUTO_ANSWER_SCRIPT.format(buddy_dir=str(project_root / "buddy")), encoding="utf-8")
+
+        env = os.environ.copy()
+        env.update({
+            "VC_BUDDY_UI_MODE": "spawn",
+            "VC_BUDDY_UI_SCRIPT": str(script),
+            "LOAD_TEST_THINK_TIME": str(args.think_time),
+        })
+        server = subprocess.Popen(
+            [sys.executable, str(project_root / "buddy" / "server" / "main.py"),
+             "--transport", args.transport, "--port", str(port)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            await wait_for_port(port)
+            path = "sse" if args.transport == "sse" else "mcp"
+            url = f"http://127.0.0.1:{port}/{path}"
+
+            stats = {"latencies": [], "rejected": 0, "errors": 0}
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                run_session(url, i, args.calls, args.projects, stats)
+                for i in range(args.sessions)
+            ])
+            stats["elapsed"] = time.perf_counter() - start
+            return stats
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def print_report(args, stats: dict):
+    latencies = stats["latencies"]
+    total = args.sessions * args.calls
+    print("\n📊 压测结果")
+    print(f"传输方式: {args.transport}，会话数: {args.sessions}，每会话调用: {args.calls}，项目数: {args.projects}")
+    print(f"总调用: {total}，成功: {len(latencies)}，被队列拒绝: {stats['rejected']}，错误: {stats['errors']}")
+    print(f"总耗时: {stats['elapsed']:.2f}s，吞吐量: {len(latencies) / stats['elapsed']:.1f} 次/秒")
+    if latencies:
+        print(f"延迟 p50: {percentile(latencies, 50) * 1000:.0f} ms，"
+              f"p95: {percentile(latencies, 95) * 1000:.0f} ms，"
+              f"p99: {percentile(latencies, 99) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP服务器多会话并发压测")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default="sse")
+    parser.add_argument("--sessions", type=int, default=20, help="并发会话数")
+    parser.add_argument("--calls", type=int, default=5, help="每个会话的调用次数")
+    parser.add_argument("--projects", type=int, default=4, help="请求分布的项目数")
+    parser.add_argument("--think-time", type=float, default=0.05, help="自动应答的思考时间（秒）")
+    parser.add_argument("--port", type=int, default=0, help="服务器端口，0表示自动选择")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_load_test(args))
+    print_report(args, stats)
+
+
+if __name__ == "__main__":
+    main()
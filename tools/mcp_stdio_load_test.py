@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+MCP stdio 压测工具
+
+像 IDE 一样以 stdio 方式启动 MCP 服务器，直接通过标准输入输出发送 JSON-RPC，
+保持固定数量的并发调用，连续调用数千次 ask_for_feedback，统计吞吐量、
+延迟分位数以及服务器（含UI子进程）的峰值内存。
+
+反馈窗口由脚本应答后端代替（buddy/ui/answer_scripted.py），不需要图形界面和网络。
+可以用 --script 指定自己的应答脚本，否则按 --think-* 参数生成一个。
+
+使用方法：
+    python tools/mcp_stdio_load_test.py [--calls 2000] [--concurrency 16] [--projects 4]
+                                        [--think-distribution lognormal] [--think-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "buddy"))
+
+from mcp_load_test import percentile
+from server.ui_pool import process_rss_kb
+
+# MCP 协议版本（initialize 请求）
+PROTOCOL_VERSION = "2025-03-26"
+# 内存采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+def build_script(args) -> dict:
+    """按命令行参数生成应答脚本"""
+    think_time = {"distribution": args.think_distribution, "max_ms": args.think_ms * 20}
+    if args.think_distribution == "fixed":
+        think_time["ms"] = args.think_ms
+    elif args.think_distribution == "uniform":
+        think_time.update(min_ms=0, max_ms=args.think_ms * 2)
+    elif args.think_distribution == "exponential":
+        think_time["mean_ms"] = args.think_ms
+    else:
+        think_time.update(median_ms=args.think_ms, sigma=0.6)
+    return {"default_answer": "auto:{summary}", "think_time": think_time, "seed": 1}
+
+
+def peak_hwm_kb(pid: int):
+    """Linux 上读取进程的峰值常驻内存（VmHWM，KB）"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def child_pids(pid: int) -> list:
+    """Linux 上列出进程的直接子进程（UI进程）"""
+    try:
+        return [int(p) for p in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+    except (OSError, ValueError):
+        return []
+
+
+class StdioClient:
+    """最小的 MCP JSON-RPC 客户端：每行一条消息，按 id 交付响应"""
+
+    def __init__(self, process):
+        self.process = process
+        self._next_id = 0
+        self._pending = {}
+        self._reader = asyncio.create_task(self._read())
+
+    async def request(self, method: str, params: dict) -> dict:
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        return await future
+
+    async def notify(self, method: str, params: dict = None):
+        await self._send({"jsonrpc": "2.0", "method": method, "params": params or {}})
+
+    async def _send(self, message: dict):
+        self.process.stdin.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        await self.process.stdin.drain()
+
+    async def _read(self):
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self._pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("服务器已退出"))
+
+
+async def sample_rss(pid: int, peak: dict, stop: asyncio.Event):
+    """定期采样服务器及其UI子进程的内存总和"""
+    while not stop.is_set():
+        total = sum(process_rss_kb(p) or 0 for p in [pid] + child_pids(pid))
+        peak["total_kb"] = max(peak["total_kb"], total)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=RSS_SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load_test(args, script_path: str) -> dict:
+    env = os.environ.copy()
+    env.update({
+        "VC_BUDDY_ANSWER_BACKEND": "scripted",
+        "VC_BUDDY_ANSWER_SCRIPT": script_path,
+    })
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, str(project_root / "buddy" / "server" / "main.py"),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        env=env,
+        # 单行JSON-RPC消息可能超过默认的64KB缓冲
+        limit=16 * 1024 * 1024,
+    )
+    client = StdioClient(server)
+    peak = {"total_kb": 0}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server.pid, peak, stop))
+    stats = {"latencies": [], "rejected": 0, "errors": 0, "mismatched": 0}
+    try:
+        await client.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "vc-buddy-stdio-load-test", "version": "1.0"},
+        })
+        await client.notify("notifications/initialized")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def call(index: int):
+            async with semaphore:
+                summary = f"load call {index}"
+                start = time.perf_counter()
+                try:
+                    response = await client.request("tools/call", {
+                        "name": "ask_for_feedback",
+                        "arguments": {
+                            "summary": summary,
+                            "project_directory": f"/tmp/vc-buddy-load/project-{index % args.projects}",
+                        },
+                    })
+                    if "error" in response or response["result"].get("isError"):
+                        raise RuntimeError(response.get("error") or response["result"]["content"])
+                    text = json.loads(response["result"]["content"][0]["text"])["result"]
+                except Exception as e:
+                    stats["errors"] += 1
+                    print(f"  调用 {index} 失败: {e}", file=sys.stderr)
+                    return
+                if text.startswith("反馈请求被拒绝"):
+                    stats["rejected"] += 1
+                    return
+                if text != f"auto:{summary}" and not args.script:
+                    stats["mismatched"] += 1
+                stats["latencies"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[call(i) for i in range(args.calls)])
+        stats["elapsed"] = time.perf_counter() - start
+        stats["server_peak_rss_kb"] = peak_hwm_kb(server.pid)
+        return stats
+    finally:
+        stop.set()
+        await sampler
+        stats["total_peak_rss_kb"] = peak["total_kb"]
+        server.stdin.close()
+        try:
+            await asyncio.wait_for(server.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            server.kill()
+            await server.wait()
+
+
+def report(args, stats: dict) -> dict:
+    latencies = stats["latencies"]
+    summary = {
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "projects": args.projects,
+        "ok": len(latencies),
+        "rejected": stats["rejected"],
+        "errors": stats["errors"],
+        "mismatched": stats["mismatched"],
+        "elapsed_s": round(stats["elapsed"], 3),
+        "throughput_per_s": round(len(latencies) / stats["elapsed"], 1) if stats["elapsed"] else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "server_peak_rss_mb": round(stats["server_peak_rss_kb"] / 1024, 1) if stats.get("server_peak_rss_kb") else None,
+        "total_peak_rss_mb": round(stats["total_peak_rss_kb"] / 1024, 1),
+    }
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return summary
+
+    print("\n📊 stdio 压测结果")
+    print(f"调用: {summary['calls']}，并发: {summary['concurrency']}，项目数: {summary['projects']}")
+    print(f"成功: {summary['ok']}，被队列拒绝: {summary['rejected']}，错误: {summary['errors']}，"
+          f"回答不符: {summary['mismatched']}")
+    print(f"总耗时: {summary['elapsed_s']:.2f}s，吞吐量: {summary['throughput_per_s']:.1f} 次/秒")
+    print(f"延迟 p50: {summary['p50_ms']:.0f} ms，p95: {summary['p95_ms']:.0f} ms，p99: {summary['p99_ms']:.0f} ms")
+    if summary["server_peak_rss_mb"] is not None:
+        print(f"服务器峰值内存: {summary['server_peak_rss_mb']} MB")
+    print(f"服务器+UI进程峰值内存（采样）: {summary['total_peak_rss_mb']} MB")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通过stdio JSON-RPC压测MCP服务器")
+    parser.add_argument("--calls", type=int, default=2000, help="总调用次数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同时进行的调用数")
+    parser.add_argument("--projects", type=int, default=4, help="请求分布的项目数")
+    parser.add_argument("--script", help="应答脚本文件（格式见 buddy/ui/answer_scripted.py）")
+    parser.add_argument("--think-distribution", choices=["fixed", "uniform", "exponential", "lognormal"],
+                        default="lognormal", help="思考时间分布")
+    parser.add_argument("--think-ms", type=float, default=20, help="思考时间的中位数/均值（毫秒）")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script_path = args.script
+        if not script_path:
+            script_path = str(Path(temp_dir) / "answer_script.json")
+            Path(script_path).write_text(json.dumps(build_script(args)), encoding="utf-8")
+        stats = asyncio.run(run_load_test(args, script_path))
+    report(args, stats)
+
+
+if __name__ == "__main__":
+    main()